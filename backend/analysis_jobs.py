@@ -0,0 +1,302 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, List, Optional
+
+# Job states; "done" and "failed" are final
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINAL_JOB_STATES = (JOB_DONE, JOB_FAILED)
+
+_JOB_COLUMNS = [
+    "id", "idempotency_key", "request_hash", "payload", "status", "attempts", "max_attempts",
+    "result", "error", "available_at", "lease_expires_at", "created_at", "updated_at",
+]
+
+
+class IdempotencyConflictError(Exception):
+    """Raised when an idempotency key is reused for a different request."""
+
+    def __init__(self, job_id: str):
+        super().__init__("Idempotency key was already used for a different request")
+        self.job_id = job_id
+
+
+class JobStore:
+    """
+    Persistent analysis job table in SQLite.
+
+    Jobs are claimed with a lease: a worker that crashes mid-job simply lets
+    its lease expire and the job is picked up again. Results are only
+    written by the attempt that currently holds the job, so a late worker
+    cannot overwrite a newer outcome. Several API processes on one host may
+    share the same database file, which is opened on first use.
+    """
+
+    def __init__(self, db_path: str = "analysis_jobs.db", clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Autocommit mode; claim() opens its own write transaction
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._create_schema(self._conn)
+        return self._conn
+
+    @staticmethod
+    def _create_schema(db: sqlite3.Connection) -> None:
+        db.execute("PRAGMA busy_timeout = 5000")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_jobs ("
+            " id TEXT PRIMARY KEY,"
+            " idempotency_key TEXT UNIQUE,"
+            " request_hash TEXT,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " available_at REAL NOT NULL,"
+            " lease_expires_at REAL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_jobs_ready ON analysis_jobs (status, available_at)"
+        )
+        # Tables created before request_hash existed
+        columns = {row[1] for row in db.execute("PRAGMA table_info(analysis_jobs)")}
+        if "request_hash" not in columns:
+            try:
+                db.execute("ALTER TABLE analysis_jobs ADD COLUMN request_hash TEXT")
+            except sqlite3.OperationalError as e:
+                # Another process added it first
+                if "duplicate column" not in str(e):
+                    raise
+
+    def enqueue(self, payload: dict, job_id: Optional[str] = None,
+                idempotency_key: Optional[str] = None, max_attempts: int = 3,
+                request_hash: Optional[str] = None) -> dict:
+        """
+        Add a job, or return the existing one with the same idempotency key.
+
+        Raises:
+            IdempotencyConflictError: If the existing job was queued with a
+                different ``request_hash`` (e.g. the key was reused for
+                another file)
+        """
+        now = self._clock()
+        job_id = job_id or str(uuid.uuid4())
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO analysis_jobs"
+                " (id, idempotency_key, request_hash, payload, status, max_attempts, available_at, created_at,"
+                " updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, idempotency_key, request_hash, json.dumps(payload), JOB_QUEUED, max_attempts, now, now,
+                 now),
+            )
+            if idempotency_key is not None:
+                row = self._db.execute(
+                    f"SELECT {', '.join(_JOB_COLUMNS)} FROM analysis_jobs WHERE idempotency_key = ?",
+                    (idempotency_key,),
+                ).fetchone()
+            else:
+                row = self._select(job_id)
+        job = self._to_job(row)
+        if request_hash is not None and job["request_hash"] not in (None, request_hash):
+            raise IdempotencyConflictError(job["id"])
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._select(job_id)
+        return self._to_job(row) if row else None
+
+    def claim(self, lease_s: float) -> Optional[dict]:
+        """
+        Take the oldest runnable job (queued and due, or running with an
+        expired lease) and mark it running for ``lease_s`` seconds.
+        """
+        now = self._clock()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Workers that died on their last attempt leave the job failed
+                self._db.execute(
+                    "UPDATE analysis_jobs SET status = ?, error = COALESCE(error, 'Worker lease expired'),"
+                    " lease_expires_at = NULL, updated_at = ?"
+                    " WHERE status = ? AND lease_expires_at <= ? AND attempts >= max_attempts",
+                    (JOB_FAILED, now, JOB_RUNNING, now),
+                )
+                row = self._db.execute(
+                    f"SELECT {', '.join(_JOB_COLUMNS)} FROM analysis_jobs"
+                    " WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at <= ?)"
+                    " ORDER BY available_at LIMIT 1",
+                    (JOB_QUEUED, now, JOB_RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                self._db.execute(
+                    "UPDATE analysis_jobs SET status = ?, attempts = attempts + 1,"
+                    " lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                    (JOB_RUNNING, now + lease_s, now, row[0]),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            row = self._select(row[0])
+        return self._to_job(row)
+
+    def complete(self, job: dict, result: dict) -> bool:
+        """Record a result; False if this attempt no longer owns the job."""
+        return self._finish(job, "status = ?, result = ?, error = NULL", (JOB_DONE, json.dumps(result)))
+
+    def fail(self, job: dict, error: str, retry_delay_s: float) -> bool:
+        """
+        Record a failed attempt. The job is queued again after
+        ``retry_delay_s`` unless it has used up its attempts.
+        """
+        if job["attempts"] >= job["max_attempts"]:
+            return self._finish(job, "status = ?, error = ?", (JOB_FAILED, error))
+        return self._finish(job, "status = ?, error = ?, available_at = ?",
+                            (JOB_QUEUED, error, self._clock() + retry_delay_s))
+
+    def counts(self) -> dict:
+        """Number of jobs in each state."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM analysis_jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def _finish(self, job: dict, assignments: str, values: tuple) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE analysis_jobs SET {assignments}, lease_expires_at = NULL, updated_at = ?"
+                " WHERE id = ? AND status = ? AND attempts = ?",
+                values + (self._clock(), job["id"], JOB_RUNNING, job["attempts"]),
+            )
+        return cursor.rowcount == 1
+
+    def _select(self, job_id: str):
+        return self._db.execute(
+            f"SELECT {', '.join(_JOB_COLUMNS)} FROM analysis_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+
+    @staticmethod
+    def _to_job(row) -> dict:
+        job = dict(zip(_JOB_COLUMNS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class JobWorkerPool:
+    """
+    Asyncio workers that drain a JobStore.
+
+    Each worker claims a job, awaits ``handler(job)`` and stores its return
+    value as the job result. A handler exception is recorded and the job is
+    retried with exponential backoff (or after the exception's
+    ``retry_after``, if longer) until max_attempts is reached. The CPU-heavy
+    part of a handler is expected to run elsewhere, e.g. on the
+    AnalysisService process pool. Store calls run in a thread, since SQLite
+    can wait up to its busy timeout on another process's write lock.
+    """
+
+    def __init__(self,
+                 store: JobStore,
+                 handler: Callable[[dict], Awaitable[dict]],
+                 workers: int = 2,
+                 lease_s: float = 300.0,
+                 retry_delay_s: float = 5.0,
+                 poll_interval_s: float = 1.0):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.lease_s = lease_s
+        self.retry_delay_s = retry_delay_s
+        self.poll_interval_s = poll_interval_s
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @classmethod
+    def from_env(cls, handler: Callable[[dict], Awaitable[dict]]) -> "JobWorkerPool":
+        """Build a pool from JOB_* environment variables."""
+        return cls(
+            store=JobStore(os.getenv("JOB_DB_PATH", "analysis_jobs.db")),
+            handler=handler,
+            workers=int(os.getenv("JOB_WORKERS", "2")),
+            lease_s=float(os.getenv("JOB_LEASE_S", "300")),
+            retry_delay_s=float(os.getenv("JOB_RETRY_DELAY_S", "5")),
+            poll_interval_s=float(os.getenv("JOB_POLL_INTERVAL_S", "1")),
+        )
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; jobs they were running are retried once their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: dict, job_id: Optional[str] = None,
+                     idempotency_key: Optional[str] = None, max_attempts: int = 3,
+                     request_hash: Optional[str] = None) -> dict:
+        """Queue a job and wake an idle worker (see JobStore.enqueue)."""
+        job = await asyncio.to_thread(self.store.enqueue, payload, job_id, idempotency_key, max_attempts,
+                                      request_hash)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def run_once(self) -> bool:
+        """Claim and process one job; False if none was ready."""
+        job = await asyncio.to_thread(self.store.claim, self.lease_s)
+        if job is None:
+            return False
+        try:
+            result = await self.handler(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Analysis job {job['id']} attempt {job['attempts']} failed: {e}")
+            backoff = self.retry_delay_s * 2 ** (job["attempts"] - 1)
+            await asyncio.to_thread(self.store.fail, job, str(e) or type(e).__name__,
+                                    max(backoff, getattr(e, "retry_after", 0)))
+        else:
+            await asyncio.to_thread(self.store.complete, job, result)
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                if await self.run_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job worker error: {e}")
+            # Nothing ready: sleep until a submit() or the next poll
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_s)
+            except asyncio.TimeoutError:
+                pass
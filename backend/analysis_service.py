@@ -0,0 +1,237 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Callable, Optional, Tuple, Union
+
+from file_parser import analyze_file, get_file_extension
+from slow_profiler import get_profiler
+from step_tessellation import STEP_BACKEND_AVAILABLE
+
+
+class AnalysisBusyError(Exception):
+    """Raised when the analysis queue is full; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Mesh analysis queue is full")
+        self.retry_after = retry_after
+
+
+class AnalysisTimeoutError(Exception):
+    """Raised when a single analysis job exceeds its time budget."""
+
+
+def _analyze_timed(file_content: Union[bytes, memoryview], filename: str, mesh_path: Optional[str],
+                   quote_id: Optional[str]) -> Tuple[dict, dict]:
+    """
+    analyze_file result and its stage timings, which the parent can't
+    collect across processes. Calls over the profiler's budget are sampled.
+    """
+    timings = {}
+    with get_profiler().watch(quote_id, get_file_extension(filename)) as watch:
+        metrics = analyze_file(file_content, filename, mesh_path, timings)
+        watch.triangle_count = metrics["triangle_count"]
+    return metrics, timings
+
+
+def _analyze_bytes(file_content: bytes, filename: str, mesh_path: Optional[str],
+                   quote_id: Optional[str]) -> Tuple[dict, dict]:
+    """Worker entry point for content pickled into the worker."""
+    return _analyze_timed(file_content, filename, mesh_path, quote_id)
+
+
+def _analyze_shared(shm_name: str, size: int, filename: str, mesh_path: Optional[str],
+                    quote_id: Optional[str]) -> Tuple[dict, dict]:
+    """Worker entry point for content placed in a shared-memory block."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # The parent owns the block; stop this process's resource tracker
+        # from unlinking it (or warning about it) when the worker exits
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+    view = shm.buf[:size]
+    try:
+        return _analyze_timed(view, filename, mesh_path, quote_id)
+    finally:
+        view.release()
+        try:
+            shm.close()
+        except BufferError:
+            # A parser still holds a view; the mapping goes away with the process
+            pass
+
+
+class AnalysisService:
+    """
+    Runs CPU-heavy mesh analysis on a process pool, off the event loop.
+
+    Small files are analysed in a thread of this process because the pool
+    round trip would cost more than the parse; STEP files go to the pool
+    when a STEP backend is installed. Larger files are copied once into shared
+    memory (or pickled when shared memory is disabled) and analysed by a
+    worker. The number of outstanding jobs is capped; when the cap is
+    reached callers get AnalysisBusyError so the API can shed load.
+    """
+
+    def __init__(self,
+                 max_workers: int = 2,
+                 max_queued: int = 16,
+                 job_timeout_s: float = 60.0,
+                 inprocess_max_bytes: int = 256 * 1024,
+                 use_shared_memory: bool = True,
+                 retry_after_s: int = 5,
+                 start_method: str = "spawn"):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.job_timeout_s = job_timeout_s
+        self.inprocess_max_bytes = inprocess_max_bytes
+        self.use_shared_memory = use_shared_memory
+        self.retry_after_s = retry_after_s
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Jobs submitted to the pool that have not finished yet, including
+        # jobs whose caller already gave up after a timeout
+        self._outstanding = 0
+
+    @classmethod
+    def from_env(cls) -> "AnalysisService":
+        """Build a service from ANALYSIS_* environment variables."""
+        return cls(
+            max_workers=int(os.getenv("ANALYSIS_WORKERS", os.cpu_count() or 2)),
+            max_queued=int(os.getenv("ANALYSIS_MAX_QUEUED", "16")),
+            job_timeout_s=float(os.getenv("ANALYSIS_TIMEOUT_S", "60")),
+            inprocess_max_bytes=int(os.getenv("ANALYSIS_INPROCESS_MAX_BYTES", str(256 * 1024))),
+            use_shared_memory=os.getenv("ANALYSIS_USE_SHARED_MEMORY", "true").lower() == "true",
+            retry_after_s=int(os.getenv("ANALYSIS_RETRY_AFTER_S", "5")),
+            start_method=os.getenv("ANALYSIS_START_METHOD", "spawn"),
+        )
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of jobs running or queued at once."""
+        return self.max_workers + self.max_queued
+
+    @property
+    def outstanding(self) -> int:
+        return self._outstanding
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def analyze(self, file_content: Union[bytes, memoryview], filename: str,
+                      mesh_path: Optional[str] = None, timings: Optional[dict] = None,
+                      quote_id: Optional[str] = None) -> dict:
+        """
+        Analyse an uploaded file and return file_parser.analyze_file metrics.
+        With ``mesh_path``, the parsed mesh is also saved there (see mesh_store);
+        ``timings`` is filled with analyze_file's stage timings. ``quote_id``
+        tags the profile captured if the analysis is slow (see slow_profiler).
+
+        Raises:
+            AnalysisBusyError: If the pool already has ``capacity`` jobs
+            AnalysisTimeoutError: If the job runs longer than job_timeout_s
+        """
+        # STEP tessellation blocks for seconds whatever the file size. Without a
+        # STEP backend there is only the size-based estimate to make, and empty
+        # content has nothing to tessellate and can't go in shared memory
+        is_step = get_file_extension(filename) in ('step', 'stp')
+        estimate_only = is_step and not STEP_BACKEND_AVAILABLE
+        if (len(file_content) == 0 or estimate_only
+                or (len(file_content) <= self.inprocess_max_bytes and not is_step)):
+            # Still too slow for the event loop once validation and slicing run
+            metrics, job_timings = await asyncio.to_thread(_analyze_timed, file_content, filename, mesh_path,
+                                                           quote_id)
+            if timings is not None:
+                timings.update(job_timings)
+            return metrics
+
+        if self._outstanding >= self.capacity:
+            raise AnalysisBusyError(self.retry_after_s)
+
+        self.start()
+        shm = None
+        try:
+            if self.use_shared_memory:
+                shm = shared_memory.SharedMemory(create=True, size=len(file_content))
+                shm.buf[:len(file_content)] = file_content
+                job = self._executor.submit(_analyze_shared, shm.name, len(file_content), filename, mesh_path,
+                                           quote_id)
+            else:
+                job = self._executor.submit(_analyze_bytes, bytes(file_content), filename, mesh_path, quote_id)
+        except Exception as e:
+            self._release_shared_memory(shm)
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. killed for memory); replace the pool
+                self.shutdown()
+            raise
+
+        self._outstanding += 1
+        loop = asyncio.get_running_loop()
+        # Done callbacks run on the pool's management thread
+        job.add_done_callback(lambda _job: loop.call_soon_threadsafe(self._job_finished))
+        try:
+            metrics, job_timings = await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.job_timeout_s)
+        except asyncio.TimeoutError:
+            raise AnalysisTimeoutError(
+                f"Analysis of {filename} exceeded {self.job_timeout_s:.0f}s"
+            ) from None
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+        finally:
+            # Unlinking only removes the name; a worker that is still
+            # running keeps its mapping, and a queued job fails to attach
+            self._release_shared_memory(shm)
+
+        if timings is not None:
+            timings.update(job_timings)
+        return metrics
+
+    def submit_background(self, fn: Callable, *args) -> Optional[asyncio.Future]:
+        """
+        Run ``fn(*args)`` on the pool for work no response waits for. It only
+        takes an idle worker, so it never queues ahead of an analysis or makes
+        one fail with AnalysisBusyError; otherwise the job is dropped and None
+        is returned.
+        """
+        if self._outstanding >= self.max_workers:
+            return None
+
+        self.start()
+        try:
+            job = self._executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self.shutdown()
+            return None
+
+        self._outstanding += 1
+        loop = asyncio.get_running_loop()
+        job.add_done_callback(lambda _job: loop.call_soon_threadsafe(self._job_finished))
+        return asyncio.wrap_future(job)
+
+    def _job_finished(self) -> None:
+        self._outstanding -= 1
+
+    @staticmethod
+    def _release_shared_memory(shm: Optional[shared_memory.SharedMemory]) -> None:
+        if shm is None:
+            return
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
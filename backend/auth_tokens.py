@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+import jwt
+
+# Symmetric algorithm used by Supabase's legacy JWT secret
+SECRET_ALGORITHMS = ["HS256"]
+
+
+class _ClaimsCache:
+    """Bounded LRU of verified users keyed by token hash, with per-entry expiry."""
+
+    def __init__(self, max_entries: int, clock: Callable[[], float]):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def put(self, key: str, user: dict, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens locally instead of calling the auth server.
+
+    Tokens are checked against the project's JWT secret (HS256) and/or its
+    JWKS, which is loaded from a URL or a local file and refreshed in the
+    background. Verified users are cached by token hash until the earlier of
+    the cache TTL and the token's own expiry. When no local key can verify a
+    token, an optional remote lookup is used as a fallback.
+    """
+
+    def __init__(self,
+                 jwt_secret: Optional[str] = None,
+                 jwks_url: Optional[str] = None,
+                 jwks_path: Optional[str] = None,
+                 audience: Optional[str] = "authenticated",
+                 cache_max_entries: int = 10000,
+                 cache_ttl_s: float = 300.0,
+                 jwks_refresh_s: float = 600.0,
+                 leeway_s: float = 30.0,
+                 remote_lookup: Optional[Callable[[str], Awaitable[Optional[dict]]]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.jwt_secret = jwt_secret
+        self.jwks_url = jwks_url
+        self.jwks_path = jwks_path
+        self.audience = audience
+        self.cache_ttl_s = cache_ttl_s
+        self.jwks_refresh_s = jwks_refresh_s
+        self.leeway_s = leeway_s
+        self.remote_lookup = remote_lookup
+        self._clock = clock
+        self._cache = _ClaimsCache(cache_max_entries, clock)
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._keys_loaded_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, remote_lookup=None) -> "TokenVerifier":
+        """Build a verifier from SUPABASE_* and AUTH_* environment variables."""
+        supabase_url = os.getenv("SUPABASE_URL")
+        default_jwks_url = f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if supabase_url else None
+        remote_enabled = os.getenv("AUTH_REMOTE_FALLBACK", "true").lower() == "true"
+        return cls(
+            jwt_secret=os.getenv("SUPABASE_JWT_SECRET") or None,
+            jwks_url=os.getenv("AUTH_JWKS_URL", default_jwks_url) or None,
+            jwks_path=os.getenv("AUTH_JWKS_PATH") or None,
+            audience=os.getenv("AUTH_JWT_AUDIENCE", "authenticated") or None,
+            cache_max_entries=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")),
+            cache_ttl_s=float(os.getenv("AUTH_CACHE_TTL_S", "300")),
+            jwks_refresh_s=float(os.getenv("AUTH_JWKS_REFRESH_S", "600")),
+            remote_lookup=remote_lookup if remote_enabled else None,
+        )
+
+    async def start(self, wait: bool = True) -> None:
+        """
+        Load the JWKS and keep it fresh in the background. With ``wait``
+        false the first load also runs in the background, so startup does
+        not wait on the network; a token that arrives before it finishes
+        triggers the usual unknown-key refresh.
+        """
+        if not (self.jwks_url or self.jwks_path):
+            return
+        if wait:
+            await self.refresh_jwks()
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_periodically(load_first=not wait))
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def refresh_jwks(self) -> None:
+        """Reload signing keys; on failure the previous keys are kept."""
+        try:
+            if self.jwks_path:
+                with open(self.jwks_path) as jwks_file:
+                    jwks = json.load(jwks_file)
+            else:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                    jwks = response.json()
+        except Exception as e:
+            print(f"JWKS refresh error: {e}")
+            return
+
+        keys = {}
+        for key_data in jwks.get("keys", []):
+            try:
+                key = jwt.PyJWK(key_data)
+            except jwt.PyJWKError as e:
+                # e.g. RSA/EC keys without the cryptography package installed
+                print(f"Skipping unusable JWKS key {key_data.get('kid')}: {e}")
+                continue
+            keys[key_data.get("kid")] = key
+        self._keys = keys
+        self._keys_loaded_at = self._clock()
+
+    async def verify(self, token: str) -> Optional[dict]:
+        """
+        Return {"id", "email"} for a valid token, or None.
+
+        Raises:
+            jwt.InvalidTokenError: If a local key rejects the token (bad
+                signature, expired, wrong audience)
+        """
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        user = self._cache.get(cache_key)
+        if user is not None:
+            return user
+
+        claims = await self._decode_locally(token)
+        if claims is not None:
+            user = {"id": claims.get("sub"), "email": claims.get("email")}
+            expires_at = min(self._clock() + self.cache_ttl_s, claims.get("exp", float("inf")))
+        elif self.remote_lookup is not None:
+            user = await self.remote_lookup(token)
+            if user is None:
+                return None
+            # The remote check says nothing about expiry, so don't cache
+            # the user past the token's own exp claim
+            exp = jwt.decode(token, options={"verify_signature": False}).get("exp", float("inf"))
+            expires_at = min(self._clock() + self.cache_ttl_s, exp)
+        else:
+            return None
+
+        self._cache.put(cache_key, user, expires_at)
+        return user
+
+    async def _decode_locally(self, token: str) -> Optional[dict]:
+        """Verified claims, or None when no local key applies to the token."""
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+
+        if algorithm in SECRET_ALGORITHMS and self.jwt_secret:
+            key, algorithms = self.jwt_secret, SECRET_ALGORITHMS
+        else:
+            jwk = self._keys.get(header.get("kid"))
+            if jwk is None and (self.jwks_url or self.jwks_path) and \
+                    self._clock() - self._keys_loaded_at > 60:
+                # Unknown key id: the project may have rotated keys
+                await self.refresh_jwks()
+                jwk = self._keys.get(header.get("kid"))
+            if jwk is None:
+                return None
+            key, algorithms = jwk.key, [jwk.algorithm_name]
+
+        return jwt.decode(
+            token,
+            key,
+            algorithms=algorithms,
+            audience=self.audience,
+            leeway=self.leeway_s,
+            options={"verify_aud": self.audience is not None, "require": ["exp", "sub"]},
+        )
+
+    async def _refresh_periodically(self, load_first: bool = False) -> None:
+        if load_first:
+            await self.refresh_jwks()
+        while True:
+            await asyncio.sleep(self.jwks_refresh_s)
+            await self.refresh_jwks()
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import zipfile
+from typing import List
+
+from file_parser import is_supported_format
+from upload_ingest import (UPLOAD_MAX_BYTES, UPLOAD_SPILL_BYTES, IngestedUpload, UploadTooLargeError,
+                           ingest_file_object)
+
+BATCH_MAX_PARTS = int(os.getenv("BATCH_MAX_PARTS", "500"))
+# Parts stored and analysed at the same time within one batch request
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+# Whole request body, including zip archives
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+
+def is_zip_archive(filename: str) -> bool:
+    return filename.lower().endswith('.zip')
+
+
+def supported_zip_members(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """
+    Archive members that are 3D files we can quote.
+    Directories and macOS resource-fork entries are skipped.
+    """
+    members = []
+    for info in archive.infolist():
+        if info.is_dir() or info.filename.startswith('__MACOSX/'):
+            continue
+        if is_supported_format(info.filename):
+            members.append(info)
+    return members
+
+
+async def ingest_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> IngestedUpload:
+    """
+    Decompress one archive member on a worker thread. Like single uploads,
+    members over UPLOAD_SPILL_BYTES spill to a temporary file, so concurrent
+    large members don't all sit in memory. The declared size is checked
+    first so oversized members are never read.
+    """
+    if info.file_size > UPLOAD_MAX_BYTES:
+        raise UploadTooLargeError(UPLOAD_MAX_BYTES)
+
+    def read_member() -> IngestedUpload:
+        with archive.open(info) as member:
+            return ingest_file_object(member, spill_bytes=UPLOAD_SPILL_BYTES)
+
+    return await asyncio.to_thread(read_member)
+
+
+def summarize_parts(parts: List[dict]) -> dict:
+    """
+    Project totals across successfully quoted parts.
+
+    Args:
+        parts: Per-part results; successful ones carry pricing_options and
+            calculation_details as returned for a single upload
+
+    Returns:
+        Dictionary with part counts, summed volume/weight and, per printer
+        type, summed price and print time
+    """
+    quoted = [part for part in parts if part.get("status") == "ok"]
+    totals = {
+        "part_count": len(parts),
+        "quoted_count": len(quoted),
+        "failed_count": len(parts) - len(quoted),
+        "volume_mm3": sum(part["calculation_details"]["volume_mm3"] for part in quoted),
+        "weight_g": sum(part["calculation_details"]["weight_g"] for part in quoted),
+    }
+    for printer_type in ("fdm", "resin"):
+        options = [part["pricing_options"][printer_type] for part in quoted]
+        totals[printer_type] = {
+            "price": round(sum(option["price"] for option in options), 2),
+            "print_time_h": sum(option["print_time_h"] for option in options),
+        }
+    return totals
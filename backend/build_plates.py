@@ -0,0 +1,283 @@
+import heapq
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from utils import estimate_resin_print_time
+
+DEFAULT_FLEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "printer_fleet.json")
+
+# Plates still accepting parts; older plates are closed so packing stays
+# linear in the number of parts
+OPEN_PLATES = 4
+
+# Order columns the planner reads
+PLAN_COLUMNS = "id,printer_type,print_time_h,estimated_print_time_resin,size_x_mm,size_y_mm,size_z_mm"
+
+
+class PrinterGroup(NamedTuple):
+    """Identical printers of one type and the build plate they share."""
+    printer_type: str
+    count: int
+    bed_x_mm: float
+    bed_y_mm: float
+    max_z_mm: float
+    # FDM plates take the sum of their parts' times, so they are capped
+    max_plate_hours: float
+
+
+class Fleet(NamedTuple):
+    spacing_mm: float
+    groups: Dict[str, PrinterGroup]
+
+
+def load_fleet(path: str = DEFAULT_FLEET_PATH) -> Fleet:
+    """Read the printer fleet from a JSON file like printer_fleet.json."""
+    with open(path) as handle:
+        config = json.load(handle)
+    groups = {}
+    for printer_type, spec in config["printers"].items():
+        bed_x, bed_y, max_z = (float(value) for value in spec["bed_mm"])
+        if spec["count"] < 1 or min(bed_x, bed_y, max_z) <= 0:
+            raise ValueError(f"Invalid printer group {printer_type!r}")
+        groups[printer_type] = PrinterGroup(printer_type, int(spec["count"]), bed_x, bed_y, max_z,
+                                            float(spec.get("max_plate_hours", float("inf"))))
+    return Fleet(float(config.get("spacing_mm", 0.0)), groups)
+
+
+class Skyline:
+    """
+    Bottom-left skyline packer for one build plate.
+
+    The skyline is the upper outline of the parts placed so far, kept as
+    ``[x, y, width]`` segments from left to right. A part goes where its
+    bottom edge is lowest (then leftmost) among the segment start positions,
+    which is a good fit for many similar rectangles at O(segments) per try.
+    """
+
+    def __init__(self, width: float, depth: float):
+        self.width = width
+        self.depth = depth
+        self.segments = [[0.0, 0.0, width]]
+        self.used_area = 0.0
+
+    def _fit(self, index: int, width: float, depth: float) -> Optional[float]:
+        """Lowest y at which a width x depth part fits from segment ``index``, if any."""
+        x = self.segments[index][0]
+        if x + width > self.width + 1e-9:
+            return None
+        y = 0.0
+        remaining = width
+        while remaining > 1e-9 and index < len(self.segments):
+            segment_y, segment_width = self.segments[index][1], self.segments[index][2]
+            y = max(y, segment_y)
+            if y + depth > self.depth + 1e-9:
+                return None
+            remaining -= segment_width
+            index += 1
+        return y
+
+    def find(self, width: float, depth: float) -> Optional[Tuple[float, float, int]]:
+        """Bottom-left position (y, x, segment index) for the part, or None if it doesn't fit."""
+        best = None
+        for index in range(len(self.segments)):
+            y = self._fit(index, width, depth)
+            if y is not None:
+                position = (y, self.segments[index][0], index)
+                if best is None or position < best:
+                    best = position
+        return best
+
+    def place(self, position: Tuple[float, float, int], width: float, depth: float) -> None:
+        y, x, index = position
+        self.segments.insert(index, [x, y + depth, width])
+        # Trim the segments now under the new one
+        right = x + width
+        next_index = index + 1
+        while next_index < len(self.segments) and self.segments[next_index][0] < right - 1e-9:
+            segment = self.segments[next_index]
+            segment_right = segment[0] + segment[2]
+            if segment_right <= right + 1e-9:
+                del self.segments[next_index]
+            else:
+                segment[2] = segment_right - right
+                segment[0] = right
+                break
+        # Merge neighbours of equal height
+        merged = [self.segments[0]]
+        for segment in self.segments[1:]:
+            if abs(segment[1] - merged[-1][1]) < 1e-9:
+                merged[-1][2] += segment[2]
+            else:
+                merged.append(segment)
+        self.segments = merged
+        self.used_area += width * depth
+
+
+class _Part(NamedTuple):
+    order_id: str
+    width: float
+    depth: float
+    height: float
+    print_time_h: float
+
+
+class _Plate:
+    __slots__ = ("skyline", "parts", "print_time_h", "height_mm")
+
+    def __init__(self, width: float, depth: float):
+        self.skyline = Skyline(width, depth)
+        self.parts: List[dict] = []
+        self.print_time_h = 0.0
+        self.height_mm = 0.0
+
+
+def _part_time(order: dict, printer_type: str) -> float:
+    if printer_type == "resin":
+        return order.get("estimated_print_time_resin") or estimate_resin_print_time(order.get("print_time_h") or 0.0)
+    return order.get("print_time_h") or 0.0
+
+
+def _plate_time(plate: _Plate, part: _Part, printer_type: str) -> float:
+    # Resin cures every part on a layer at once, so the tallest part sets
+    # the time; FDM traces each part in turn
+    if printer_type == "resin":
+        return max(plate.print_time_h, part.print_time_h)
+    return plate.print_time_h + part.print_time_h
+
+
+def _best_position(plate: _Plate, width: float, depth: float) -> Optional[tuple]:
+    """Bottom-left placement on the plate over both orientations: (plate, position, w, d, rotated)."""
+    best = None
+    for rotated, (w, d) in enumerate(((width, depth), (depth, width))):
+        position = plate.skyline.find(w, d)
+        if position is not None and (best is None or position[:2] < best[1][:2]):
+            best = (plate, position, w, d, bool(rotated))
+    return best
+
+
+def pack_plates(parts: List[_Part], group: PrinterGroup, spacing_mm: float) -> List[_Plate]:
+    """
+    Pack parts onto plates with the skyline heuristic, trying both
+    footprint orientations. Parts are sorted so that plates fill well:
+    by height for resin (plates of similar height), by footprint for FDM.
+    """
+    if group.printer_type == "resin":
+        parts = sorted(parts, key=lambda part: (part.height, part.width * part.depth), reverse=True)
+    else:
+        parts = sorted(parts, key=lambda part: part.width * part.depth, reverse=True)
+
+    # Spacing is added to every part and to the bed, so it only ends up between parts
+    bed_x, bed_y = group.bed_x_mm + spacing_mm, group.bed_y_mm + spacing_mm
+    plates: List[_Plate] = []
+    open_plates: List[_Plate] = []
+    for part in parts:
+        width, depth = part.width + spacing_mm, part.depth + spacing_mm
+        chosen = None
+        for plate in open_plates:
+            if plate.parts and _plate_time(plate, part, group.printer_type) > group.max_plate_hours:
+                continue
+            chosen = _best_position(plate, width, depth)
+            if chosen is not None:
+                break
+
+        if chosen is None:
+            plate = _Plate(bed_x, bed_y)
+            plates.append(plate)
+            open_plates.append(plate)
+            if len(open_plates) > OPEN_PLATES:
+                open_plates.pop(0)
+            chosen = _best_position(plate, width, depth)
+
+        plate, position, w, d, rotated = chosen
+        plate.skyline.place(position, w, d)
+        plate.print_time_h = _plate_time(plate, part, group.printer_type)
+        plate.height_mm = max(plate.height_mm, part.height)
+        plate.parts.append({
+            "order_id": part.order_id,
+            "x_mm": round(position[1], 2),
+            "y_mm": round(position[0], 2),
+            "rotated": rotated,
+        })
+    return plates
+
+
+def assign_plates(plates: List[_Plate], group: PrinterGroup) -> List[dict]:
+    """
+    Longest-processing-time-first: the longest plate goes to the printer
+    that frees up first, which keeps the makespan within 4/3 of optimal.
+    """
+    printers = [(0.0, index) for index in range(group.count)]
+    heapq.heapify(printers)
+    jobs = []
+    for plate in sorted(plates, key=lambda plate: plate.print_time_h, reverse=True):
+        start_h, index = heapq.heappop(printers)
+        end_h = start_h + plate.print_time_h
+        heapq.heappush(printers, (end_h, index))
+        jobs.append({
+            "printer": f"{group.printer_type}-{index + 1}",
+            "printer_type": group.printer_type,
+            "start_h": round(start_h, 3),
+            "end_h": round(end_h, 3),
+            "print_time_h": round(plate.print_time_h, 3),
+            "height_mm": round(plate.height_mm, 2),
+            "utilisation": round(plate.skyline.used_area / (plate.skyline.width * plate.skyline.depth), 3),
+            "parts": plate.parts,
+        })
+    jobs.sort(key=lambda job: (job["printer"], job["start_h"]))
+    return jobs
+
+
+def plan_build_plates(orders: List[dict], fleet: Fleet) -> dict:
+    """
+    Group pending orders onto build plates and schedule the plates on the fleet.
+
+    Args:
+        orders: Order rows with PLAN_COLUMNS; size_*_mm is the part's
+            bounding box as stored at confirmation
+        fleet: Printers and plate sizes from load_fleet
+
+    Returns:
+        {"jobs": one plate per job with its printer, start/end hours and
+        part positions, "makespan_h": per printer type, "unplaced": orders
+        that can't be planned, with the reason}
+    """
+    parts: Dict[str, List[_Part]] = {printer_type: [] for printer_type in fleet.groups}
+    unplaced = []
+    for order in orders:
+        printer_type = order.get("printer_type") or "fdm"
+        group = fleet.groups.get(printer_type)
+        size = (order.get("size_x_mm"), order.get("size_y_mm"), order.get("size_z_mm"))
+        if group is None:
+            unplaced.append({"order_id": order["id"], "reason": f"No {printer_type} printers in the fleet"})
+            continue
+        if any(value is None for value in size):
+            unplaced.append({"order_id": order["id"], "reason": "No stored part dimensions"})
+            continue
+        width, depth, height = (float(value) for value in size)
+        short_side, long_side = sorted((width, depth))
+        if (height > group.max_z_mm or long_side > max(group.bed_x_mm, group.bed_y_mm)
+                or short_side > min(group.bed_x_mm, group.bed_y_mm)):
+            unplaced.append({"order_id": order["id"], "reason": f"Larger than the {printer_type} build volume"})
+            continue
+        parts[printer_type].append(_Part(order["id"], width, depth, height, _part_time(order, printer_type)))
+
+    jobs = []
+    makespan_h = {}
+    for printer_type, group in fleet.groups.items():
+        group_jobs = assign_plates(pack_plates(parts[printer_type], group, fleet.spacing_mm), group)
+        jobs.extend(group_jobs)
+        makespan_h[printer_type] = max((job["end_h"] for job in group_jobs), default=0.0)
+
+    return {"jobs": jobs, "makespan_h": makespan_h, "unplaced": unplaced}
+
+
+_fleet: Optional[Fleet] = None
+
+
+def get_fleet() -> Fleet:
+    """Fleet from PRINTER_FLEET_PATH (default printer_fleet.json), read once."""
+    global _fleet
+    if _fleet is None:
+        _fleet = load_fleet(os.getenv("PRINTER_FLEET_PATH", DEFAULT_FLEET_PATH))
+    return _fleet
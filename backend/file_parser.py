@@ -1,25 +1,24 @@
+import importlib
+import importlib.util
+import re
 import struct
+import time
 import numpy as np
-import tempfile
-import os
-from typing import Tuple, List, Optional
+from typing import Tuple, List, Optional, Union
 import io
 
-# Import additional libraries for different file formats
-try:
-    import trimesh
-    TRIMESH_AVAILABLE = True
-except ImportError:
-    TRIMESH_AVAILABLE = False
-
-try:
-    import open3d as o3d
-    OPEN3D_AVAILABLE = True
-except ImportError:
-    OPEN3D_AVAILABLE = False
+# trimesh (OBJ) takes tens of milliseconds to import, so only check it
+# is installed here and import it the first time one of those formats is parsed
+TRIMESH_AVAILABLE = importlib.util.find_spec("trimesh") is not None
 
 # Fallback to the original STL parser functions
-from stl_parser import parse_stl_binary, parse_stl_ascii, is_binary_stl, calculate_mesh_volume
+from stl_parser import parse_stl_binary, parse_stl_ascii, is_binary_stl
+from mesh_metrics import compute_mesh_metrics, empty_metrics
+from indexed_mesh import IndexedMesh, empty_indexed_mesh, fan_triangulate
+from print_time import estimate_print_times
+from mesh_validation import validate_mesh_welded
+from mesh_store import StoredMesh, parse_mesh_bytes, prune_mesh_store_if_due, read_mesh_file, write_mesh_file
+from step_tessellation import STEP_BACKEND_AVAILABLE, TessellationError, get_step_tessellator
 
 
 def get_file_extension(filename: str) -> str:
@@ -33,177 +32,284 @@ def is_supported_format(filename: str) -> bool:
     return ext in ['stl', 'obj', 'step', 'stp']
 
 
-def parse_obj_file(file_content: bytes) -> Tuple[List[np.ndarray], int]:
+# The "/vt/vn" suffix of an OBJ face corner
+_OBJ_TEXTURE_NORMAL_REFS = re.compile(rb'/\S*')
+
+
+def _resolve_obj_indices(tokens: List[bytes], bases: np.ndarray, corner_count: int,
+                         vertex_count: int) -> np.ndarray:
     """
-    Parse OBJ file and extract triangles.
-    Returns: (triangles, triangle_count)
+    Convert OBJ face tokens (v, v/vt, v//vn, v/vt/vn) to 0-based vertex indices.
+
+    Args:
+        tokens: Flat list of face tokens, corner_count per face
+        bases: Number of vertices defined before each face, for relative indices
+        corner_count: Corners per face
+        vertex_count: Total number of vertices in the file
+
+    Returns:
+        (M, corner_count) int32 array of vertex indices
+    """
+    # Strip texture/normal references so only the vertex index remains
+    joined = _OBJ_TEXTURE_NORMAL_REFS.sub(b'', b' '.join(tokens))
+    indices = np.fromstring(joined, dtype=np.int64, sep=' ')
+    if len(indices) != len(tokens):
+        raise ValueError("Malformed face indices in OBJ file")
+
+    indices = indices.reshape(-1, corner_count)
+    # Positive indices are 1-based; negative ones count back from the
+    # vertices defined so far
+    indices = np.where(indices > 0, indices - 1, indices + bases[:, None])
+    if (indices < 0).any() or (indices >= vertex_count).any():
+        raise ValueError("Face references a vertex that does not exist")
+    return indices.astype(np.int32)
+
+
+def parse_obj_file(file_content: bytes) -> Tuple[IndexedMesh, int]:
+    """
+    Parse OBJ file into an indexed mesh.
+    Returns: (mesh, triangle_count)
+
+    Vertices stay shared between faces; polygons are grouped by corner count
+    and fan-triangulated in bulk.
     """
     try:
-        # Convert bytes to string
-        content_str = file_content.decode('utf-8')
-        lines = content_str.strip().split('\n')
-        
-        vertices = []
-        faces = []
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('v '):  # Vertex
-                parts = line.split()
+        vertex_tokens = []
+        vertex_count = 0
+        # corner count -> (flat face tokens, vertex count before each face)
+        polygons = {}
+
+        for line in bytes(file_content).splitlines():
+            parts = line.split()
+            if not parts:
+                continue
+            keyword = parts[0]
+            if keyword == b'v':  # Vertex
                 if len(parts) >= 4:
-                    vertex = np.array([float(parts[1]), float(parts[2]), float(parts[3])])
-                    vertices.append(vertex)
-            elif line.startswith('f '):  # Face
-                parts = line.split()[1:]  # Skip 'f'
-                # Handle different face formats (v, v/vt, v/vt/vn)
-                face_vertices = []
-                for part in parts:
-                    vertex_idx = int(part.split('/')[0]) - 1  # OBJ uses 1-based indexing
-                    face_vertices.append(vertex_idx)
-                faces.append(face_vertices)
-        
-        # Convert faces to triangles
-        triangles = []
-        for face in faces:
-            if len(face) >= 3:
-                # For faces with more than 3 vertices, triangulate
-                for i in range(1, len(face) - 1):
-                    triangle = np.array([
-                        vertices[face[0]],
-                        vertices[face[i]],
-                        vertices[face[i + 1]]
-                    ])
-                    triangles.append(triangle)
-        
-        return triangles, len(triangles)
-        
+                    vertex_tokens.extend(parts[1:4])
+                    vertex_count += 1
+            elif keyword == b'f':  # Face
+                corners = parts[1:]
+                if len(corners) >= 3:
+                    tokens, bases = polygons.setdefault(len(corners), ([], []))
+                    tokens.extend(corners)
+                    bases.append(vertex_count)
+
+        vertices = np.fromstring(b' '.join(vertex_tokens), dtype=np.float32, sep=' ')
+        if len(vertices) != len(vertex_tokens):
+            raise ValueError("Malformed vertex coordinates in OBJ file")
+        vertices = vertices.reshape(-1, 3)
+
+        triangle_blocks = [
+            fan_triangulate(_resolve_obj_indices(tokens, np.array(bases), corner_count, vertex_count))
+            for corner_count, (tokens, bases) in sorted(polygons.items())
+        ]
+        if triangle_blocks:
+            faces = np.concatenate(triangle_blocks)
+        else:
+            faces = np.empty((0, 3), dtype=np.int32)
+
+        return IndexedMesh(vertices, faces), len(faces)
+
     except Exception as e:
         print(f"OBJ parsing error: {e}")
-        return [], 0
+        return empty_indexed_mesh(), 0
+
+
+def load_trimesh():
+    """Import trimesh on first use; later calls return the loaded module."""
+    return importlib.import_module("trimesh")
+
 
+def _trimesh_to_indexed(mesh) -> Tuple[IndexedMesh, int]:
+    """Wrap trimesh's vertex and face arrays without per-triangle conversion."""
+    if not hasattr(mesh, 'faces') or len(mesh.faces) == 0:
+        return empty_indexed_mesh(), 0
+    faces = np.asarray(mesh.faces).astype(np.int32, copy=False)
+    return IndexedMesh(np.asarray(mesh.vertices), faces), len(faces)
 
-def parse_obj_with_trimesh(file_content: bytes) -> Tuple[List[np.ndarray], int]:
+
+def _load_trimesh_from_memory(file_content: bytes, file_type: str):
+    """
+    Load a mesh with trimesh straight from the upload buffer.
+    Multi-body scenes are concatenated into a single mesh.
+    """
+    # BytesIO shares an existing bytes object instead of copying it
+    stream = io.BytesIO(file_content if isinstance(file_content, bytes) else bytes(file_content))
+    return load_trimesh().load(stream, file_type=file_type, force='mesh')
+
+
+def parse_obj_with_trimesh(file_content: bytes) -> Tuple[IndexedMesh, int]:
     """
     Parse OBJ file using trimesh library.
-    Returns: (triangles, triangle_count)
+    Returns: (mesh, triangle_count)
     """
     try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(suffix='.obj', delete=False) as temp_file:
-            temp_file.write(file_content)
-            temp_file_path = temp_file.name
-        
-        try:
-            # Load mesh using trimesh
-            mesh = trimesh.load(temp_file_path)
-            
-            if hasattr(mesh, 'triangles'):
-                triangles = [np.array(triangle) for triangle in mesh.triangles]
-                return triangles, len(triangles)
-            else:
-                return [], 0
-                
-        finally:
-            # Clean up temporary file
-            os.unlink(temp_file_path)
-            
+        mesh = _load_trimesh_from_memory(file_content, 'obj')
+        return _trimesh_to_indexed(mesh)
+
     except Exception as e:
         print(f"Trimesh OBJ parsing error: {e}")
         return parse_obj_file(file_content)  # Fallback to manual parsing
 
 
-def parse_step_file(file_content: bytes) -> Tuple[List[np.ndarray], int]:
+def parse_step_file(file_content: bytes) -> Tuple[Union[IndexedMesh, List[np.ndarray]], int]:
     """
     Parse STEP file and extract triangles.
     Returns: (triangles, triangle_count)
-    
-    Note: STEP file parsing is complex and requires specialized libraries.
-    This implementation provides a basic framework that can be extended.
+
+    The model is tessellated in a budgeted subprocess (see step_tessellation)
+    and the mesh is cached by content hash, so repeat quotes skip meshing.
+    Without a STEP backend the triangle count is estimated from the file size.
     """
+    if not file_content:
+        return [], 0
+    if not STEP_BACKEND_AVAILABLE:
+        file_size_kb = len(file_content) / 1024
+        estimated_triangles = int(file_size_kb / 2)
+        print("STEP parsing: Using estimated values "
+              "(install cadquery-ocp, or trimesh with cascadio or gmsh, for better parsing)")
+        return [], estimated_triangles
+
     try:
-        if TRIMESH_AVAILABLE:
-            return parse_step_with_trimesh(file_content)
-        else:
-            # Fallback: return estimated values based on file size
-            file_size_kb = len(file_content) / 1024
-            estimated_volume = file_size_kb * 10  # Very rough estimation
-            estimated_triangles = int(file_size_kb / 2)
-            
-            print("STEP parsing: Using estimated values (install trimesh for better parsing)")
-            return [], estimated_triangles
-            
-    except Exception as e:
-        print(f"STEP parsing error: {e}")
+        mesh = get_step_tessellator().tessellate(bytes(file_content))
+        return mesh, len(mesh.faces)
+    except TessellationError as e:
+        print(f"STEP tessellation error: {e}")
         return [], 0
 
 
-def parse_step_with_trimesh(file_content: bytes) -> Tuple[List[np.ndarray], int]:
+def _has_facets(triangles) -> bool:
+    """True if a parser returned at least one triangle."""
+    if isinstance(triangles, IndexedMesh):
+        return len(triangles.faces) > 0
+    return len(triangles) > 0
+
+
+def _fallback_metrics(volume_mm3: float, triangle_count: int) -> dict:
+    """Metrics for files whose geometry could not be measured."""
+    metrics = empty_metrics()
+    metrics["volume_mm3"] = volume_mm3
+    metrics["signed_volume_mm3"] = volume_mm3
+    metrics["surface_area_mm2"] = None
+    metrics["triangle_count"] = triangle_count
+    metrics["estimated"] = True
+    return metrics
+
+
+def _record_ms(timings: Optional[dict], stage: str, started: float) -> None:
+    if timings is not None:
+        timings[stage] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def _measure(triangles, timings: Optional[dict] = None) -> Tuple[dict, IndexedMesh]:
     """
-    Parse STEP file using trimesh library.
-    Returns: (triangles, triangle_count)
+    Metrics for successfully parsed geometry, including layer-based print
+    times and validation, and the welded mesh that validation built.
     """
+    started = time.perf_counter()
+    metrics = compute_mesh_metrics(triangles)
+    bounding_box = metrics["bounding_box"]
+    if bounding_box is not None:
+        metrics.update(estimate_print_times(triangles, (bounding_box["min"][2], bounding_box["max"][2])))
+    welded, metrics["validation"] = validate_mesh_welded(triangles, metrics)
+    metrics["estimated"] = False
+    _record_ms(timings, "metrics", started)
+    return metrics, welded
+
+
+def _measured_metrics(triangles, timings: Optional[dict] = None) -> dict:
+    """_measure without the welded mesh."""
+    return _measure(triangles, timings)[0]
+
+
+def _store_mesh(mesh_path: Optional[str], mesh: Optional[IndexedMesh], metrics: dict,
+                timings: Optional[dict] = None) -> None:
+    """Save the welded geometry and its metrics in the compact mesh format."""
+    if mesh_path is None or mesh is None or metrics["estimated"]:
+        return
+
+    started = time.perf_counter()
     try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(suffix='.step', delete=False) as temp_file:
-            temp_file.write(file_content)
-            temp_file_path = temp_file.name
-        
-        try:
-            # Load mesh using trimesh
-            mesh = trimesh.load(temp_file_path)
-            
-            if hasattr(mesh, 'triangles'):
-                triangles = [np.array(triangle) for triangle in mesh.triangles]
-                return triangles, len(triangles)
-            elif hasattr(mesh, 'vertices') and hasattr(mesh, 'faces'):
-                # Convert faces to triangles
-                triangles = []
-                for face in mesh.faces:
-                    if len(face) >= 3:
-                        triangle = np.array([
-                            mesh.vertices[face[0]],
-                            mesh.vertices[face[1]],
-                            mesh.vertices[face[2]]
-                        ])
-                        triangles.append(triangle)
-                return triangles, len(triangles)
-            else:
-                return [], 0
-                
-        finally:
-            # Clean up temporary file
-            os.unlink(temp_file_path)
-            
-    except Exception as e:
-        print(f"Trimesh STEP parsing error: {e}")
-        return [], 0
+        write_mesh_file(mesh_path, mesh, metrics)
+    except OSError as e:
+        # The quote doesn't depend on the stored mesh
+        print(f"Could not store mesh {mesh_path}: {e}")
+    prune_mesh_store_if_due()
+    _record_ms(timings, "mesh_store", started)
 
 
-def parse_file(file_content: bytes, filename: str) -> Tuple[float, int, str]:
+def analyze_stored_mesh(stored: StoredMesh, timings: Optional[dict] = None) -> dict:
     """
-    Parse various 3D file formats and return volume, triangle count, and format.
-    
+    Metrics of a mesh in the compact format: the saved metrics if there are
+    any, otherwise measured from its (memory-mapped) arrays.
+    """
+    if "volume_mm3" in stored.metrics:
+        return dict(stored.metrics)
+    metrics = _measured_metrics(stored.mesh, timings)
+    metrics["file_format"] = 'MESH'
+    return metrics
+
+
+def analyze_mesh_file(path: str) -> dict:
+    """analyze_stored_mesh for a compact mesh file on disk."""
+    return analyze_stored_mesh(read_mesh_file(path))
+
+
+def analyze_file(file_content: bytes, filename: str, mesh_path: Optional[str] = None,
+                 timings: Optional[dict] = None) -> dict:
+    """
+    Parse various 3D file formats and measure their geometry.
+
     Args:
         file_content: File content as bytes
         filename: Original filename
-    
+        mesh_path: If given, measured geometry is also written there in the
+            compact mesh format (see mesh_store), together with its metrics.
+            Previews are decimated from it later (see mesh_preview)
+        timings: If given, filled with milliseconds spent parsing
+            ("parse"), measuring ("metrics") and storing the mesh
+            ("mesh_store")
+
     Returns:
-        Tuple of (volume_mm3, triangle_count, file_format)
+        Dictionary from mesh_metrics.compute_mesh_metrics (volume_mm3,
+        surface_area_mm2, bounding_box, centroid, triangle_count) plus
+        file_format, an ``estimated`` flag for fallback values and, for
+        measured geometry, the mesh_validation.validate_mesh report
     """
+    started = time.perf_counter()
+    stage_timings = {}
+    try:
+        return _analyze_file(file_content, filename, mesh_path, stage_timings)
+    finally:
+        if timings is not None:
+            # Everything that isn't measuring or storing is parsing
+            total_ms = (time.perf_counter() - started) * 1000
+            timings["parse"] = round(max(0.0, total_ms - sum(stage_timings.values())), 2)
+            timings.update(stage_timings)
+
+
+def _analyze_file(file_content: bytes, filename: str, mesh_path: Optional[str], timings: dict) -> dict:
     file_ext = get_file_extension(filename)
-    
+    # Welded by validation; this is what gets stored
+    welded = None
+
     try:
+        if file_ext == 'mesh':
+            return analyze_stored_mesh(parse_mesh_bytes(file_content), timings)
+
         if file_ext == 'stl':
             # Use original STL parsing logic
             if is_binary_stl(file_content):
                 triangles, triangle_count = parse_stl_binary(file_content)
             else:
-                content_str = file_content.decode('utf-8')
-                triangles, triangle_count = parse_stl_ascii(content_str)
-            
-            volume_mm3 = calculate_mesh_volume(triangles)
-            return volume_mm3, triangle_count, 'STL'
-            
+                triangles, triangle_count = parse_stl_ascii(file_content)
+
+            metrics, welded = _measure(triangles, timings)
+            metrics["file_format"] = 'STL'
+            _store_mesh(mesh_path, welded, metrics, timings)
+            return metrics
+
         elif file_ext == 'obj':
             # Parse OBJ file
             try:
@@ -211,38 +317,65 @@ def parse_file(file_content: bytes, filename: str) -> Tuple[float, int, str]:
                     triangles, triangle_count = parse_obj_with_trimesh(file_content)
                 else:
                     triangles, triangle_count = parse_obj_file(file_content)
-                
-                volume_mm3 = calculate_mesh_volume(triangles) if triangles else 1000.0
-                return volume_mm3, triangle_count, 'OBJ'
+
+                if _has_facets(triangles):
+                    metrics, welded = _measure(triangles, timings)
+                else:
+                    metrics = _fallback_metrics(1000.0, triangle_count)
             except Exception as e:
                 print(f"OBJ parsing failed, using estimate: {e}")
                 # Fallback: estimate based on file size
                 file_size_kb = len(file_content) / 1024
                 estimated_volume = max(1000.0, file_size_kb * 20)  # 20 mm³ per KB
                 estimated_triangles = max(100, int(file_size_kb * 5))
-                return estimated_volume, estimated_triangles, 'OBJ'
-            
+                metrics = _fallback_metrics(estimated_volume, estimated_triangles)
+            metrics["file_format"] = 'OBJ'
+            _store_mesh(mesh_path, welded, metrics, timings)
+            return metrics
+
         elif file_ext in ['step', 'stp']:
             # Parse STEP file
             try:
                 triangles, triangle_count = parse_step_file(file_content)
-                volume_mm3 = calculate_mesh_volume(triangles) if triangles else 1000.0
-                return volume_mm3, triangle_count, 'STEP'
+                if _has_facets(triangles):
+                    metrics, welded = _measure(triangles, timings)
+                else:
+                    metrics = _fallback_metrics(1000.0, triangle_count)
             except Exception as e:
                 print(f"STEP parsing failed, using estimate: {e}")
                 # Fallback: estimate based on file size
                 file_size_kb = len(file_content) / 1024
                 estimated_volume = max(1000.0, file_size_kb * 15)  # 15 mm³ per KB
                 estimated_triangles = max(50, int(file_size_kb * 3))
-                return estimated_volume, estimated_triangles, 'STEP'
-            
+                metrics = _fallback_metrics(estimated_volume, estimated_triangles)
+            metrics["file_format"] = 'STEP'
+            _store_mesh(mesh_path, welded, metrics, timings)
+            return metrics
+
         else:
             raise ValueError(f"Unsupported file format: {file_ext}")
-            
+
     except Exception as e:
         print(f"File parsing error for {filename}: {e}")
         # Return default values
-        return 1000.0, 0, file_ext.upper()
+        metrics = _fallback_metrics(1000.0, 0)
+        metrics["file_format"] = file_ext.upper()
+        return metrics
+
+
+def parse_file(file_content: bytes, filename: str) -> Tuple[float, int, str]:
+    """
+    Parse various 3D file formats and return volume, triangle count, and format.
+
+    Args:
+        file_content: File content as bytes
+        filename: Original filename
+
+    Returns:
+        Tuple of (volume_mm3, triangle_count, file_format)
+    """
+    metrics = analyze_file(file_content, filename)
+    return metrics["volume_mm3"], metrics["triangle_count"], metrics["file_format"]
 
 
 def calculate_weight_from_volume(volume_mm3: float, material_density: float = 1.24) -> float:
@@ -0,0 +1,60 @@
+import numpy as np
+from typing import Iterator, NamedTuple, Union
+
+
+class IndexedMesh(NamedTuple):
+    """
+    Triangle mesh that keeps shared vertices.
+
+    vertices: (V, 3) float array of vertex positions
+    faces: (F, 3) int32 array of vertex indices per triangle
+    """
+    vertices: np.ndarray
+    faces: np.ndarray
+
+    @property
+    def triangle_count(self) -> int:
+        return len(self.faces)
+
+
+def empty_indexed_mesh() -> IndexedMesh:
+    """Indexed mesh without vertices or faces."""
+    return IndexedMesh(np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.int32))
+
+
+def fan_triangulate(polygons: np.ndarray) -> np.ndarray:
+    """
+    Split convex polygons into triangles around their first vertex.
+
+    Args:
+        polygons: (M, k) array of vertex indices, all polygons with k >= 3 corners
+
+    Returns:
+        (M * (k - 2), 3) int32 array of triangle indices, grouped per polygon
+    """
+    polygons = np.asarray(polygons, dtype=np.int32)
+    corner_count = polygons.shape[1]
+    if corner_count == 3:
+        return polygons
+
+    # Triangle i of every polygon uses corners (0, i + 1, i + 2)
+    fan = np.empty((len(polygons), corner_count - 2, 3), dtype=np.int32)
+    fan[:, :, 0] = polygons[:, :1]
+    fan[:, :, 1] = polygons[:, 1:-1]
+    fan[:, :, 2] = polygons[:, 2:]
+    return fan.reshape(-1, 3)
+
+
+def iter_triangle_chunks(mesh: Union[IndexedMesh, np.ndarray], chunk_size: int) -> Iterator[np.ndarray]:
+    """
+    Yield (n, 3, 3) triangle arrays of at most chunk_size facets.
+
+    Indexed meshes are gathered one chunk at a time, so the full triangle
+    soup is never materialised.
+    """
+    if isinstance(mesh, IndexedMesh):
+        for start in range(0, len(mesh.faces), chunk_size):
+            yield mesh.vertices[mesh.faces[start:start + chunk_size]]
+    else:
+        for start in range(0, len(mesh), chunk_size):
+            yield mesh[start:start + chunk_size]
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from order_queries import (MAX_PAGE_SIZE, clamp_page_size, decode_cursor, page_from_rows,
+                           select_clause)
+from repositories import Repositories
+
+# Columns kept outside the JSON document so they can be filtered and indexed
+_INDEXED_COLUMNS = ["id", "created_at", "status", "printer_type", "user_id"]
+
+
+class LocalOrdersRepository:
+    """
+    Orders in SQLite (in memory by default).
+
+    Each order is stored as a JSON document next to the columns used for
+    filtering and keyset pagination, so new order fields need no migration.
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        # Reentrant so _update can hold it across its read and write
+        self._lock = threading.RLock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS orders ("
+            " id TEXT PRIMARY KEY,"
+            " created_at TEXT,"
+            " status TEXT,"
+            " printer_type TEXT,"
+            " user_id TEXT,"
+            " data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_orders_keyset ON orders (created_at DESC, id DESC)")
+        self._db.commit()
+
+    async def insert(self, order: dict) -> dict:
+        await asyncio.to_thread(self._write, order, True)
+        return order
+
+    async def get(self, order_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, order_id)
+
+    async def update(self, order_id: str, values: dict) -> Optional[dict]:
+        return await asyncio.to_thread(self._update, order_id, values)
+
+    async def list_page(self, fields: Optional[str] = None, filters: Optional[dict] = None,
+                        cursor: Optional[str] = None, limit: int = MAX_PAGE_SIZE) -> dict:
+        limit = clamp_page_size(limit)
+        columns = select_clause(fields).split(",")
+        rows = await asyncio.to_thread(self._select_page, filters or {}, cursor, limit)
+        return page_from_rows([{column: row.get(column) for column in columns} for row in rows], limit)
+
+    async def sample(self, fields: str, limit: int) -> Tuple[List[dict], int]:
+        columns = [field.strip() for field in fields.split(",")]
+        rows, total = await asyncio.to_thread(self._sample, limit)
+        return [{column: row.get(column) for column in columns} for row in rows], total
+
+    def _write(self, order: dict, insert: bool) -> None:
+        values = [order.get(column) for column in _INDEXED_COLUMNS] + [json.dumps(order, default=str)]
+        verb = "INSERT" if insert else "REPLACE"
+        with self._lock:
+            self._db.execute(f"{verb} INTO orders ({', '.join(_INDEXED_COLUMNS)}, data) VALUES (?, ?, ?, ?, ?, ?)",
+                             values)
+            self._db.commit()
+
+    def _get(self, order_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM orders WHERE id = ?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _update(self, order_id: str, values: dict) -> Optional[dict]:
+        with self._lock:
+            order = self._get(order_id)
+            if order is None:
+                return None
+            order.update(values)
+            self._write(order, False)
+        return order
+
+    def _select_page(self, filters: dict, cursor: Optional[str], limit: int) -> List[dict]:
+        clauses, params = [], []
+        for column in ("status", "printer_type", "user_id"):
+            if filters.get(column):
+                clauses.append(f"{column} = ?")
+                params.append(filters[column])
+        if filters.get("created_from"):
+            clauses.append("created_at >= ?")
+            params.append(filters["created_from"])
+        if filters.get("created_to"):
+            clauses.append("created_at < ?")
+            params.append(filters["created_to"])
+        if cursor:
+            created_at, order_id = decode_cursor(cursor)
+            clauses.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params.extend([created_at, created_at, order_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT data FROM orders {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _sample(self, limit: int) -> Tuple[List[dict], int]:
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM orders LIMIT ?", (limit,)).fetchall()
+            total = self._db.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+        return [json.loads(row[0]) for row in rows], total
+
+
+class LocalStorageRepository:
+    """Buckets as directories on the local filesystem."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, bucket: str, name: str) -> Path:
+        path = (self.root / bucket / name).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid object name: {name}")
+        return path
+
+    async def upload(self, bucket: str, name: str, payload: Union[bytes, memoryview, str]) -> bool:
+        return await asyncio.to_thread(self._upload, self._path(bucket, name), payload)
+
+    def public_url(self, bucket: str, name: str) -> str:
+        return self._path(bucket, name).as_uri()
+
+    async def download(self, bucket: str, name: str) -> bytes:
+        return await asyncio.to_thread(self._path(bucket, name).read_bytes)
+
+    async def remove(self, bucket: str, names: List[str]) -> None:
+        await asyncio.to_thread(self._remove, [self._path(bucket, name) for name in names])
+
+    async def list(self, bucket: str, limit: int = 100) -> List[dict]:
+        return await asyncio.to_thread(self._list, self.root / bucket, limit)
+
+    @staticmethod
+    def _remove(paths: List[Path]) -> None:
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _list(bucket_dir: Path, limit: int) -> List[dict]:
+        if not bucket_dir.is_dir():
+            return []
+        names = sorted(path.name for path in bucket_dir.iterdir())[:limit]
+        return [{"name": name} for name in names]
+
+    @staticmethod
+    def _upload(path: Path, payload: Union[bytes, memoryview, str]) -> bool:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Exclusive create, matching storage's no-upsert behaviour
+            with open(path, 'xb') as target:
+                if isinstance(payload, str):
+                    with open(payload, 'rb') as source:
+                        shutil.copyfileobj(source, target)
+                else:
+                    target.write(payload)
+        except FileExistsError:
+            return False
+        return True
+
+
+class LocalAuthRepository:
+    """No remote auth server; tokens must verify locally (SUPABASE_JWT_SECRET / AUTH_JWKS_PATH)."""
+
+    async def get_user(self, token: str) -> Optional[dict]:
+        return None
+
+
+def create_local_repositories(db_path: Optional[str] = None, storage_dir: Optional[str] = None) -> Repositories:
+    """
+    Offline data layer configured by LOCAL_DB_PATH (default: in memory) and
+    LOCAL_STORAGE_DIR (default: a fresh temporary directory).
+    """
+    db_path = db_path or os.getenv("LOCAL_DB_PATH", ":memory:")
+    storage_dir = storage_dir or os.getenv("LOCAL_STORAGE_DIR") or tempfile.mkdtemp(prefix="local-storage-")
+    return Repositories(
+        orders=LocalOrdersRepository(db_path),
+        storage=LocalStorageRepository(storage_dir),
+        auth=LocalAuthRepository(),
+    )
@@ -1,15 +1,83 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from contextlib import ExitStack, asynccontextmanager
+from typing import List, Optional, Set, Tuple, Union
+import asyncio
+import json
 import uuid
+import zipfile
+import zlib
 import os
+import time
 from datetime import datetime
+from functools import partial
 
-from supabase_client import supabase
-from utils import calculate_price, calculate_dual_pricing
-from file_parser import parse_file, calculate_weight_from_volume, estimate_print_time, is_supported_format
+from utils import estimate_resin_print_time, reprice_orders
+from pricing_engine import get_pricing_engine
+from file_parser import (analyze_mesh_file, calculate_weight_from_volume, estimate_print_time, is_supported_format,
+                         get_file_extension)
+from mesh_store import init_mesh_store, mark_used, mesh_store_path
+from mesh_preview import generate_previews, list_previews, preview_file, source_mesh_file
+from analysis_service import AnalysisService, AnalysisBusyError, AnalysisTimeoutError
+from quote_cache import QuoteCache, cache_key
+from upload_ingest import (UPLOAD_MAX_BYTES, IngestedUpload, UploadSizeLimitMiddleware, UploadTooLargeError,
+                           ingest_upload)
+from batch_quotes import (BATCH_MAX_BYTES, BATCH_MAX_CONCURRENCY, BATCH_MAX_PARTS, ingest_zip_member,
+                          is_zip_archive, summarize_parts, supported_zip_members)
+from auth_tokens import TokenVerifier
+from order_queries import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, select_clause
+from repositories import RepositoryError, close_repositories, get_repositories
+from analysis_jobs import FINAL_JOB_STATES, IdempotencyConflictError, JobWorkerPool
+from build_plates import PLAN_COLUMNS, get_fleet, plan_build_plates
+from observability import TimingMiddleware, record_stage, render_metrics, set_labels, track_operation
+from slow_profiler import capture_path, get_profiler, list_captures
 
-app = FastAPI()
+# Mesh analysis runs on a process pool so large files don't block the event loop
+analysis_service = AnalysisService.from_env()
+# Analysis results keyed by file content, so re-uploads skip parsing
+quote_cache = QuoteCache.from_env()
+# Stored meshes whose previews are being generated on the pool
+previews_pending: Set[str] = set()
+
+# Seconds between job status checks on the quote event stream
+QUOTE_EVENTS_POLL_S = float(os.getenv("QUOTE_EVENTS_POLL_S", "0.5"))
+# Idle seconds before a keep-alive comment is sent on the event stream
+QUOTE_EVENTS_KEEPALIVE_S = 15.0
+# Concurrent order updates when re-pricing pending orders
+REPRICE_MAX_CONCURRENCY = int(os.getenv("REPRICE_MAX_CONCURRENCY", "8"))
+# Save part dimensions on confirmed orders for build-plate planning; needs
+# order_dimensions_migration.sql on Supabase
+ORDER_DIMENSIONS_ENABLED = os.getenv("ORDER_DIMENSIONS_ENABLED", "false").lower() == "true"
+
+
+# Set once the lifespan has finished starting the app
+startup_state = {"ready": False, "startup_ms": None}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lifespan_started = time.perf_counter()
+    # Orders, storage and auth share one pooled async HTTP client (or the
+    # local SQLite/filesystem backend when DATA_BACKEND=local), created
+    # here rather than at import
+    get_repositories()
+    init_mesh_store()
+    analysis_service.start()
+    job_pool.start()
+    # Signing keys load in the background instead of delaying the first request
+    await token_verifier.start(wait=False)
+    startup_state["startup_ms"] = round((time.perf_counter() - lifespan_started) * 1000, 2)
+    startup_state["ready"] = True
+    yield
+    startup_state["ready"] = False
+    await token_verifier.stop()
+    await job_pool.stop()
+    analysis_service.shutdown()
+    await close_repositories()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend access
 app.add_middleware(
@@ -20,6 +88,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Refuse oversized upload bodies before they are parsed
+app.add_middleware(UploadSizeLimitMiddleware, limits={
+    "/upload": UPLOAD_MAX_BYTES,
+    "/upload/batch": BATCH_MAX_BYTES,
+})
+
+# Outermost, so latency histograms include the other middleware
+app.add_middleware(TimingMiddleware)
+
+async def lookup_user_remotely(token: str) -> Optional[dict]:
+    """Fallback: ask Supabase auth about a token we can't verify locally"""
+    return await get_repositories().auth.get_user(token)
+
+# Access tokens are verified locally (JWT secret / JWKS) with a claims cache
+token_verifier = TokenVerifier.from_env(remote_lookup=lookup_user_remotely)
+
 # Helper function to get current user from authorization header
 async def get_current_user(authorization: Optional[str] = Header(None)) -> Optional[dict]:
     """Extract user info from authorization header (optional)"""
@@ -30,13 +114,11 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> Optio
         # Remove 'Bearer ' prefix if present
         token = authorization.replace('Bearer ', '') if authorization.startswith('Bearer ') else authorization
         
-        # Get user from Supabase auth
-        user_response = supabase.auth.get_user(token)
-        if user_response.user:
-            return {
-                "id": user_response.user.id,
-                "email": user_response.user.email
-            }
+        started = time.perf_counter()
+        try:
+            return await token_verifier.verify(token)
+        finally:
+            record_stage("auth", time.perf_counter() - started)
     except Exception as e:
         print(f"Auth error: {e}")
         # Don't raise error - just return None for guest users
@@ -44,46 +126,252 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> Optio
     
     return None
 
+def stored_mesh_metrics(mesh_path: Optional[str]) -> Optional[dict]:
+    """Metrics saved with an upload's compact mesh, if it was analysed before"""
+    if mesh_path is None or not os.path.exists(mesh_path):
+        return None
+    try:
+        metrics = analyze_mesh_file(mesh_path)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable stored mesh {mesh_path}: {e}")
+        return None
+    mark_used(mesh_path)
+    return metrics
+
+async def analyze_mesh(contents: Union[bytes, memoryview], filename: str, mesh_path: Optional[str],
+                       timings: dict, quote_id: Optional[str] = None) -> dict:
+    """Analyse on the pool and record the parse/metrics stages the analysis reports"""
+    stage_timings = {}
+    metrics = await analysis_service.analyze(contents, filename, mesh_path, stage_timings, quote_id)
+    for stage, milliseconds in stage_timings.items():
+        record_stage(stage, milliseconds / 1000)
+    timings.update(stage_timings)
+    return metrics
+
+async def analyze_upload(contents: Union[bytes, memoryview], filename: str, mesh_path: Optional[str],
+                         timings: dict, quote_id: Optional[str] = None) -> dict:
+    """Run mesh analysis off the event loop, translating overload into HTTP errors"""
+    stored = await asyncio.to_thread(stored_mesh_metrics, mesh_path)
+    if stored is not None:
+        return stored
+    try:
+        return await analyze_mesh(contents, filename, mesh_path, timings, quote_id)
+    except AnalysisBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Quote service is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except AnalysisTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+def schedule_previews(content_hash: str, file_ext: str) -> None:
+    """
+    Decimate an upload's stored mesh into previews on an idle pool worker,
+    once its quote is answered. A dropped job is scheduled again when the
+    previews are asked for.
+    """
+    mesh_path = source_mesh_file(content_hash, file_ext)
+    if mesh_path is None or mesh_path in previews_pending or preview_file(content_hash, file_ext, 0) is not None:
+        return
+    job = analysis_service.submit_background(generate_previews, mesh_path)
+    if job is None:
+        return
+    previews_pending.add(mesh_path)
+
+    def finished(job: asyncio.Future):
+        previews_pending.discard(mesh_path)
+        if not job.cancelled() and job.exception() is not None:
+            print(f"Could not generate previews of {mesh_path}: {job.exception()}")
+
+    job.add_done_callback(finished)
+
+async def store_upload(bucket_name: str, file_name: str,
+                       contents: Union[bytes, memoryview, str]) -> Tuple[str, bool]:
+    """
+    Upload a file (bytes, a memoryview, or a path to stream from) to storage.
+    Returns the public URL and whether this call created the object; an
+    object with the same content-addressed name is reused as-is.
+    """
+    storage = get_repositories().storage
+    created = await storage.upload(bucket_name, file_name, contents)
+    return storage.public_url(bucket_name, file_name), created
+
+async def remove_stored_upload(bucket_name: str, file_name: str) -> None:
+    """Best-effort removal of an uploaded object whose quote failed"""
+    try:
+        await get_repositories().storage.remove(bucket_name, [file_name])
+    except Exception as e:
+        print(f"Storage cleanup error for {file_name}: {e}")
+
+async def timed_stage(timings: dict, stage: str, awaitable):
+    """Await a pipeline stage, recording its wall time in milliseconds and in the stage histogram"""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        elapsed = time.perf_counter() - started
+        timings[stage] = round(elapsed * 1000, 2)
+        record_stage(stage, elapsed)
+
+def bucket_for_extension(original_ext: str) -> str:
+    """Storage bucket for an uploaded file extension"""
+    # Temporary: Use stl-files for all types until other buckets are created
+    if original_ext == 'stl':
+        return "stl-files"
+    elif original_ext == 'obj':
+        return "stl-files"  # Temporary workaround
+    elif original_ext in ['step', 'stp']:
+        return "stl-files"  # Temporary workaround
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Latency histograms per route and per quote pipeline stage, in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Readiness probe. Answers from process state only: it never loads the
+    mesh backends or calls the data store, so it is cheap to poll.
+    """
+    if not startup_state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ok", "startup_ms": startup_state["startup_ms"]}
+
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...),
+                      async_mode: bool = Query(False, alias="async"),
+                      idempotency_key: Optional[str] = Header(None)):
+    """
+    Quote an uploaded file. With ``async=true`` the file is stored, an
+    analysis job is queued and 202 is returned at once; poll
+    GET /quote/{quote_id} or subscribe to /quote/{quote_id}/events.
+    Repeating a request with the same Idempotency-Key returns the same quote;
+    reusing the key for a different file is rejected with 409.
+    """
     # Check if file format is supported
     if not is_supported_format(file.filename):
         raise HTTPException(status_code=400, detail="Only STL, OBJ, and STEP (.stp/.step) files are allowed")
 
-    contents = await file.read()
+    started = time.perf_counter()
+    timings = {}
+    try:
+        # Stream the request in chunks, hashing as it arrives; large files
+        # are spilled to a memory-mapped temp file instead of held as bytes
+        upload = await timed_stage(timings, "read", ingest_upload(file))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    set_labels(file_format=get_file_extension(file.filename), size_bytes=upload.size)
+
+    with upload:
+        if async_mode:
+            return await queue_quote(upload, file.filename, idempotency_key)
+        return await quote_upload(upload, file.filename, timings, started)
+
+async def quote_upload(upload: IngestedUpload, filename: str, timings: dict, started: float,
+                       price: bool = True) -> dict:
+    """Store, analyse and (unless ``price`` is false) price an ingested upload"""
     file_id = str(uuid.uuid4())
     
     # Get original file extension and determine bucket
-    original_ext = file.filename.lower().split('.')[-1]
-    file_name = f"{file_id}.{original_ext}"
-    
-    # Determine bucket based on file type
-    # Temporary: Use stl-files for all types until other buckets are created
-    if original_ext == 'stl':
-        bucket_name = "stl-files"
-    elif original_ext == 'obj':
-        bucket_name = "stl-files"  # Temporary workaround
-    elif original_ext in ['step', 'stp']:
-        bucket_name = "stl-files"  # Temporary workaround
+    original_ext = get_file_extension(filename)
+    # Objects are named by content hash so identical uploads are stored once
+    content_hash = upload.digest
+    file_name = f"{content_hash}.{original_ext}"
+    bucket_name = bucket_for_extension(original_ext)
+
+    quote_cache_key = cache_key(content_hash, original_ext)
+    cached = quote_cache.get(quote_cache_key)
+    if cached is not None:
+        # Same bytes were stored and analysed before
+        file_url = cached["file_url"]
+        metrics = cached["metrics"]
     else:
-        raise HTTPException(status_code=400, detail="Unsupported file format")
+        # Upload to storage while the geometry is analysed, so quote latency
+        # is max(store, parse) rather than the sum. The store task is created
+        # first so its request is sent before a small in-process parse
+        # occupies the event loop.
+        store_task = asyncio.create_task(
+            timed_stage(timings, "store", store_upload(bucket_name, file_name, upload.storage_payload))
+        )
+        analyze_task = asyncio.create_task(
+            timed_stage(timings, "analysis", analyze_upload(upload.view, filename,
+                                                            mesh_store_path(content_hash, original_ext), timings,
+                                                            file_id))
+        )
+        stored, metrics = await asyncio.gather(store_task, analyze_task, return_exceptions=True)
+
+        if isinstance(metrics, BaseException):
+            # Don't leave an orphaned object behind for a quote that never
+            # existed, but keep objects that earlier quotes already share
+            if not isinstance(stored, BaseException) and stored[1]:
+                await remove_stored_upload(bucket_name, file_name)
+            raise metrics
+        if isinstance(stored, BaseException):
+            raise stored
+
+        file_url = stored[0]
+        quote_cache.put(quote_cache_key, {"file_url": file_url, "metrics": metrics})
+
+    schedule_previews(content_hash, original_ext)
+    return build_quote(file_id, file_url, metrics, filename, content_hash, cached is not None, timings, started,
+                       price=price)
+
+def validation_summary(validation: Optional[dict]) -> Optional[dict]:
+    """Validation report without its warnings, which the quote lists separately"""
+    if validation is None:
+        return None
+    return {key: value for key, value in validation.items() if key != "warnings"}
 
-    # Upload to appropriate Supabase Storage bucket
-    storage_response = supabase.storage.from_(bucket_name).upload(file_name, contents)
-    if not storage_response:
-        raise HTTPException(status_code=500, detail="Upload failed")
+def preview_links(previews: Optional[List[dict]], content_hash: str, file_ext: str) -> List[dict]:
+    """Preview levels of an analysed upload with their download URLs, finest first"""
+    return [{**preview, "url": f"/preview/{content_hash}/{file_ext}/{preview['level']}"}
+            for preview in previews or []]
 
-    file_url = supabase.storage.from_(bucket_name).get_public_url(file_name)
+def preview_url(metrics: dict, content_hash: str, file_ext: str) -> Optional[str]:
+    """Where the quote page lists an upload's previews; None if its mesh isn't stored"""
+    if metrics.get("estimated", True) or mesh_store_path(content_hash, file_ext) is None:
+        return None
+    return f"/preview/{content_hash}/{file_ext}"
 
-    # Parse 3D file to get real volume and triangle count
-    volume_mm3, triangle_count, file_format = parse_file(contents, file.filename)
+def build_quote(file_id: str, file_url: str, metrics: dict, filename: str, content_hash: str,
+                cache_hit: bool, timings: dict, started: float, price: bool = True) -> dict:
+    """
+    Price analysed geometry and assemble the quote response. With ``price``
+    false, pricing_options is left as None for the caller to fill in, so a
+    batch can price all of its parts in one pass.
+    """
+    # Real volume, triangle count and bounding box from the (possibly cached) analysis
+    volume_mm3 = metrics["volume_mm3"]
+    triangle_count = metrics["triangle_count"]
+    file_format = metrics["file_format"]
+    # Absent for estimated geometry and for analyses cached before validation existed
+    validation = metrics.get("validation")
     
+    pricing_started = time.perf_counter()
     # Calculate real weight and print time
     weight_g = calculate_weight_from_volume(volume_mm3)
-    print_time_h = estimate_print_time(volume_mm3, triangle_count)
+    if metrics.get("print_time_fdm_h") is not None:
+        # Layer-by-layer estimate from the mesh cross-sections
+        print_time_h = metrics["print_time_fdm_h"]
+        resin_print_time_h = metrics["print_time_resin_h"]
+        print_time_method = "layers"
+    else:
+        print_time_h = estimate_print_time(volume_mm3, triangle_count)
+        resin_print_time_h = estimate_resin_print_time(print_time_h)
+        print_time_method = "volume"
     
     # Calculate pricing for both printer types
-    dual_pricing = calculate_dual_pricing(weight_g, print_time_h)
+    dual_pricing = None
+    if price:
+        dual_pricing = get_pricing_engine().pricing_options(
+            [volume_mm3], {"fdm": [print_time_h], "resin": [resin_print_time_h]})[0]
+    timings["pricing"] = round((time.perf_counter() - pricing_started) * 1000, 2)
+    record_stage("pricing", time.perf_counter() - pricing_started)
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
 
     # Return quote data with both pricing options
     return {
@@ -94,12 +382,245 @@ async def upload_file(file: UploadFile = File(...)):
             "volume_mm3": volume_mm3,
             "volume_cm3": volume_mm3 / 1000,
             "triangle_count": triangle_count,
+            "surface_area_mm2": metrics["surface_area_mm2"],
+            "bounding_box": metrics["bounding_box"],
             "weight_g": weight_g,
             "print_time_h": print_time_h,
+            "print_time_resin_h": resin_print_time_h,
+            "print_time_method": print_time_method,
+            "layer_count": metrics.get("fdm_layers"),
             "material_density": 1.24,  # g/cm³
             "file_format": file_format,
-            "original_filename": file.filename
-        }
+            "original_filename": filename,
+            "mesh_validation": validation_summary(validation),
+        },
+        # Geometry problems that make the quote unreliable, e.g. holes or flipped normals
+        "warnings": validation["warnings"] if validation else [],
+        # Decimated meshes for the quote page to render instead of the original
+        "preview_url": preview_url(metrics, content_hash, get_file_extension(filename)),
+        "content_hash": content_hash,
+        "cache_hit": cache_hit,
+        "timings_ms": timings
+    }
+
+async def queue_quote(upload: IngestedUpload, filename: str, idempotency_key: Optional[str]) -> JSONResponse:
+    """Store an upload and queue its analysis, answering 202 straight away"""
+    original_ext = get_file_extension(filename)
+    file_name = f"{upload.digest}.{original_ext}"
+    bucket_name = bucket_for_extension(original_ext)
+
+    # The stored object is the job's input, so it must exist before queueing
+    file_url, created = await store_upload(bucket_name, file_name, upload.storage_payload)
+    try:
+        job = await job_pool.submit(
+            {
+                "bucket": bucket_name,
+                "object_name": file_name,
+                "file_url": file_url,
+                "filename": filename,
+                "content_hash": upload.digest,
+            },
+            job_id=str(uuid.uuid4()),
+            idempotency_key=idempotency_key,
+            # A retry must send the same file; the object name covers content and format
+            request_hash=file_name,
+        )
+    except IdempotencyConflictError:
+        # The key's own job uses a different object; don't leave this one behind
+        if created:
+            await remove_stored_upload(bucket_name, file_name)
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different file")
+    status_url = f"/quote/{job['id']}"
+    return JSONResponse(
+        status_code=202,
+        content={**quote_status(job), "status_url": status_url, "events_url": f"{status_url}/events"},
+        headers={"Location": status_url},
+    )
+
+async def process_quote_job(job: dict) -> dict:
+    """
+    Analyse and price a queued upload. Safe to run more than once: the
+    analysis is keyed by content hash, so a retried or duplicate job reuses
+    an earlier result instead of parsing again.
+    """
+    payload = job["payload"]
+    filename = payload["filename"]
+    # Stage timings of queued jobs are exported like those of requests
+    with track_operation("quote_job"):
+        set_labels(file_format=get_file_extension(filename))
+        started = time.perf_counter()
+        timings = {}
+        quote_cache_key = cache_key(payload["content_hash"], get_file_extension(filename))
+        mesh_path = mesh_store_path(payload["content_hash"], get_file_extension(filename))
+
+        cached = quote_cache.get(quote_cache_key)
+        if cached is not None:
+            metrics = cached["metrics"]
+        else:
+            # A stored mesh means the file was analysed before, so the original
+            # doesn't need to be downloaded and parsed again
+            metrics = await asyncio.to_thread(stored_mesh_metrics, mesh_path)
+            if metrics is None:
+                contents = await timed_stage(timings, "download", get_repositories().storage.download(
+                    payload["bucket"], payload["object_name"]))
+                # Busy and timeout errors propagate so the job is retried later
+                metrics = await timed_stage(timings, "analysis",
+                                            analyze_mesh(contents, filename, mesh_path, timings, job["id"]))
+            quote_cache.put(quote_cache_key, {"file_url": payload["file_url"], "metrics": metrics})
+
+        schedule_previews(payload["content_hash"], get_file_extension(filename))
+        return build_quote(job["id"], payload["file_url"], metrics, filename, payload["content_hash"],
+                           cached is not None, timings, started)
+
+# Queued quote jobs, persisted in SQLite and processed by asyncio workers
+job_pool = JobWorkerPool.from_env(process_quote_job)
+
+def quote_status(job: dict) -> dict:
+    """Public view of a queued quote job"""
+    status = {
+        "quote_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+    }
+    if job["status"] == "done":
+        status["quote"] = job["result"]
+    elif job["error"]:
+        status["error"] = job["error"]
+    return status
+
+@app.get("/quote/{quote_id}")
+async def get_quote(quote_id: str):
+    """Status of an asynchronous quote, with the quote once it is done"""
+    job = await asyncio.to_thread(job_pool.store.get, quote_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Quote not found")
+    return quote_status(job)
+
+@app.get("/quote/{quote_id}/events")
+async def quote_events(quote_id: str):
+    """Server-sent events with the quote's status until it is done or failed"""
+    # SQLite reads can wait on another process's write lock, so they stay off the event loop
+    if await asyncio.to_thread(job_pool.store.get, quote_id) is None:
+        raise HTTPException(status_code=404, detail="Quote not found")
+
+    async def stream_events():
+        last_state = None
+        idle_s = 0.0
+        while True:
+            job = await asyncio.to_thread(job_pool.store.get, quote_id)
+            state = (job["status"], job["attempts"])
+            if state != last_state:
+                last_state = state
+                idle_s = 0.0
+                yield f"event: status\ndata: {json.dumps(quote_status(job))}\n\n"
+                if job["status"] in FINAL_JOB_STATES:
+                    return
+            elif idle_s >= QUOTE_EVENTS_KEEPALIVE_S:
+                idle_s = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(QUOTE_EVENTS_POLL_S)
+            idle_s += QUOTE_EVENTS_POLL_S
+
+    return StreamingResponse(stream_events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+async def quote_batch_part(filename: str, open_part, limiter: asyncio.Semaphore) -> dict:
+    """Ingest and quote one part of a batch, reporting failures per part"""
+    async with limiter:
+        started = time.perf_counter()
+        timings = {}
+        try:
+            upload = await timed_stage(timings, "read", open_part())
+            with upload:
+                quote = await quote_upload(upload, filename, timings, started, price=False)
+            return {"filename": filename, "status": "ok", **quote}
+        except HTTPException as e:
+            return {"filename": filename, "status": "error", "status_code": e.status_code, "error": e.detail}
+        except UploadTooLargeError as e:
+            return {"filename": filename, "status": "error", "status_code": 413, "error": str(e)}
+        # One failing part must not fail the rest of the batch
+        except AnalysisBusyError as e:
+            return {"filename": filename, "status": "error", "status_code": 503,
+                    "error": "Quote service is busy, please retry shortly", "retry_after": e.retry_after}
+        except AnalysisTimeoutError as e:
+            return {"filename": filename, "status": "error", "status_code": 504, "error": str(e)}
+        except (zipfile.BadZipFile, zlib.error) as e:
+            return {"filename": filename, "status": "error", "status_code": 400,
+                    "error": f"Corrupt archive member: {e}"}
+        except RepositoryError as e:
+            print(f"Storage error for batch part {filename}: {e}")
+            return {"filename": filename, "status": "error", "status_code": 502, "error": "Could not store the file"}
+
+def price_batch_parts(parts: List[dict]) -> None:
+    """Fill in pricing_options for every quoted part of a batch in one vectorised pass"""
+    quoted = [part for part in parts if part["status"] == "ok"]
+    if not quoted:
+        return
+    details = [part["calculation_details"] for part in quoted]
+    options = get_pricing_engine().pricing_options(
+        [detail["volume_mm3"] for detail in details],
+        {
+            "fdm": [detail["print_time_h"] for detail in details],
+            "resin": [detail["print_time_resin_h"] for detail in details],
+        },
+    )
+    for part, part_options in zip(quoted, options):
+        part["pricing_options"] = part_options
+
+@app.post("/upload/batch")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """Quote a multi-part project from several files and/or zip archives"""
+    started = time.perf_counter()
+    set_labels(file_format="batch")
+    # (filename, coroutine factory returning an IngestedUpload)
+    part_sources = []
+    rejected = []
+
+    # Archives, and the zip readers over them, stay open until every member is quoted
+    with ExitStack() as archives:
+        for file in files:
+            if is_zip_archive(file.filename):
+                try:
+                    archive_upload = archives.enter_context(await ingest_upload(file, max_bytes=BATCH_MAX_BYTES))
+                except UploadTooLargeError as e:
+                    raise HTTPException(status_code=413, detail=str(e))
+                try:
+                    archive = archives.enter_context(zipfile.ZipFile(archives.enter_context(archive_upload.open())))
+                except zipfile.BadZipFile:
+                    raise HTTPException(status_code=400, detail=f"{file.filename} is not a valid zip archive")
+                for info in supported_zip_members(archive):
+                    # Members are decompressed chunk by chunk into memory,
+                    # never extracted to disk
+                    part_sources.append((info.filename, partial(ingest_zip_member, archive, info)))
+            elif is_supported_format(file.filename):
+                part_sources.append((file.filename, partial(ingest_upload, file)))
+            else:
+                rejected.append({
+                    "filename": file.filename,
+                    "status": "error",
+                    "status_code": 400,
+                    "error": "Only STL, OBJ, and STEP (.stp/.step) files are allowed",
+                })
+
+        if not part_sources:
+            raise HTTPException(status_code=400, detail="No supported 3D files found in the batch")
+        if len(part_sources) > BATCH_MAX_PARTS:
+            raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_PARTS} parts")
+
+        # Parts are analysed in parallel on the process pool and stored
+        # concurrently, with at most BATCH_MAX_CONCURRENCY in flight
+        limiter = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+        parts = await asyncio.gather(*(
+            quote_batch_part(filename, open_part, limiter) for filename, open_part in part_sources
+        ))
+
+    price_batch_parts(parts)
+    parts = list(parts) + rejected
+    return {
+        "project_id": str(uuid.uuid4()),
+        "parts": parts,
+        "totals": summarize_parts(parts),
+        "timings_ms": {"total": round((time.perf_counter() - started) * 1000, 2)},
     }
 
 @app.post("/confirm-order")
@@ -124,6 +645,12 @@ async def confirm_order(quote_data: dict, current_user: Optional[dict] = Depends
         "price_resin": quote_data.get("price_resin"),
         "estimated_print_time_resin": quote_data.get("estimated_print_time_resin")
     }
+
+    # Part size for build-plate planning, when the columns exist and the
+    # size is known (not for estimated geometry)
+    bounding_box = quote_data["calculation_details"].get("bounding_box") or {}
+    if ORDER_DIMENSIONS_ENABLED and bounding_box.get("size"):
+        order["size_x_mm"], order["size_y_mm"], order["size_z_mm"] = bounding_box["size"]
     
     # Add user information if authenticated
     if current_user:
@@ -135,36 +662,162 @@ async def confirm_order(quote_data: dict, current_user: Optional[dict] = Depends
         order["customer_email"] = quote_data.get("customer_email")
         order["customer_name"] = quote_data.get("customer_name")
 
-    result = supabase.table("orders").insert(order).execute()
+    timings = {}
+    await timed_stage(timings, "db_insert", get_repositories().orders.insert(order))
 
     return {
         "order_id": quote_data["quote_id"],
         "status": "confirmed",
         "message": f"Order confirmed for {printer_type.upper()} printing",
         "printer_type": printer_type,
-        "price": quote_data["price"]
+        "price": quote_data["price"],
+        "timings_ms": timings
+    }
+
+@app.post("/admin/reprice-pending")
+async def reprice_pending_orders(dry_run: bool = Query(False)):
+    """
+    Re-price every pending order against the current rate table, e.g.
+    after editing pricing_rates.json. With ``dry_run`` the new prices are
+    reported but not saved.
+    """
+    repositories = get_repositories()
+    columns = "id,weight_g,print_time_h,estimated_print_time_resin,printer_type,material_type,price_gbp,price_fdm,price_resin"
+    orders = [order async for order in repositories.iter_orders(columns, {"status": "pending"})]
+
+    changes = []
+    current = {order["id"]: order for order in orders}
+    for repriced in reprice_orders(orders):
+        order = current[repriced["id"]]
+        fields = {name: value for name, value in repriced.items()
+                  if name != "id" and order.get(name) != value}
+        if fields:
+            changes.append((repriced["id"], fields))
+
+    if not dry_run:
+        limiter = asyncio.Semaphore(REPRICE_MAX_CONCURRENCY)
+
+        async def save(order_id: str, fields: dict):
+            async with limiter:
+                await repositories.orders.update(order_id, fields)
+
+        await asyncio.gather(*(save(order_id, fields) for order_id, fields in changes))
+
+    return {
+        "rates_version": get_pricing_engine().rates.version,
+        "checked": len(orders),
+        "updated": len(changes),
+        "dry_run": dry_run,
+        "changes": [{"id": order_id, **fields} for order_id, fields in changes],
+    }
+
+@app.get("/admin/build-plan")
+async def build_plan():
+    """
+    Pack every pending order onto FDM and resin build plates and schedule
+    the plates on the printer fleet (printer_fleet.json). Needs the size
+    columns from order_dimensions_migration.sql.
+    """
+    started = time.perf_counter()
+    orders = [order async for order in get_repositories().iter_orders(PLAN_COLUMNS, {"status": "pending"})]
+    # Packing thousands of parts takes a moment, so keep it off the event loop
+    plan = await asyncio.to_thread(plan_build_plates, orders, get_fleet())
+    return {
+        "pending": len(orders),
+        **plan,
+        "timings_ms": {"total": round((time.perf_counter() - started) * 1000, 2)},
     }
 
 @app.get("/order/{order_id}")
-def get_order(order_id: str):
-    response = supabase.table("orders").select("*").eq("id", order_id).single().execute()
-    if response.data:
-        return response.data
+async def get_order(order_id: str):
+    order = await get_repositories().orders.get(order_id)
+    if order:
+        return order
     else:
         raise HTTPException(status_code=404, detail="Order not found")
 
 @app.patch("/order/{order_id}")
-def update_order_status(order_id: str, status: str):
-    response = supabase.table("orders").update({"status": status}).eq("id", order_id).execute()
+async def update_order_status(order_id: str, status: str):
+    await get_repositories().orders.update(order_id, {"status": status})
     return {"message": "Order status updated", "new_status": status}
 
 @app.get("/orders")
-def get_all_orders():
-    response = supabase.table("orders").select("*").execute()
-    return response.data
+async def get_all_orders(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    status: Optional[str] = None,
+    printer_type: Optional[str] = None,
+    user_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    List orders newest first with keyset pagination.
+    Pass next_cursor back as ``cursor`` for the following page; format=ndjson
+    streams every matching order as one JSON object per line.
+    """
+    filters = {
+        "status": status,
+        "printer_type": printer_type,
+        "user_id": user_id,
+        "created_from": created_from.isoformat() if created_from else None,
+        "created_to": created_to.isoformat() if created_to else None,
+    }
+    try:
+        select_clause(fields)
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    repositories = get_repositories()
+    if format == "ndjson":
+        async def stream_rows():
+            async for row in repositories.iter_orders(fields, filters):
+                yield json.dumps(row, default=str) + "\n"
+
+        return StreamingResponse(stream_rows(), media_type="application/x-ndjson")
+
+    return await repositories.orders.list_page(fields, filters, cursor, limit)
+
+@app.get("/preview/{content_hash}/{file_ext}")
+async def get_preview_levels(content_hash: str, file_ext: str):
+    """
+    Preview levels of an upload, finest first, with their URLs. Previews are
+    generated in the background after the quote, so the status stays
+    "pending" until all of them are written.
+    """
+    file_ext = file_ext.lower()
+    previews = list_previews(content_hash, file_ext)
+    mesh_path = source_mesh_file(content_hash, file_ext)
+    if not previews and mesh_path is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    if not previews:
+        schedule_previews(content_hash, file_ext)
+    status = "pending" if not previews or mesh_path in previews_pending else "ready"
+    return {"status": status, "previews": preview_links(previews, content_hash, file_ext)}
+
+@app.get("/preview/{content_hash}/{file_ext}/{level}")
+async def get_preview(content_hash: str, file_ext: str, level: int,
+                      if_none_match: Optional[str] = Header(None)):
+    """
+    Decimated preview of an upload in the compact mesh format. Previews are
+    content-addressed, so they are cached for good and revalidated by ETag;
+    FileResponse answers Range requests.
+    """
+    path = preview_file(content_hash, file_ext.lower(), level)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    etag = f'"{content_hash}-{file_ext.lower()}-{level}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match is not None and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="application/octet-stream", headers=headers)
 
 @app.get("/debug/files")
-def list_storage_files():
+async def list_storage_files():
     """Debug endpoint to list all files across all 3D storage buckets"""
     try:
         buckets = ["stl-files"]  # Temporary: using single bucket
@@ -173,7 +826,7 @@ def list_storage_files():
         
         for bucket in buckets:
             try:
-                files = supabase.storage.from_(bucket).list()
+                files = await get_repositories().storage.list(bucket)
                 file_count = len(files) if files else 0
                 all_files[bucket] = {
                     "file_count": file_count,
@@ -195,19 +848,19 @@ def list_storage_files():
         return {"error": str(e)}
 
 @app.get("/debug/orders-with-files")
-def list_orders_with_file_info():
+async def list_orders_with_file_info():
     """Debug endpoint to show orders with file URL info"""
     try:
-        response = supabase.table("orders").select("id, file_url, created_at").execute()
+        orders, order_count = await get_repositories().orders.sample("id,file_url,created_at", 5)
         return {
-            "order_count": len(response.data) if response.data else 0,
-            "orders": response.data[:5] if response.data else []  # Show first 5 orders
+            "order_count": order_count,
+            "orders": orders  # Show first 5 orders
         }
     except Exception as e:
         return {"error": str(e)}
 
 @app.get("/debug/buckets")
-def check_storage_buckets():
+async def check_storage_buckets():
     """Debug endpoint to check which storage buckets exist"""
     required_buckets = ["stl-files", "obj-files", "step-files"]
     bucket_status = {}
@@ -215,7 +868,7 @@ def check_storage_buckets():
     for bucket in required_buckets:
         try:
             # Try to list files in the bucket to check if it exists
-            files = supabase.storage.from_(bucket).list()
+            files = await get_repositories().storage.list(bucket)
             bucket_status[bucket] = {
                 "exists": True,
                 "file_count": len(files) if files else 0,
@@ -232,4 +885,23 @@ def check_storage_buckets():
         "required_buckets": required_buckets,
         "bucket_status": bucket_status,
         "setup_complete": all(status["exists"] for status in bucket_status.values())
-    }
\ No newline at end of file
+    }
+
+@app.get("/debug/profiles")
+async def list_slow_profiles():
+    """Debug endpoint to list profiles captured from analyses over the latency budget"""
+    profiler = get_profiler()
+    return {
+        "enabled": profiler.enabled,
+        "budget_ms": profiler.budget_s * 1000,
+        "max_files": profiler.max_files,
+        "captures": list_captures(profiler.directory),
+    }
+
+@app.get("/debug/profiles/{name}")
+async def download_slow_profile(name: str):
+    """Debug endpoint to download a captured profile as collapsed stacks"""
+    path = capture_path(name, get_profiler().directory)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
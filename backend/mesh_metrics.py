@@ -0,0 +1,113 @@
+import numpy as np
+from typing import Optional, Sequence, Union
+
+from indexed_mesh import IndexedMesh, iter_triangle_chunks
+
+# Facets processed per batch. Each chunk is promoted to float64, so peak
+# working memory is roughly chunk_size * 9 * 8 bytes per temporary array.
+DEFAULT_CHUNK_SIZE = 262144
+
+TrianglesLike = Union[IndexedMesh, np.ndarray, Sequence[np.ndarray]]
+
+
+def empty_metrics() -> dict:
+    """Metrics for a mesh without any facets."""
+    return {
+        "volume_mm3": 0.0,
+        "signed_volume_mm3": 0.0,
+        "surface_area_mm2": 0.0,
+        "bounding_box": None,
+        "centroid": None,
+        "triangle_count": 0,
+    }
+
+
+def compute_mesh_metrics(triangles: TrianglesLike, chunk_size: Optional[int] = None) -> dict:
+    """
+    Calculate volume, surface area, bounding box and centroid of a mesh.
+
+    Volume uses the divergence theorem: every facet forms a signed tetrahedron
+    with a reference point, and the signed volumes sum to the enclosed volume.
+    All per-facet work is done with batched array operations over chunks of
+    ``chunk_size`` facets so memory stays bounded on very large meshes.
+
+    Args:
+        triangles: IndexedMesh, or (N, 3, 3) array of triangle vertices
+            (or a list of (3, 3) arrays)
+        chunk_size: Number of facets processed per batch
+
+    Returns:
+        Dictionary with volume_mm3, signed_volume_mm3, surface_area_mm2,
+        bounding_box (min/max/size), centroid and triangle_count
+    """
+    if isinstance(triangles, IndexedMesh):
+        triangle_count = len(triangles.faces)
+        if triangle_count == 0:
+            return empty_metrics()
+        first_vertex = triangles.vertices[triangles.faces[0, 0]]
+    else:
+        triangles = np.asarray(triangles)
+        if triangles.size == 0:
+            return empty_metrics()
+        if triangles.ndim != 3 or triangles.shape[1:] != (3, 3):
+            raise ValueError(f"Expected an (N, 3, 3) triangle array, got shape {triangles.shape}")
+        triangle_count = len(triangles)
+        first_vertex = triangles[0, 0]
+
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+
+    # Work relative to the first vertex to keep float32 inputs precise
+    origin = first_vertex.astype(np.float64)
+
+    signed_volume = 0.0
+    surface_area = 0.0
+    volume_moment = np.zeros(3)
+    area_moment = np.zeros(3)
+    bbox_min = np.full(3, np.inf)
+    bbox_max = np.full(3, -np.inf)
+
+    for chunk in iter_triangle_chunks(triangles, chunk_size):
+        chunk = chunk.astype(np.float64) - origin
+        v0 = chunk[:, 0]
+        v1 = chunk[:, 1]
+        v2 = chunk[:, 2]
+
+        normals = np.cross(v1 - v0, v2 - v0)
+        areas = 0.5 * np.sqrt(np.einsum('ij,ij->i', normals, normals))
+        # Signed volume of the tetrahedron (origin, v0, v1, v2)
+        tet_volumes = np.einsum('ij,ij->i', v0, np.cross(v1, v2)) / 6.0
+        facet_sums = v0 + v1 + v2
+
+        signed_volume += tet_volumes.sum()
+        surface_area += areas.sum()
+        # Tetrahedron centroid is (v0 + v1 + v2) / 4 with the origin at zero
+        volume_moment += tet_volumes @ facet_sums / 4.0
+        area_moment += areas @ facet_sums / 3.0
+
+        flat = chunk.reshape(-1, 3)
+        bbox_min = np.minimum(bbox_min, flat.min(axis=0))
+        bbox_max = np.maximum(bbox_max, flat.max(axis=0))
+
+    # Fall back to the surface centroid for open or degenerate meshes
+    if abs(signed_volume) > 1e-12:
+        centroid = volume_moment / signed_volume
+    elif surface_area > 0:
+        centroid = area_moment / surface_area
+    else:
+        centroid = (bbox_min + bbox_max) / 2.0
+
+    bbox_min += origin
+    bbox_max += origin
+
+    return {
+        "volume_mm3": float(abs(signed_volume)),
+        "signed_volume_mm3": float(signed_volume),
+        "surface_area_mm2": float(surface_area),
+        "bounding_box": {
+            "min": bbox_min.tolist(),
+            "max": bbox_max.tolist(),
+            "size": (bbox_max - bbox_min).tolist(),
+        },
+        "centroid": (centroid + origin).tolist(),
+        "triangle_count": int(triangle_count),
+    }
@@ -0,0 +1,171 @@
+import os
+import re
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from indexed_mesh import IndexedMesh
+from mesh_store import (mesh_store_path, prune_mesh_store_if_due, read_mesh_file, read_mesh_metrics,
+                        write_mesh_file)
+
+# Face budgets of the preview levels, finest first; empty disables previews
+PREVIEW_FACE_COUNTS = tuple(sorted(
+    (int(count) for count in os.getenv("PREVIEW_FACE_COUNTS", "100000,20000,2000").split(",") if count.strip()),
+    reverse=True,
+))
+
+# Clustering passes per level before settling for a result over budget
+_MAX_PASSES = 4
+# Finest grid per axis, which keeps the packed cell keys within int64
+_MAX_CELLS_PER_AXIS = 2 ** 20
+_CONTENT_HASH = re.compile(r"^[0-9a-f]{16,128}$")
+
+
+def _surface_area(vertices: np.ndarray, faces: np.ndarray) -> float:
+    a, b, c = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    return float(np.linalg.norm(np.cross(b - a, c - a), axis=1).sum() / 2)
+
+
+def cluster_vertices(mesh: IndexedMesh, cell_size: float) -> IndexedMesh:
+    """
+    Merge the vertices in each cube of a ``cell_size`` grid into their mean.
+
+    Faces whose corners end up in fewer than three cells are dropped, and
+    faces collapsed onto the same three cells are kept once.
+    """
+    vertices = np.asarray(mesh.vertices, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(mesh.faces, dtype=np.int64).reshape(-1, 3)
+    if len(faces) == 0:
+        return mesh
+
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, cluster, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    cluster = cluster.reshape(-1)
+    positions = np.stack([np.bincount(cluster, weights=vertices[:, axis]) for axis in range(3)], axis=1)
+    positions /= counts[:, None]
+
+    clustered = cluster[faces]
+    keep = ((clustered[:, 0] != clustered[:, 1]) & (clustered[:, 1] != clustered[:, 2])
+            & (clustered[:, 0] != clustered[:, 2]))
+    clustered = clustered[keep]
+    if len(clustered) == 0:
+        return IndexedMesh(np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.int32))
+    _, first = np.unique(np.sort(clustered, axis=1), axis=0, return_index=True)
+    clustered = clustered[np.sort(first)]
+
+    # Renumber the clusters that are still used by a face
+    used, remapped = np.unique(clustered, return_inverse=True)
+    return IndexedMesh(positions[used].astype(np.float32), remapped.reshape(-1, 3).astype(np.int32))
+
+
+def decimate(mesh: IndexedMesh, target_faces: int) -> IndexedMesh:
+    """
+    Vertex-clustering decimation to about ``target_faces`` faces.
+
+    The grid size starts from the surface area (a surface cut into square
+    cells keeps about two triangles per cell) and is coarsened while the
+    result is over budget. Meshes already within budget are returned as-is.
+    """
+    if len(mesh.faces) <= target_faces:
+        return mesh
+
+    vertices = np.asarray(mesh.vertices, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(mesh.faces).reshape(-1, 3)
+    extent = float((vertices.max(axis=0) - vertices.min(axis=0)).max())
+    min_cell = max(extent, 1e-9) / _MAX_CELLS_PER_AXIS
+    area = _surface_area(vertices, faces)
+    cell_size = np.sqrt(2 * area / target_faces) if area > 0 else extent / np.sqrt(target_faces)
+
+    result = mesh
+    for _ in range(_MAX_PASSES):
+        result = cluster_vertices(mesh, max(cell_size, min_cell))
+        if len(result.faces) <= target_faces:
+            break
+        cell_size *= 1.05 * np.sqrt(len(result.faces) / target_faces)
+    return result
+
+
+def preview_path(mesh_path: str, level: int) -> str:
+    """Previews are stored next to the upload's analysed mesh, so they share its content-hash key."""
+    return f"{os.path.splitext(mesh_path)[0]}.lod{level}.mesh"
+
+
+def write_previews(mesh: IndexedMesh, mesh_path: str,
+                   face_counts: Sequence[int] = PREVIEW_FACE_COUNTS) -> List[dict]:
+    """
+    Write decimated copies of ``mesh`` at each of ``face_counts`` (finest
+    first), with quantised vertices. Each level is decimated from the one
+    before it, and a level no smaller than the previous one is skipped, so
+    a small mesh gets a single level holding all of its faces.
+
+    Returns ``{level, face_count, vertex_count, size_bytes}`` per level written.
+    """
+    previews = []
+    current = mesh
+    for target in face_counts:
+        current = decimate(current, target)
+        if previews and len(current.faces) >= previews[-1]["face_count"]:
+            continue
+        level = len(previews)
+        path = preview_path(mesh_path, level)
+        preview = {"level": level, "face_count": len(current.faces), "vertex_count": len(current.vertices)}
+        write_mesh_file(path, current, {"source_face_count": len(mesh.faces), **preview}, quantize=True)
+        preview["size_bytes"] = os.path.getsize(path)
+        previews.append(preview)
+    return previews
+
+
+def generate_previews(mesh_path: str, face_counts: Sequence[int] = PREVIEW_FACE_COUNTS) -> List[dict]:
+    """
+    write_previews for a mesh in the store. The stored mesh is already
+    welded, so this runs as a background job after the quote instead of
+    adding decimation to its latency.
+    """
+    previews = write_previews(read_mesh_file(mesh_path).mesh, mesh_path, face_counts)
+    # Previews count towards the store's size limit like the mesh itself
+    prune_mesh_store_if_due()
+    return previews
+
+
+def _store_path(content_hash: str, file_ext: str) -> Optional[str]:
+    """mesh_store_path for names from a request, or None if they aren't valid (no path traversal)."""
+    if _CONTENT_HASH.match(content_hash) is None or not file_ext.isalnum():
+        return None
+    return mesh_store_path(content_hash, file_ext)
+
+
+def source_mesh_file(content_hash: str, file_ext: str) -> Optional[str]:
+    """Path of the stored mesh that previews are made from, or None if there isn't one."""
+    mesh_path = _store_path(content_hash, file_ext)
+    return mesh_path if mesh_path is not None and os.path.isfile(mesh_path) else None
+
+
+def preview_file(content_hash: str, file_ext: str, level: int) -> Optional[str]:
+    """Path of a stored preview, or None if there isn't one."""
+    mesh_path = _store_path(content_hash, file_ext)
+    if mesh_path is None or level < 0:
+        return None
+    path = preview_path(mesh_path, level)
+    return path if os.path.isfile(path) else None
+
+
+def list_previews(content_hash: str, file_ext: str) -> List[dict]:
+    """
+    The stored previews of an upload, finest first, as returned by
+    write_previews. Only the file headers are read.
+    """
+    previews = []
+    for level in range(len(PREVIEW_FACE_COUNTS)):
+        path = preview_file(content_hash, file_ext, level)
+        if path is None:
+            break
+        try:
+            metrics = read_mesh_metrics(path)
+            size_bytes = os.path.getsize(path)
+        except (OSError, ValueError):
+            break
+        previews.append({"level": level, "face_count": metrics.get("face_count"),
+                         "vertex_count": metrics.get("vertex_count"), "size_bytes": size_bytes})
+    return previews
@@ -0,0 +1,236 @@
+import json
+import os
+import struct
+import tempfile
+import time
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+
+from indexed_mesh import IndexedMesh
+
+# Analysed meshes, written once at upload time and keyed by content hash;
+# empty disables the store
+MESH_STORE_DIR = os.getenv("MESH_STORE_DIR", os.path.join(tempfile.gettempdir(), "mesh_store"))
+# Store vertices as uint16 steps across the bounding box (about 1.5 µm on a
+# 200 mm part) instead of float32
+MESH_STORE_QUANTIZE = os.getenv("MESH_STORE_QUANTIZE", "false").lower() == "true"
+# Least recently used uploads are pruned beyond this many bytes
+MESH_STORE_MAX_BYTES = int(os.getenv("MESH_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Each process scans the store for pruning at most this often
+MESH_STORE_PRUNE_INTERVAL_S = float(os.getenv("MESH_STORE_PRUNE_INTERVAL_S", "60"))
+
+# File layout, little-endian:
+#   header: magic, version, flags, vertex count, face count, metrics length,
+#           dequantisation scale (3 x f64) and offset (3 x f64)
+#   metrics: UTF-8 JSON, padded to a 16-byte boundary
+#   vertices: (V, 3) float32, or uint16 when quantised, padded to 16 bytes
+#   faces: (F, 3) uint32
+MESH_MAGIC = b"PMSH"
+MESH_VERSION = 1
+_HEADER = struct.Struct("<4sHHIII6d")
+_FLAG_QUANTIZED = 1
+_ALIGNMENT = 16
+_QUANTIZED_STEPS = 65535
+
+
+class StoredMesh(NamedTuple):
+    """
+    A mesh read from the compact format.
+
+    mesh: IndexedMesh whose arrays map the file (or buffer) without copying,
+        except for quantised vertices, which are expanded to float32
+    metrics: analyze_file metrics saved with the mesh; empty if none were
+    """
+    mesh: IndexedMesh
+    metrics: dict
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_mesh_file(path: str, mesh: IndexedMesh, metrics: Optional[dict] = None,
+                    quantize: bool = MESH_STORE_QUANTIZE) -> None:
+    """
+    Write a mesh and its metrics in the compact format.
+
+    The file is written next to ``path`` and renamed into place, so readers
+    never see a partial file.
+    """
+    vertices = np.asarray(mesh.vertices, dtype=np.float64).reshape(-1, 3)
+    faces = np.ascontiguousarray(mesh.faces, dtype='<u4').reshape(-1, 3)
+    metrics_json = json.dumps(metrics or {}).encode('utf-8')
+
+    flags = 0
+    scale = np.ones(3)
+    offset = np.zeros(3)
+    if quantize and len(vertices):
+        flags |= _FLAG_QUANTIZED
+        offset = vertices.min(axis=0)
+        size = vertices.max(axis=0) - offset
+        scale = np.where(size > 0, size / _QUANTIZED_STEPS, 1.0)
+        vertex_data = np.round((vertices - offset) / scale).astype('<u2')
+    else:
+        vertex_data = vertices.astype('<f4')
+
+    header = _HEADER.pack(MESH_MAGIC, MESH_VERSION, flags, len(vertices), len(faces), len(metrics_json),
+                          *scale, *offset)
+    metrics_end = _HEADER.size + len(metrics_json)
+    vertices_end = _aligned(metrics_end) + vertex_data.nbytes
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle = tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False)
+    try:
+        with handle:
+            handle.write(header)
+            handle.write(metrics_json)
+            handle.write(b"\0" * (_aligned(metrics_end) - metrics_end))
+            handle.write(vertex_data.tobytes())
+            handle.write(b"\0" * (_aligned(vertices_end) - vertices_end))
+            handle.write(faces.tobytes())
+        os.replace(handle.name, path)
+    except BaseException:
+        os.unlink(handle.name)
+        raise
+
+
+def _read(size: int, header_bytes: bytes, array_reader) -> StoredMesh:
+    if len(header_bytes) < _HEADER.size:
+        raise ValueError("Truncated mesh file")
+    magic, version, flags, vertex_count, face_count, metrics_length, *transform = _HEADER.unpack_from(header_bytes)
+    if magic != MESH_MAGIC or version != MESH_VERSION:
+        raise ValueError(f"Not a version {MESH_VERSION} mesh file")
+
+    quantized = bool(flags & _FLAG_QUANTIZED)
+    vertex_dtype = np.dtype('<u2' if quantized else '<f4')
+    vertices_offset = _aligned(_HEADER.size + metrics_length)
+    faces_offset = _aligned(vertices_offset + vertex_count * 3 * vertex_dtype.itemsize)
+    expected = faces_offset + face_count * 12
+    if size != expected:
+        raise ValueError(f"Mesh file is {size} bytes, expected {expected}")
+
+    metrics = json.loads(bytes(array_reader(np.uint8, _HEADER.size, metrics_length)) or b"{}")
+    vertices = array_reader(vertex_dtype, vertices_offset, vertex_count * 3).reshape(-1, 3)
+    faces = array_reader(np.dtype('<u4'), faces_offset, face_count * 3).reshape(-1, 3)
+    if quantized:
+        scale, offset = np.array(transform[:3]), np.array(transform[3:])
+        vertices = (vertices * scale + offset).astype(np.float32)
+    return StoredMesh(IndexedMesh(vertices, faces), metrics)
+
+
+def read_mesh_file(path: str) -> StoredMesh:
+    """Memory-map a compact mesh file; the arrays stay valid after the file is replaced."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as handle:
+        header_bytes = handle.read(_HEADER.size)
+
+    def array_reader(dtype, offset, count):
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+    return _read(size, header_bytes, array_reader)
+
+
+def read_mesh_metrics(path: str) -> dict:
+    """The metrics saved in a compact mesh file, without reading its arrays."""
+    with open(path, "rb") as handle:
+        header_bytes = handle.read(_HEADER.size)
+        if len(header_bytes) < _HEADER.size:
+            raise ValueError("Truncated mesh file")
+        magic, version, _flags, _vertex_count, _face_count, metrics_length, *_ = _HEADER.unpack(header_bytes)
+        if magic != MESH_MAGIC or version != MESH_VERSION:
+            raise ValueError(f"Not a version {MESH_VERSION} mesh file")
+        return json.loads(handle.read(metrics_length) or b"{}")
+
+
+def parse_mesh_bytes(data: Union[bytes, memoryview]) -> StoredMesh:
+    """Read compact mesh content that is already in memory, without copying it."""
+    def array_reader(dtype, offset, count):
+        return np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+
+    return _read(len(data), bytes(data[:_HEADER.size]), array_reader)
+
+
+def mesh_store_path(content_hash: str, file_ext: str) -> Optional[str]:
+    """
+    Where the analysed mesh of an upload is stored, or None if the store is
+    disabled. The extension is part of the name because it selects the parser.
+    The directory is created by init_mesh_store at startup.
+    """
+    if not MESH_STORE_DIR:
+        return None
+    return os.path.join(MESH_STORE_DIR, f"{content_hash}.{file_ext.lower()}.mesh")
+
+
+def init_mesh_store() -> None:
+    """Create the store directory and prune it to its size limit."""
+    if MESH_STORE_DIR:
+        os.makedirs(MESH_STORE_DIR, exist_ok=True)
+        prune_mesh_store()
+
+
+def mark_used(path: str) -> None:
+    """Record a read of a stored mesh, so pruning keeps it as recently used."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_mesh_store(directory: Optional[str] = None, max_bytes: Optional[int] = None) -> int:
+    """
+    Delete the least recently used uploads until the store fits in
+    ``max_bytes``. An upload's files (its mesh and any previews, which
+    share the content-hash prefix) are kept or deleted together and are
+    as recent as the newest of them. Returns the number of files deleted.
+    """
+    directory = directory if directory is not None else MESH_STORE_DIR
+    max_bytes = max_bytes if max_bytes is not None else MESH_STORE_MAX_BYTES
+    if not directory or not os.path.isdir(directory):
+        return 0
+
+    # content hash -> [newest mtime, total bytes, paths]
+    uploads = {}
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".mesh") or not entry.is_file():
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        upload = uploads.setdefault(entry.name.split(".", 1)[0], [0.0, 0, []])
+        upload[0] = max(upload[0], stat.st_mtime)
+        upload[1] += stat.st_size
+        upload[2].append(entry.path)
+
+    removed = 0
+    total = sum(upload[1] for upload in uploads.values())
+    for _, size, paths in sorted(uploads.values(), key=lambda upload: upload[0]):
+        if total <= max_bytes:
+            break
+        for path in paths:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        total -= size
+    return removed
+
+
+_last_pruned = 0.0
+
+
+def prune_mesh_store_if_due() -> None:
+    """prune_mesh_store at most every MESH_STORE_PRUNE_INTERVAL_S in this process."""
+    global _last_pruned
+    now = time.monotonic()
+    if now - _last_pruned < MESH_STORE_PRUNE_INTERVAL_S:
+        return
+    _last_pruned = now
+    try:
+        prune_mesh_store()
+    except OSError as e:
+        print(f"Could not prune mesh store: {e}")
@@ -0,0 +1,203 @@
+import os
+import numpy as np
+from typing import Optional, Tuple
+
+from indexed_mesh import IndexedMesh
+from mesh_metrics import TrianglesLike, compute_mesh_metrics
+
+# Vertices closer than this (per axis, after rounding) are treated as one
+DEFAULT_WELD_TOLERANCE_MM = float(os.getenv("MESH_WELD_TOLERANCE_MM", "0.0001"))
+
+# Large primes for the spatial hash of quantised coordinates
+_HASH_PRIMES = np.array([73856093, 19349663, 83492791], dtype=np.int64)
+
+
+def weld_vertices(vertices: np.ndarray, faces: np.ndarray,
+                  tolerance_mm: float = DEFAULT_WELD_TOLERANCE_MM) -> IndexedMesh:
+    """
+    Merge vertices that share a position once rounded to ``tolerance_mm``.
+
+    Quantised coordinates are hashed to one int64 per vertex so the merge is
+    a single 1-D sort. Hash collisions are detected and, if any occur, the
+    merge is redone exactly on the quantised coordinates.
+
+    Args:
+        vertices: (V, 3) vertex positions
+        faces: (F, 3) vertex indices per triangle
+        tolerance_mm: Quantisation step
+
+    Returns:
+        IndexedMesh with the merged vertices and re-indexed faces
+    """
+    quantized = np.round(np.asarray(vertices, dtype=np.float64) / tolerance_mm).astype(np.int64)
+    # Multiplication wraps around in int64, which is fine for a hash
+    keys = quantized[:, 0] * _HASH_PRIMES[0]
+    keys ^= quantized[:, 1] * _HASH_PRIMES[1]
+    keys ^= quantized[:, 2] * _HASH_PRIMES[2]
+
+    # Same result as np.unique(keys, return_index=True, return_inverse=True),
+    # at a fraction of the cost
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    is_first = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+    first_index = order[is_first]
+    inverse = np.empty(len(keys), dtype=np.int32)
+    inverse[order] = np.cumsum(is_first, dtype=np.int32) - 1
+
+    if np.any(quantized[first_index[inverse]] != quantized):
+        _, first_index, inverse = np.unique(quantized, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1).astype(np.int32)
+
+    return IndexedMesh(np.asarray(vertices)[first_index], inverse[np.asarray(faces)])
+
+
+def _as_vertices_and_faces(triangles: TrianglesLike) -> Tuple[np.ndarray, np.ndarray]:
+    if isinstance(triangles, IndexedMesh):
+        return triangles.vertices, triangles.faces
+    triangles = np.asarray(triangles)
+    # A triangle soup: every corner is its own vertex until welded
+    return triangles.reshape(-1, 3), np.arange(len(triangles) * 3, dtype=np.int32).reshape(-1, 3)
+
+
+def edge_usage(faces: np.ndarray, vertex_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    How often each undirected edge is used, and in which directions.
+
+    Every directed edge (a, b) gets the key min(a, b) * V + max(a, b), shifted
+    left one bit with the low bit set when a < b. One plain sort of these
+    keys groups the uses of each edge together, and the low bits count how
+    many of them run forwards.
+
+    Returns:
+        (counts, direction_sums): per unique edge, the number of faces using
+        it and the sum of their directions. A correctly oriented manifold
+        edge has count 2 and direction sum 0.
+    """
+    if len(faces) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    start = faces.reshape(-1).astype(np.int64)
+    end = faces[:, [1, 2, 0]].reshape(-1).astype(np.int64)
+    keys = (np.minimum(start, end) * vertex_count + np.maximum(start, end)) << 1
+    keys |= start < end
+    keys.sort()
+
+    edges = keys >> 1
+    edge_starts = np.flatnonzero(np.concatenate(([True], edges[1:] != edges[:-1])))
+    counts = np.diff(np.append(edge_starts, len(keys)))
+    forward = np.add.reduceat(keys & 1, edge_starts)
+    return counts, 2 * forward - counts
+
+
+def validate_mesh(triangles: TrianglesLike,
+                  metrics: Optional[dict] = None,
+                  tolerance_mm: float = DEFAULT_WELD_TOLERANCE_MM) -> dict:
+    """validate_mesh_welded without the welded mesh."""
+    return validate_mesh_welded(triangles, metrics, tolerance_mm)[1]
+
+
+def validate_mesh_welded(triangles: TrianglesLike,
+                         metrics: Optional[dict] = None,
+                         tolerance_mm: float = DEFAULT_WELD_TOLERANCE_MM) -> Tuple[IndexedMesh, dict]:
+    """
+    Check that a mesh encloses a printable solid.
+
+    The mesh is welded first, so triangle soups (STL) are checked the same
+    way as indexed meshes. Then every edge should be shared by exactly two
+    faces that traverse it in opposite directions, and the signed volume
+    should be positive and fit inside the bounding box.
+
+    Args:
+        triangles: IndexedMesh, or (N, 3, 3) array of triangle vertices
+        metrics: compute_mesh_metrics result for the mesh, if already known
+        tolerance_mm: Weld tolerance
+
+    Returns:
+        (welded mesh, report). The report is a dictionary of counts and
+        flags (watertight, consistently_oriented, inverted,
+        volume_plausible) plus a list of ``warnings``, each {"code", "message"}
+    """
+    vertices, faces = _as_vertices_and_faces(triangles)
+    if metrics is None:
+        metrics = compute_mesh_metrics(triangles)
+
+    if len(faces) == 0:
+        return IndexedMesh(vertices, faces), {
+            "vertex_count": 0,
+            "merged_vertices": 0,
+            "degenerate_faces": 0,
+            "edge_count": 0,
+            "boundary_edges": 0,
+            "non_manifold_edges": 0,
+            "inconsistent_edges": 0,
+            "watertight": False,
+            "consistently_oriented": False,
+            "inverted": False,
+            "volume_plausible": False,
+            "warnings": [{"code": "empty_mesh", "message": "The file contains no triangles"}],
+        }
+
+    welded = weld_vertices(vertices, faces, tolerance_mm)
+    welded_faces = welded.faces
+    degenerate = ((welded_faces[:, 0] == welded_faces[:, 1]) |
+                  (welded_faces[:, 1] == welded_faces[:, 2]) |
+                  (welded_faces[:, 2] == welded_faces[:, 0]))
+    counts, direction_sums = edge_usage(welded_faces[~degenerate], len(welded.vertices))
+
+    boundary_edges = int(np.count_nonzero(counts == 1))
+    non_manifold_edges = int(np.count_nonzero(counts > 2))
+    inconsistent_edges = int(np.count_nonzero((counts == 2) & (direction_sums != 0)))
+    degenerate_faces = int(np.count_nonzero(degenerate))
+
+    signed_volume = metrics["signed_volume_mm3"]
+    bounding_box = metrics["bounding_box"]
+    bbox_volume = float(np.prod(bounding_box["size"])) if bounding_box else 0.0
+    volume_plausible = 0.0 < abs(signed_volume) <= bbox_volume * (1.0 + 1e-6)
+
+    warnings = []
+    if boundary_edges:
+        warnings.append({
+            "code": "open_mesh",
+            "message": f"{boundary_edges} edges belong to only one face; the mesh has holes "
+                       f"and its volume may be wrong",
+        })
+    if non_manifold_edges:
+        warnings.append({
+            "code": "non_manifold",
+            "message": f"{non_manifold_edges} edges are shared by more than two faces "
+                       f"(overlapping or duplicated shells)",
+        })
+    if inconsistent_edges:
+        warnings.append({
+            "code": "inconsistent_orientation",
+            "message": f"{inconsistent_edges} edges join faces with opposite orientation (flipped normals)",
+        })
+    if signed_volume < 0:
+        warnings.append({
+            "code": "inverted_normals",
+            "message": "Normals point inwards; the part was measured as if turned inside out",
+        })
+    if not volume_plausible:
+        warnings.append({
+            "code": "implausible_volume",
+            "message": "Enclosed volume is zero or larger than the bounding box",
+        })
+    if degenerate_faces:
+        warnings.append({
+            "code": "degenerate_faces",
+            "message": f"{degenerate_faces} faces collapse to a line or point",
+        })
+
+    return welded, {
+        "vertex_count": len(welded.vertices),
+        "merged_vertices": len(vertices) - len(welded.vertices),
+        "degenerate_faces": degenerate_faces,
+        "edge_count": len(counts),
+        "boundary_edges": boundary_edges,
+        "non_manifold_edges": non_manifold_edges,
+        "inconsistent_edges": inconsistent_edges,
+        "watertight": boundary_edges == 0 and non_manifold_edges == 0,
+        "consistently_oriented": inconsistent_edges == 0,
+        "inverted": signed_volume < 0,
+        "volume_plausible": volume_plausible,
+        "warnings": warnings,
+    }
@@ -0,0 +1,210 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Requests (and queued jobs) slower than this are logged as one JSON line
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+
+# Histogram upper bounds in seconds, from a cache hit to a large STEP file
+DEFAULT_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Upload size label: (exclusive upper bound in bytes, label)
+SIZE_BUCKETS = (
+    (100 * 1024, "lt_100kb"),
+    (1024 * 1024, "100kb_1mb"),
+    (10 * 1024 * 1024, "1mb_10mb"),
+    (100 * 1024 * 1024, "10mb_100mb"),
+)
+
+slow_request_logger = logging.getLogger("quote.slow_requests")
+
+
+def size_bucket(size_bytes: int) -> str:
+    """Coarse size label, so histograms keep a bounded number of series."""
+    for upper_bound, label in SIZE_BUCKETS:
+        if size_bytes < upper_bound:
+            return label
+    return "gte_100mb"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus text exposition format.
+
+    Each observation is a bisect and two additions under a lock, cheap
+    enough for every request. Label values are positional, in the order of
+    ``label_names``.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS_S):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in sorted(self._series.items())]
+        for label_values, counts, total in snapshot:
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bound = "+Inf" if upper_bound == float("inf") else f"{upper_bound:g}"
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the response headers.",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "quote_stage_duration_seconds",
+    "Time spent in each quote pipeline stage.",
+    ("route", "stage", "file_format", "size_bucket"),
+)
+HISTOGRAMS = (REQUEST_SECONDS, STAGE_SECONDS)
+
+
+def render_metrics() -> str:
+    """All histograms in the Prometheus text format, for GET /metrics."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+class _Operation:
+    """Stage timings and labels collected while one request or job runs."""
+    __slots__ = ("labels", "stages")
+
+    def __init__(self):
+        self.labels: Dict[str, str] = {}
+        self.stages: Dict[str, float] = {}
+
+
+_current_operation: ContextVar[Optional[_Operation]] = ContextVar("current_operation", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """
+    Add time spent in a pipeline stage to the current request or job.
+    Concurrent calls for the same stage (batch parts) add up. Outside a
+    tracked request or job this does nothing.
+    """
+    operation = _current_operation.get()
+    if operation is not None:
+        operation.stages[stage] = operation.stages.get(stage, 0.0) + seconds
+
+
+def set_labels(file_format: Optional[str] = None, size_bytes: Optional[int] = None) -> None:
+    """Label the current request's stage histograms with the upload's format and size."""
+    operation = _current_operation.get()
+    if operation is None:
+        return
+    if file_format is not None:
+        operation.labels["file_format"] = file_format.lower()
+    if size_bytes is not None:
+        operation.labels["size_bucket"] = size_bucket(size_bytes)
+
+
+def _finish(operation: _Operation, route: str, seconds: float, extra: dict) -> None:
+    file_format = operation.labels.get("file_format", "none")
+    size_label = operation.labels.get("size_bucket", "none")
+    for stage, stage_seconds in operation.stages.items():
+        STAGE_SECONDS.observe(stage_seconds, route, stage, file_format, size_label)
+
+    if seconds * 1000 >= SLOW_REQUEST_MS:
+        slow_request_logger.warning(json.dumps({
+            "event": "slow_request",
+            "route": route,
+            "duration_ms": round(seconds * 1000, 2),
+            "stages_ms": {stage: round(value * 1000, 2) for stage, value in operation.stages.items()},
+            **operation.labels,
+            **extra,
+        }))
+
+
+@contextmanager
+def track_operation(name: str):
+    """Collect stage timings for work outside a request, e.g. a queued quote job."""
+    operation = _Operation()
+    token = _current_operation.set(operation)
+    started = time.perf_counter()
+    try:
+        yield operation
+    finally:
+        _current_operation.reset(token)
+        _finish(operation, name, time.perf_counter() - started, {})
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware that times every HTTP request.
+
+    Latency is measured to the start of the response, so streamed bodies
+    (NDJSON exports, server-sent events) don't count as slow. Stages
+    recorded by the handler are observed with the route template (not the
+    raw path) as label, and slow requests are logged with their stages.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        operation = _Operation()
+        token = _current_operation.set(operation)
+        started = time.perf_counter()
+        response = {"status": 500, "seconds": None}
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["seconds"] = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _current_operation.reset(token)
+            seconds = response["seconds"]
+            if seconds is None:
+                seconds = time.perf_counter() - started
+            # FastAPI stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(seconds, scope["method"], route, str(response["status"]))
+            _finish(operation, route, seconds, {"method": scope["method"], "status": response["status"]})
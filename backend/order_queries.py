@@ -0,0 +1,107 @@
+import base64
+import json
+from typing import List, Optional, Tuple
+
+# Columns of the orders table that clients may project
+ORDER_COLUMNS = [
+    "id", "file_url", "weight_g", "print_time_h", "price_gbp", "printer_type",
+    "material_type", "status", "created_at", "price_fdm", "price_resin",
+    "estimated_print_time_resin", "user_id", "customer_email", "customer_name",
+]
+# Columns that only some databases have, so they are selected when requested
+# and never by default: delivery_address (auth_database_setup.sql; no order
+# writes it) and the part size (order_dimensions_migration.sql, build planning)
+OPTIONAL_ORDER_COLUMNS = ["delivery_address", "size_x_mm", "size_y_mm", "size_z_mm"]
+# Keyset columns, always selected so the next cursor can be built
+CURSOR_COLUMNS = ["created_at", "id"]
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at: str, order_id: str) -> str:
+    """Opaque cursor pointing just past the given (created_at, id) row."""
+    raw = json.dumps([created_at, order_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Inverse of encode_cursor.
+
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return str(created_at), str(order_id)
+
+
+def select_clause(fields: Optional[str]) -> str:
+    """
+    PostgREST select list for a comma-separated ``fields`` parameter.
+
+    Raises:
+        ValueError: If a requested column does not exist
+    """
+    if not fields:
+        return ",".join(ORDER_COLUMNS)
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in ORDER_COLUMNS + OPTIONAL_ORDER_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown order fields: {', '.join(unknown)}")
+    columns = requested + [column for column in CURSOR_COLUMNS if column not in requested]
+    return ",".join(columns)
+
+
+def _quote(value: str) -> str:
+    """Quote a value for use inside a PostgREST or() filter."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def orders_query_params(select: str, filters: dict, cursor: Optional[str], limit: int) -> List[Tuple[str, str]]:
+    """
+    PostgREST query parameters for one page of orders.
+
+    Rows are ordered newest first by (created_at, id); the cursor selects rows
+    strictly after the last row of the previous page. One extra row is
+    requested to tell whether another page exists.
+    """
+    params = [("select", select)]
+
+    for column in ("status", "printer_type", "user_id"):
+        if filters.get(column):
+            params.append((column, f"eq.{filters[column]}"))
+    if filters.get("created_from"):
+        params.append(("created_at", f"gte.{filters['created_from']}"))
+    if filters.get("created_to"):
+        params.append(("created_at", f"lt.{filters['created_to']}"))
+
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        params.append(("or", (
+            f"(created_at.lt.{_quote(created_at)},"
+            f"and(created_at.eq.{_quote(created_at)},id.lt.{_quote(order_id)}))"
+        )))
+
+    params.append(("order", "created_at.desc,id.desc"))
+    params.append(("limit", str(limit + 1)))
+    return params
+
+
+def clamp_page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def page_from_rows(rows: List[dict], limit: int) -> dict:
+    """Split the limit + 1 fetched rows into a page and its next cursor."""
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
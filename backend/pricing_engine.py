@@ -0,0 +1,323 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+DEFAULT_RATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pricing_rates.json")
+
+
+class RateTable(NamedTuple):
+    """
+    Rate tables as arrays, indexed by material (M) and printer (P) position.
+
+    materials / printers hold the config keys in index order; compatible is
+    an (M, P) mask of which materials each printer can use.
+    """
+    version: str
+    currency: str
+    materials: List[str]
+    printers: List[str]
+    material_names: List[str]
+    technologies: List[str]
+    # Per printer, the material_type quoted for its default material
+    material_labels: List[str]
+    default_materials: np.ndarray
+    cost_per_g: np.ndarray
+    density_g_cm3: np.ndarray
+    compatible: np.ndarray
+    labor_rate_per_h: np.ndarray
+    setup_fee: np.ndarray
+    post_processing: np.ndarray
+    break_quantities: np.ndarray
+    break_discounts: np.ndarray
+
+    def material_index(self, material: Optional[str], printer: str) -> int:
+        """
+        Index of a material given by key or display name (case-insensitive);
+        the printer's default material if it is unknown or incompatible.
+        """
+        printer_index = self.printers.index(printer)
+        if material:
+            wanted = material.strip().lower()
+            for index, (key, name) in enumerate(zip(self.materials, self.material_names)):
+                if wanted in (key, name.lower()) and self.compatible[index, printer_index]:
+                    return index
+        return int(self.default_materials[printer_index])
+
+
+class PriceMatrix(NamedTuple):
+    """Price components as (N parts, M materials, P printers) arrays; NaN where incompatible."""
+    weight_g: np.ndarray
+    material_cost: np.ndarray
+    labor_cost: np.ndarray
+    setup_fee: np.ndarray
+    post_processing: np.ndarray
+    discount: np.ndarray
+    total: np.ndarray
+
+
+def load_rate_table(config: dict) -> RateTable:
+    """
+    Validate a rate config (see pricing_rates.json) and convert it to arrays.
+
+    Raises:
+        ValueError: If a material references an unknown printer or a
+            printer's default material does not exist
+    """
+    printers = list(config["printers"])
+    materials = list(config["materials"])
+    if not printers or not materials:
+        raise ValueError("Rate table needs at least one printer and one material")
+
+    compatible = np.zeros((len(materials), len(printers)), dtype=bool)
+    for material_index, key in enumerate(materials):
+        material_printers = config["materials"][key]["printer"]
+        if isinstance(material_printers, str):
+            material_printers = [material_printers]
+        for printer in material_printers:
+            if printer not in printers:
+                raise ValueError(f"Material {key} references unknown printer {printer}")
+            compatible[material_index, printers.index(printer)] = True
+
+    default_materials = []
+    for printer in printers:
+        default = config["printers"][printer]["default_material"]
+        if default not in materials or not compatible[materials.index(default), printers.index(printer)]:
+            raise ValueError(f"Printer {printer} has invalid default material {default}")
+        default_materials.append(materials.index(default))
+
+    breaks = sorted(config.get("quantity_breaks") or [{"min_quantity": 1, "discount": 0.0}],
+                    key=lambda row: row["min_quantity"])
+
+    def printer_rates(field):
+        return np.array([float(config["printers"][printer].get(field, 0.0)) for printer in printers])
+
+    def material_rates(field):
+        return np.array([float(config["materials"][material][field]) for material in materials])
+
+    return RateTable(
+        version=str(config.get("version", "")),
+        currency=config.get("currency", "GBP"),
+        materials=materials,
+        printers=printers,
+        material_names=[config["materials"][material].get("name", material) for material in materials],
+        technologies=[config["printers"][printer].get("technology", printer.upper()) for printer in printers],
+        material_labels=[
+            config["printers"][printer].get("material_label", config["materials"][materials[default]].get("name"))
+            or materials[default]
+            for printer, default in zip(printers, default_materials)
+        ],
+        default_materials=np.array(default_materials),
+        cost_per_g=material_rates("cost_per_g"),
+        density_g_cm3=material_rates("density_g_cm3"),
+        compatible=compatible,
+        labor_rate_per_h=printer_rates("labor_rate_per_h"),
+        setup_fee=printer_rates("setup_fee"),
+        post_processing=printer_rates("post_processing"),
+        break_quantities=np.array([row["min_quantity"] for row in breaks], dtype=np.int64),
+        break_discounts=np.array([float(row["discount"]) for row in breaks]),
+    )
+
+
+def price_matrix(rates: RateTable,
+                 weight_g: np.ndarray,
+                 print_time_h: np.ndarray,
+                 quantity: Optional[np.ndarray] = None) -> PriceMatrix:
+    """
+    Price every part in every material on every printer in one pass.
+
+    Line total = (material + labour + post-processing) x quantity, less the
+    quantity-break discount, plus the printer's one-off setup fee.
+
+    Args:
+        rates: Rate table
+        weight_g: (N, M) part weight per material
+        print_time_h: (N, P) print time per printer
+        quantity: (N,) copies per part (default 1)
+
+    Returns:
+        PriceMatrix of (N, M, P) arrays
+    """
+    weight_g = np.asarray(weight_g, dtype=np.float64)
+    print_time_h = np.asarray(print_time_h, dtype=np.float64)
+    part_count = len(weight_g)
+    quantity = np.ones(part_count) if quantity is None else np.asarray(quantity, dtype=np.float64)
+    shape = (part_count, len(rates.materials), len(rates.printers))
+    copies = quantity[:, None, None]
+
+    material_cost = np.broadcast_to((weight_g * rates.cost_per_g)[:, :, None] * copies, shape)
+    labor_cost = np.broadcast_to((print_time_h * rates.labor_rate_per_h)[:, None, :] * copies, shape)
+    post_processing = np.broadcast_to(rates.post_processing[None, None, :] * copies, shape)
+    setup_fee = np.broadcast_to(rates.setup_fee[None, None, :], shape)
+
+    # Quantity breaks: the largest min_quantity not above each part's quantity
+    break_index = np.searchsorted(rates.break_quantities, quantity, side='right') - 1
+    discount_rate = np.where(break_index >= 0, rates.break_discounts[np.maximum(break_index, 0)], 0.0)
+    variable_cost = material_cost + labor_cost + post_processing
+    discount = variable_cost * discount_rate[:, None, None]
+    total = np.round(variable_cost - discount + setup_fee, 2)
+
+    unavailable = ~rates.compatible[None, :, :]
+    return PriceMatrix(
+        weight_g=np.broadcast_to(weight_g[:, :, None], shape),
+        material_cost=np.where(unavailable, np.nan, material_cost),
+        labor_cost=np.where(unavailable, np.nan, labor_cost),
+        setup_fee=np.where(unavailable, np.nan, setup_fee),
+        post_processing=np.where(unavailable, np.nan, post_processing),
+        discount=np.where(unavailable, np.nan, discount),
+        total=np.where(unavailable, np.nan, total),
+    )
+
+
+def _printer_columns(rates: RateTable, print_time_h: Dict[str, Sequence[float]]) -> np.ndarray:
+    """(N, P) print times in rate-table printer order."""
+    return np.column_stack([np.asarray(print_time_h[printer], dtype=np.float64) for printer in rates.printers])
+
+
+class PricingEngine:
+    """
+    Vectorised pricing from a JSON rate table that is reloaded when the
+    file changes, without restarting the API.
+
+    The file's modification time is checked at most every
+    ``reload_interval_s`` seconds. A table that fails to load or validate
+    is reported and the previous table stays in use.
+    """
+
+    def __init__(self,
+                 rates_path: str = DEFAULT_RATES_PATH,
+                 reload_interval_s: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rates_path = rates_path
+        self.reload_interval_s = reload_interval_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rates: Optional[RateTable] = None
+        self._mtime = None
+        self._checked_at = float("-inf")
+
+    @classmethod
+    def from_env(cls) -> "PricingEngine":
+        """Build an engine from PRICING_* environment variables."""
+        return cls(
+            rates_path=os.getenv("PRICING_RATES_PATH", DEFAULT_RATES_PATH),
+            reload_interval_s=float(os.getenv("PRICING_RELOAD_INTERVAL_S", "2")),
+        )
+
+    @property
+    def rates(self) -> RateTable:
+        """Current rate table, reloaded first if the file has changed."""
+        now = self._clock()
+        if self._rates is None or now - self._checked_at >= self.reload_interval_s:
+            with self._lock:
+                self._checked_at = now
+                self._reload_if_changed()
+        return self._rates
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.stat(self.rates_path).st_mtime_ns
+            if self._rates is not None and mtime == self._mtime:
+                return
+            with open(self.rates_path) as rates_file:
+                rates = load_rate_table(json.load(rates_file))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if self._rates is None:
+                raise
+            print(f"Pricing rate reload error, keeping version {self._rates.version}: {e}")
+            return
+        self._rates = rates
+        self._mtime = mtime
+
+    def price(self,
+              volume_mm3: Sequence[float],
+              print_time_h: Dict[str, Sequence[float]],
+              quantity: Optional[Sequence[int]] = None) -> PriceMatrix:
+        """
+        Price N parts from their volume, with weight derived per material.
+
+        Args:
+            volume_mm3: (N,) part volumes
+            print_time_h: Printer key -> (N,) print times
+            quantity: (N,) copies per part (default 1)
+        """
+        return self._price_volumes(self.rates, volume_mm3, print_time_h, quantity)
+
+    @staticmethod
+    def _price_volumes(rates: RateTable, volume_mm3, print_time_h, quantity) -> PriceMatrix:
+        volume_cm3 = np.asarray(volume_mm3, dtype=np.float64) / 1000.0
+        weight_g = volume_cm3[:, None] * rates.density_g_cm3[None, :]
+        return price_matrix(rates, weight_g, _printer_columns(rates, print_time_h), quantity)
+
+    def pricing_options(self,
+                        volume_mm3: Sequence[float],
+                        print_time_h: Dict[str, Sequence[float]],
+                        quantity: Optional[Sequence[int]] = None) -> List[dict]:
+        """
+        Per-part pricing options in the /upload response shape: for each
+        printer its default material's price and breakdown, plus the price
+        in every other compatible material. All parts are priced together.
+        """
+        rates = self.rates
+        return self._options(rates, self._price_volumes(rates, volume_mm3, print_time_h, quantity), print_time_h)
+
+    def pricing_options_by_weight(self,
+                                  weight_g: Sequence[float],
+                                  print_time_h: Dict[str, Sequence[float]],
+                                  quantity: Optional[Sequence[int]] = None) -> List[dict]:
+        """pricing_options for parts whose weight is already known, used for every material."""
+        rates = self.rates
+        weights = np.repeat(np.asarray(weight_g, dtype=np.float64)[:, None], len(rates.materials), axis=1)
+        matrix = price_matrix(rates, weights, _printer_columns(rates, print_time_h), quantity)
+        return self._options(rates, matrix, print_time_h)
+
+    @staticmethod
+    def _options(rates: RateTable, matrix: PriceMatrix, print_time_h: Dict[str, Sequence[float]]) -> List[dict]:
+        # Convert once; indexing Python lists is much cheaper than numpy scalars
+        totals = matrix.total.tolist()
+        weights = matrix.weight_g.tolist()
+        # The breakdown keeps the /upload response's original keys
+        components = {
+            name: getattr(matrix, name).tolist()
+            for name in ("material_cost", "labor_cost", "setup_fee", "post_processing")
+        }
+        compatible = [np.flatnonzero(rates.compatible[:, index]).tolist() for index in range(len(rates.printers))]
+
+        options = []
+        for part in range(len(totals)):
+            part_options = {}
+            for printer_index, printer in enumerate(rates.printers):
+                material = int(rates.default_materials[printer_index])
+                part_options[printer] = {
+                    "price": totals[part][material][printer_index],
+                    "print_time_h": float(print_time_h[printer][part]),
+                    "material_type": rates.material_labels[printer_index],
+                    "technology": rates.technologies[printer_index],
+                    "details": {
+                        name: values[part][material][printer_index] for name, values in components.items()
+                    },
+                    "materials": [
+                        {
+                            "material": rates.materials[index],
+                            "material_type": rates.material_names[index],
+                            "weight_g": weights[part][index][printer_index],
+                            "price": totals[part][index][printer_index],
+                        }
+                        for index in compatible[printer_index]
+                    ],
+                }
+            options.append(part_options)
+        return options
+
+
+_engine: Optional[PricingEngine] = None
+
+
+def get_pricing_engine() -> PricingEngine:
+    """The process-wide pricing engine, created on first use."""
+    global _engine
+    if _engine is None:
+        _engine = PricingEngine.from_env()
+    return _engine
@@ -0,0 +1,316 @@
+import os
+import numpy as np
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from indexed_mesh import IndexedMesh, iter_triangle_chunks
+from mesh_metrics import DEFAULT_CHUNK_SIZE, TrianglesLike
+
+
+class FdmProfile(NamedTuple):
+    """Slicer-like settings for a filament printer; lengths in mm, speeds in mm/s."""
+    layer_height_mm: float = 0.2
+    line_width_mm: float = 0.45
+    wall_count: int = 2
+    infill_density: float = 0.2
+    # Solid layers printed under and over every exposed surface
+    solid_layers: int = 4
+    wall_speed_mm_s: float = 40.0
+    infill_speed_mm_s: float = 80.0
+    travel_speed_mm_s: float = 150.0
+    # Travel distance per mm of extrusion (moves between walls and islands)
+    travel_ratio: float = 0.15
+    layer_change_s: float = 1.0
+    # Heating, homing and purge
+    setup_s: float = 600.0
+
+
+class ResinProfile(NamedTuple):
+    """Settings for a masked-SLA resin printer, which cures a whole layer at once."""
+    layer_height_mm: float = 0.05
+    exposure_s: float = 2.5
+    bottom_exposure_s: float = 30.0
+    bottom_layers: int = 5
+    # Lift, peel and retract between layers
+    lift_s: float = 6.0
+    # Extra peel time for larger cross-sections
+    peel_s_per_cm2: float = 0.02
+    setup_s: float = 300.0
+
+
+# (facet, layer) pairs expanded at once; each pair takes about 30 float64
+# temporaries, so this keeps slicing to a few hundred MB at most
+MAX_SLICE_PAIRS = 1 << 20
+# Layers sliced at most (5 m of resin at 0.05 mm). A mesh in the wrong
+# units or with a stray far vertex would otherwise allocate millions of
+# layers; such meshes get the volume-based estimate instead
+MAX_LAYERS = int(os.getenv("PRINT_MAX_LAYERS", "100000"))
+# Floors of the volume-based estimates (file_parser, utils), which quotes
+# have always had
+MIN_FDM_PRINT_TIME_H = 0.5
+MIN_RESIN_PRINT_TIME_H = 0.3
+
+FDM_PROFILE = FdmProfile(layer_height_mm=float(os.getenv("PRINT_FDM_LAYER_HEIGHT_MM", "0.2")))
+RESIN_PROFILE = ResinProfile(layer_height_mm=float(os.getenv("PRINT_RESIN_LAYER_HEIGHT_MM", "0.05")))
+
+
+def _is_empty(triangles: TrianglesLike) -> bool:
+    if isinstance(triangles, IndexedMesh):
+        return len(triangles.faces) == 0
+    return np.asarray(triangles).size == 0
+
+
+def _z_range(triangles: TrianglesLike) -> Tuple[float, float]:
+    if isinstance(triangles, IndexedMesh):
+        z = triangles.vertices[np.unique(triangles.faces), 2]
+    else:
+        z = np.asarray(triangles)[:, :, 2]
+    return float(z.min()), float(z.max())
+
+
+def _xy_center(triangles: TrianglesLike) -> np.ndarray:
+    if isinstance(triangles, IndexedMesh):
+        first_vertex = triangles.vertices[triangles.faces[0, 0]]
+    else:
+        first_vertex = np.asarray(triangles)[0, 0]
+    return first_vertex[:2].astype(np.float64)
+
+
+def layer_cross_sections(triangles: TrianglesLike,
+                         layer_height_mm: float,
+                         z_range: Optional[Tuple[float, float]] = None,
+                         chunk_size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Perimeter and area of the mesh's cross-section at every layer.
+
+    Layer k is sliced at z_min + (k + 0.5) * layer_height_mm. Each facet is
+    only intersected with the layers inside its own z-range: the facet's
+    first and last layer index are computed up front and expanded into
+    (facet, layer) pairs, so the work is proportional to the number of
+    actual intersections rather than facets x layers. Segment lengths and
+    shoelace terms are then summed per layer with bincount. Segments are
+    oriented by the facet normal, so holes subtract from the area of a
+    closed, outward-facing mesh.
+
+    Args:
+        triangles: IndexedMesh or (N, 3, 3) triangle array
+        layer_height_mm: Slice spacing
+        z_range: (z_min, z_max) of the mesh, if already known
+        chunk_size: Number of facets processed per batch; their (facet,
+            layer) pairs are further split into MAX_SLICE_PAIRS batches
+
+    Returns:
+        (perimeters_mm, areas_mm2), two float64 arrays with one entry per layer
+
+    Raises:
+        ValueError: If the mesh is more than MAX_LAYERS layers tall
+    """
+    if not isinstance(triangles, IndexedMesh):
+        triangles = np.asarray(triangles)
+    if _is_empty(triangles):
+        return np.zeros(0), np.zeros(0)
+
+    z_min, z_max = z_range if z_range is not None else _z_range(triangles)
+    layer_count = _layer_count(z_max - z_min, layer_height_mm)
+    if layer_count > MAX_LAYERS:
+        raise ValueError(f"Mesh is {layer_count} layers tall, more than the {MAX_LAYERS} that are sliced")
+    # Work relative to the mesh so float32 coordinates stay precise
+    origin = np.array([*_xy_center(triangles), z_min])
+    perimeters = np.zeros(layer_count)
+    doubled_areas = np.zeros(layer_count)
+
+    for chunk in iter_triangle_chunks(triangles, chunk_size or DEFAULT_CHUNK_SIZE):
+        z = chunk[:, :, 2].astype(np.float64) - z_min
+        z_low = np.minimum(np.minimum(z[:, 0], z[:, 1]), z[:, 2])
+        z_high = np.maximum(np.maximum(z[:, 0], z[:, 1]), z[:, 2])
+
+        # Layers whose plane lies within each facet's z-range; horizontal
+        # facets never cross a plane transversally
+        first = np.maximum(np.ceil(z_low / layer_height_mm - 0.5), 0).astype(np.int64)
+        last = np.minimum(np.floor(z_high / layer_height_mm - 0.5), layer_count - 1).astype(np.int64)
+        crossing = (z_high > z_low) & (last >= first)
+        if not crossing.any():
+            continue
+        first = first[crossing]
+        counts = last[crossing] - first + 1
+
+        # Only facets that cross a plane are promoted to float64
+        facets = _facet_slicing_params(chunk[crossing].astype(np.float64) - origin)
+
+        # Tall facets cross many layers, so the (facet, layer) pairs are
+        # expanded a bounded number at a time rather than per chunk
+        ends = np.cumsum(counts)
+        start = 0
+        while start < len(counts):
+            done = ends[start - 1] if start else 0
+            end = max(int(np.searchsorted(ends, done + MAX_SLICE_PAIRS, side='right')), start + 1)
+            layer, lengths, doubled = _slice_facets(facets[:, start:end], first[start:end], counts[start:end],
+                                                    layer_height_mm)
+            perimeters += np.bincount(layer, weights=lengths, minlength=layer_count)
+            doubled_areas += np.bincount(layer, weights=doubled, minlength=layer_count)
+            start = end
+
+    return perimeters, np.abs(doubled_areas) / 2.0
+
+
+def _layer_count(height_mm: float, layer_height_mm: float) -> int:
+    return max(int(np.ceil(height_mm / layer_height_mm)), 0)
+
+
+def _slice_facets(facets: np.ndarray, first: np.ndarray, counts: np.ndarray,
+                  layer_height_mm: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Intersect facets with the ``counts`` layers from ``first`` upwards.
+
+    Returns the layer, segment length and oriented shoelace term of every
+    (facet, layer) pair.
+    """
+    # Expand into one row per (facet, layer) intersection
+    facet = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    layer = first[facet] + np.arange(len(facet)) - offsets[facet]
+    plane_z = (layer + 0.5) * layer_height_mm
+
+    (low_z, middle_z, low_x, low_y, long_dx, long_dy, lower_dx, lower_dy,
+     middle_x, middle_y, upper_dx, upper_dy, orientation) = facets[:, facet]
+
+    # The plane always crosses the low-high edge, plus the low-middle
+    # edge below the middle vertex or the middle-high edge above it
+    rise = plane_z - low_z
+    a_x = low_x + rise * long_dx
+    a_y = low_y + rise * long_dy
+    below_middle = plane_z < middle_z
+    middle_rise = plane_z - middle_z
+    b_x = np.where(below_middle, low_x + rise * lower_dx, middle_x + middle_rise * upper_dx)
+    b_y = np.where(below_middle, low_y + rise * lower_dy, middle_y + middle_rise * upper_dy)
+
+    return layer, np.hypot(b_x - a_x, b_y - a_y), (a_x * b_y - b_x * a_y) * orientation
+
+
+def _facet_slicing_params(chunk: np.ndarray) -> np.ndarray:
+    """
+    Per-facet constants for slicing, one column per sloped facet.
+
+    Vertices are ordered low, middle, high by z and each edge is stored as
+    its xy change per mm of z, so a plane intersection costs a few
+    multiply-adds per (facet, layer) pair. The last row is +1 or -1 so
+    that segments run with the outward normal on their right.
+    """
+    flat = chunk.reshape(-1, 3)
+    base = np.arange(0, len(flat), 3)
+    # low != high because horizontal facets were filtered out
+    low_index = np.argmin(chunk[:, :, 2], axis=1)
+    high_index = np.argmax(chunk[:, :, 2], axis=1)
+    low = flat[base + low_index].T
+    middle = flat[base + 3 - low_index - high_index].T
+    high = flat[base + high_index].T
+
+    # One row per constant, so gathering pairs reads contiguous memory
+    params = np.empty((13, len(chunk)))
+    params[0] = low[2]
+    params[1] = middle[2]
+    params[2:4] = low[:2]
+    params[8:10] = middle[:2]
+    for row, start, end in ((4, low, high), (6, low, middle), (10, middle, high)):
+        rise = end[2] - start[2]
+        params[row:row + 2] = (end[:2] - start[:2]) / np.where(rise > 0, rise, 1.0)
+
+    # At the middle vertex's height the segment runs from the long edge to
+    # the middle vertex; compare that direction with the facet normal
+    direction = middle[:2] - (low[:2] + (middle[2] - low[2]) * params[4:6])
+    edge_1 = chunk[:, 1] - chunk[:, 0]
+    edge_2 = chunk[:, 2] - chunk[:, 0]
+    normal_x = edge_1[:, 1] * edge_2[:, 2] - edge_1[:, 2] * edge_2[:, 1]
+    normal_y = edge_1[:, 2] * edge_2[:, 0] - edge_1[:, 0] * edge_2[:, 2]
+    params[12] = np.where(direction[1] * normal_x - direction[0] * normal_y < 0, -1.0, 1.0)
+    return params
+
+
+def _uncovered_areas(areas: np.ndarray, depth: int) -> np.ndarray:
+    """Per layer, the largest area drop towards a layer up to ``depth`` layers away."""
+    padded = np.pad(areas, depth)
+    exposed = np.zeros_like(areas)
+    for offset in range(1, depth + 1):
+        below = padded[depth - offset:depth - offset + len(areas)]
+        above = padded[depth + offset:depth + offset + len(areas)]
+        exposed = np.maximum(exposed, np.maximum(areas - below, areas - above))
+    return exposed
+
+
+def fdm_print_time_s(perimeters: np.ndarray, areas: np.ndarray, profile: FdmProfile = FDM_PROFILE) -> float:
+    """
+    Seconds to print the given layers: walls along the perimeter, solid
+    skin over exposed surfaces, sparse infill inside, travel and layer
+    changes.
+    """
+    wall_length = perimeters * profile.wall_count
+    interior = np.maximum(areas - wall_length * profile.line_width_mm, 0.0)
+    skin = np.minimum(_uncovered_areas(areas, profile.solid_layers), interior)
+    infill_length = (skin + (interior - skin) * profile.infill_density) / profile.line_width_mm
+
+    extrusion_s = wall_length / profile.wall_speed_mm_s + infill_length / profile.infill_speed_mm_s
+    travel_s = (wall_length + infill_length) * profile.travel_ratio / profile.travel_speed_mm_s
+    layer_change_s = np.count_nonzero(areas > 0) * profile.layer_change_s
+    return float(profile.setup_s + extrusion_s.sum() + travel_s.sum() + layer_change_s)
+
+
+def resin_print_time_s(areas: np.ndarray, profile: ResinProfile = RESIN_PROFILE) -> float:
+    """
+    Seconds to print the given layers. Every layer is exposed in one go,
+    so time depends on layer count, with a small peel penalty for area.
+    """
+    layer_count = len(areas)
+    bottom = min(profile.bottom_layers, layer_count)
+    exposure_s = bottom * profile.bottom_exposure_s + (layer_count - bottom) * profile.exposure_s
+    peel_s = layer_count * profile.lift_s + areas.sum() / 100.0 * profile.peel_s_per_cm2
+    return float(profile.setup_s + exposure_s + peel_s)
+
+
+def estimate_print_times(triangles: TrianglesLike,
+                         z_range: Optional[Tuple[float, float]] = None,
+                         fdm_profile: FdmProfile = FDM_PROFILE,
+                         resin_profile: ResinProfile = RESIN_PROFILE,
+                         chunk_size: Optional[int] = None) -> dict:
+    """
+    Geometry-aware print time estimates from layer cross-sections.
+
+    Args:
+        triangles: IndexedMesh or (N, 3, 3) triangle array, in mm
+        z_range: (z_min, z_max) of the mesh, if already known
+        fdm_profile: FDM settings (layer height, speeds, walls, infill)
+        resin_profile: Resin settings (layer height, exposure, lift)
+        chunk_size: Number of facets processed per batch
+
+    Returns:
+        Dictionary with print_time_fdm_h, print_time_resin_h, fdm_layers
+        and resin_layers, or an empty dictionary for a mesh more than
+        MAX_LAYERS layers tall. Times are at least the minimums of the
+        volume-based estimate.
+    """
+    if not isinstance(triangles, IndexedMesh):
+        triangles = np.asarray(triangles)
+    if z_range is None and not _is_empty(triangles):
+        z_range = _z_range(triangles)
+    if z_range is not None:
+        height = z_range[1] - z_range[0]
+        tallest = max(_layer_count(height, fdm_profile.layer_height_mm),
+                      _layer_count(height, resin_profile.layer_height_mm))
+        if tallest > MAX_LAYERS:
+            return {}
+    perimeters, areas = layer_cross_sections(triangles, fdm_profile.layer_height_mm, z_range, chunk_size)
+
+    # Resin time only depends on areas through the peel term, so the resin
+    # layers are interpolated from the FDM slices instead of slicing again
+    resin_areas = np.zeros(0)
+    if len(areas):
+        resin_count = _layer_count(height, resin_profile.layer_height_mm)
+        resin_z = (np.arange(resin_count) + 0.5) * resin_profile.layer_height_mm
+        fdm_z = (np.arange(len(areas)) + 0.5) * fdm_profile.layer_height_mm
+        resin_areas = np.interp(resin_z, fdm_z, areas)
+
+    return {
+        "print_time_fdm_h": max(MIN_FDM_PRINT_TIME_H, fdm_print_time_s(perimeters, areas, fdm_profile) / 3600.0),
+        "print_time_resin_h": max(MIN_RESIN_PRINT_TIME_H,
+                                  resin_print_time_s(resin_areas, resin_profile) / 3600.0),
+        "fdm_layers": len(areas),
+        "resin_layers": len(resin_areas),
+    }
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Union
+
+# Prefer BLAKE3 when the optional package is installed; SHA-256 otherwise.
+# Digests are prefixed with the algorithm so both can share a disk cache.
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+HASH_ALGORITHM = "blake3" if BLAKE3_AVAILABLE else "sha256"
+
+
+def new_content_hasher():
+    """Return an incremental hasher with update() and hexdigest()."""
+    if BLAKE3_AVAILABLE:
+        return blake3.blake3()
+    return hashlib.sha256()
+
+
+def content_digest(data: Union[bytes, memoryview]) -> str:
+    """Hex digest of a file's bytes using HASH_ALGORITHM."""
+    hasher = new_content_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def cache_key(digest: str, file_ext: str) -> str:
+    """
+    Cache key for an analysed upload.
+    The extension is part of the key because it selects the parser.
+    """
+    return f"{HASH_ALGORITHM}:{digest}:{file_ext.lower()}"
+
+
+class QuoteCache:
+    """
+    Content-addressed cache of mesh analysis results.
+
+    An in-memory LRU with per-entry TTL sits in front of an optional SQLite
+    table, so results survive restarts and can be shared by workers on the
+    same host. Values must be JSON serialisable.
+    """
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 ttl_s: float = 7 * 24 * 3600,
+                 db_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS quote_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> "QuoteCache":
+        """Build a cache from QUOTE_CACHE_* environment variables."""
+        return cls(
+            max_entries=int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "1024")),
+            ttl_s=float(os.getenv("QUOTE_CACHE_TTL_S", str(7 * 24 * 3600))),
+            db_path=os.getenv("QUOTE_CACHE_DB") or None,
+        )
+
+    def get(self, key: str) -> Optional[dict]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT value, expires_at FROM quote_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute("DELETE FROM quote_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+
+            # Promote disk hits into the memory tier
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            return value
+
+    def put(self, key: str, value: dict) -> None:
+        expires_at = self._clock() + self.ttl_s
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO quote_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at),
+                )
+                self._db.commit()
+
+    def purge_expired(self) -> int:
+        """Drop expired entries from both tiers; returns the number removed."""
+        now = self._clock()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+            removed = len(expired)
+            if self._db is not None:
+                removed += self._db.execute(
+                    "DELETE FROM quote_cache WHERE expires_at <= ?", (now,)
+                ).rowcount
+                self._db.commit()
+            return removed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, expires_at: float, value: dict) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,262 @@
+import asyncio
+import os
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
+import httpx
+from dotenv import load_dotenv
+
+from order_queries import (MAX_PAGE_SIZE, clamp_page_size, orders_query_params, page_from_rows,
+                           select_clause)
+
+# HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+load_dotenv()
+
+# Chunk size when streaming an upload (from disk or memory) to storage
+UPLOAD_STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+class RepositoryError(Exception):
+    """Raised when the data backend rejects a request."""
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        raise RepositoryError(f"{response.request.method} {response.request.url.path} failed "
+                              f"with {response.status_code}: {response.text[:200]}")
+
+
+class SupabaseOrdersRepository:
+    """Orders table through PostgREST."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self._client = client
+
+    async def insert(self, order: dict) -> dict:
+        response = await self._client.post(
+            "/rest/v1/orders", json=order, headers={"Prefer": "return=representation"}
+        )
+        _raise_for_status(response)
+        rows = response.json()
+        return rows[0] if rows else order
+
+    async def get(self, order_id: str) -> Optional[dict]:
+        response = await self._client.get(
+            "/rest/v1/orders", params={"select": "*", "id": f"eq.{order_id}"}
+        )
+        _raise_for_status(response)
+        rows = response.json()
+        return rows[0] if rows else None
+
+    async def update(self, order_id: str, values: dict) -> Optional[dict]:
+        response = await self._client.patch(
+            "/rest/v1/orders", params={"id": f"eq.{order_id}"}, json=values,
+            headers={"Prefer": "return=representation"},
+        )
+        _raise_for_status(response)
+        rows = response.json()
+        return rows[0] if rows else None
+
+    async def list_page(self, fields: Optional[str] = None, filters: Optional[dict] = None,
+                        cursor: Optional[str] = None, limit: int = MAX_PAGE_SIZE) -> dict:
+        """One keyset page: {"items": [...], "next_cursor": str or None}"""
+        limit = clamp_page_size(limit)
+        params = orders_query_params(select_clause(fields), filters or {}, cursor, limit)
+        response = await self._client.get("/rest/v1/orders", params=params)
+        _raise_for_status(response)
+        return page_from_rows(response.json(), limit)
+
+    async def sample(self, fields: str, limit: int) -> Tuple[List[dict], int]:
+        """A few rows plus the total row count."""
+        response = await self._client.get(
+            "/rest/v1/orders", params={"select": fields, "limit": str(limit)},
+            headers={"Prefer": "count=exact"},
+        )
+        _raise_for_status(response)
+        # Content-Range looks like "0-4/123"
+        total = response.headers.get("content-range", "*/0").split("/")[-1]
+        return response.json(), int(total) if total.isdigit() else 0
+
+
+class SupabaseStorageRepository:
+    """Supabase Storage buckets through the storage REST API."""
+
+    def __init__(self, client: httpx.AsyncClient, public_base_url: str):
+        self._client = client
+        self._public_base_url = public_base_url.rstrip("/")
+
+    async def upload(self, bucket: str, name: str, payload: Union[bytes, memoryview, str]) -> bool:
+        """
+        Store an object from bytes, a memoryview or a file path.
+        Returns False (and leaves the object alone) if the name already exists.
+        """
+        if isinstance(payload, str):
+            headers = {"Content-Length": str(os.path.getsize(payload))}
+            content = _stream_file(payload)
+        elif isinstance(payload, memoryview):
+            headers = {"Content-Length": str(payload.nbytes)}
+            content = _stream_view(payload)
+        else:
+            headers = {}
+            content = payload
+        headers.update({"Content-Type": "application/octet-stream", "x-upsert": "false"})
+
+        response = await self._client.post(f"/storage/v1/object/{bucket}/{name}", content=content, headers=headers)
+        if response.status_code in (400, 409) and ("Duplicate" in response.text or "already exists" in response.text):
+            return False
+        _raise_for_status(response)
+        return True
+
+    def public_url(self, bucket: str, name: str) -> str:
+        return f"{self._public_base_url}/storage/v1/object/public/{bucket}/{name}"
+
+    async def download(self, bucket: str, name: str) -> bytes:
+        response = await self._client.get(f"/storage/v1/object/{bucket}/{name}")
+        _raise_for_status(response)
+        return response.content
+
+    async def remove(self, bucket: str, names: List[str]) -> None:
+        response = await self._client.request(
+            "DELETE", f"/storage/v1/object/{bucket}", json={"prefixes": names}
+        )
+        _raise_for_status(response)
+
+    async def list(self, bucket: str, limit: int = 100) -> List[dict]:
+        response = await self._client.post(
+            f"/storage/v1/object/list/{bucket}",
+            json={"prefix": "", "limit": limit, "offset": 0, "sortBy": {"column": "name", "order": "asc"}},
+        )
+        _raise_for_status(response)
+        return response.json()
+
+
+class SupabaseAuthRepository:
+    """Token lookups against Supabase auth (the remote fallback path)."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self._client = client
+
+    async def get_user(self, token: str) -> Optional[dict]:
+        response = await self._client.get("/auth/v1/user", headers={"Authorization": f"Bearer {token}"})
+        if response.status_code in (401, 403):
+            return None
+        _raise_for_status(response)
+        user = response.json()
+        return {"id": user.get("id"), "email": user.get("email")}
+
+
+async def _stream_file(path: str) -> AsyncIterator[bytes]:
+    """Read a file in chunks on a worker thread."""
+    with open(path, 'rb') as file_object:
+        while True:
+            chunk = await asyncio.to_thread(file_object.read, UPLOAD_STREAM_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _stream_view(view: memoryview) -> AsyncIterator[bytes]:
+    """Send in-memory content in chunks rather than as one bytes copy."""
+    for start in range(0, view.nbytes, UPLOAD_STREAM_CHUNK_SIZE):
+        yield bytes(view[start:start + UPLOAD_STREAM_CHUNK_SIZE])
+
+
+class Repositories:
+    """Orders, storage and auth access sharing one backend connection."""
+
+    def __init__(self, orders, storage, auth, close_callback=None):
+        self.orders = orders
+        self.storage = storage
+        self.auth = auth
+        self._close_callback = close_callback
+
+    async def iter_orders(self, fields: Optional[str] = None, filters: Optional[dict] = None,
+                          page_size: int = MAX_PAGE_SIZE) -> AsyncIterator[dict]:
+        """Yield every matching order, fetching one keyset page at a time."""
+        cursor = None
+        while True:
+            page = await self.orders.list_page(fields, filters, cursor, page_size)
+            for row in page["items"]:
+                yield row
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    async def close(self) -> None:
+        if self._close_callback is not None:
+            await self._close_callback()
+
+
+def create_http_client(base_url: str, api_key: str) -> httpx.AsyncClient:
+    """
+    Pooled keep-alive client for the Supabase REST APIs.
+    Pool size and timeouts come from DATA_HTTP_* environment variables.
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("DATA_HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("DATA_HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("DATA_HTTP_KEEPALIVE_EXPIRY_S", "30")),
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("DATA_HTTP_TIMEOUT_S", "20")),
+        connect=float(os.getenv("DATA_HTTP_CONNECT_TIMEOUT_S", "5")),
+    )
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers={"apikey": api_key, "Authorization": f"Bearer {api_key}"},
+        limits=limits,
+        timeout=timeout,
+        http2=HTTP2_AVAILABLE,
+    )
+
+
+def create_repositories() -> Repositories:
+    """
+    Build the data layer selected by DATA_BACKEND.
+
+    "supabase" (default) talks to the project's REST APIs over a pooled
+    async HTTP client; "local" keeps orders in SQLite and objects on disk so
+    the API can run and be load-tested offline.
+    """
+    backend = os.getenv("DATA_BACKEND", "supabase").lower()
+    if backend == "local":
+        from local_repositories import create_local_repositories
+        return create_local_repositories()
+    if backend != "supabase":
+        raise ValueError(f"Unknown DATA_BACKEND: {backend}")
+
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
+    if not supabase_url or not supabase_key:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set (or use DATA_BACKEND=local)")
+
+    client = create_http_client(supabase_url, supabase_key)
+    return Repositories(
+        orders=SupabaseOrdersRepository(client),
+        storage=SupabaseStorageRepository(client, supabase_url),
+        auth=SupabaseAuthRepository(client),
+        close_callback=client.aclose,
+    )
+
+
+_repositories: Optional[Repositories] = None
+
+
+def get_repositories() -> Repositories:
+    """The process-wide data layer, created on first use."""
+    global _repositories
+    if _repositories is None:
+        _repositories = create_repositories()
+    return _repositories
+
+
+async def close_repositories() -> None:
+    global _repositories
+    if _repositories is not None:
+        await _repositories.close()
+        _repositories = None
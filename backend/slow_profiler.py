@@ -0,0 +1,201 @@
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Parses running longer than this are sampled and saved; unset or 0 keeps
+# the profiler off
+PROFILE_SLOW_PARSE_MS = float(os.getenv("PROFILE_SLOW_PARSE_MS", "0"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "slow_profiles"))
+# Oldest captures are deleted beyond this many
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+CAPTURE_SUFFIX = ".collapsed"
+# <UTC time>_<quote id>_<format>_<triangles>t.collapsed
+_CAPTURE_NAME = re.compile(r"^(\d{8}T\d{12})_([A-Za-z0-9-]+)_([a-z0-9]+)_(\d+)t\.collapsed$")
+_UNSAFE_TAG = re.compile(r"[^A-Za-z0-9-]")
+
+
+class _Watch:
+    """One profiled call: its thread, start time and the stacks sampled so far."""
+    __slots__ = ("thread_id", "started", "stacks", "triangle_count")
+
+    def __init__(self, thread_id: int, started: float):
+        self.thread_id = thread_id
+        self.started = started
+        self.stacks: Counter = Counter()
+        self.triangle_count = 0
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SlowCallProfiler:
+    """
+    Stack-sampling profiler that only looks at calls over a latency budget.
+
+    Watched calls are registered in a dict, which costs next to nothing
+    for the usual fast call. One background thread wakes every
+    ``interval_s`` while calls are being watched, and samples the stack of
+    each call that has run longer than ``budget_s``. When such a call ends
+    its samples are written as a collapsed-stack file (one
+    ``frame;frame;frame count`` line per stack, the input of flamegraph.pl
+    and speedscope), and the directory is trimmed to ``max_files``.
+    """
+
+    def __init__(self,
+                 budget_s: float = PROFILE_SLOW_PARSE_MS / 1000,
+                 interval_s: float = PROFILE_SAMPLE_INTERVAL_MS / 1000,
+                 directory: str = PROFILE_DIR,
+                 max_files: int = PROFILE_MAX_FILES):
+        self.budget_s = budget_s
+        self.interval_s = interval_s
+        self.directory = directory
+        self.max_files = max_files
+        self._watches: Dict[int, _Watch] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_s > 0
+
+    @contextmanager
+    def watch(self, quote_id: Optional[str], file_format: str):
+        """
+        Profile the enclosed call if it exceeds the budget. Set
+        ``triangle_count`` on the yielded object to tag the capture.
+        """
+        if not self.enabled:
+            yield _Watch(0, 0.0)
+            return
+
+        watch = _Watch(threading.get_ident(), time.perf_counter())
+        key = id(watch)
+        with self._lock:
+            self._watches[key] = watch
+        self._ensure_sampler()
+        self._wake.set()
+        try:
+            yield watch
+        finally:
+            with self._lock:
+                del self._watches[key]
+            if watch.stacks:
+                self._save(watch, quote_id, file_format)
+
+    def _ensure_sampler(self) -> None:
+        if self._sampler is not None and self._sampler.is_alive():
+            return
+        with self._lock:
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_forever, name="slow-call-profiler",
+                                                 daemon=True)
+                self._sampler.start()
+
+    def _sample_forever(self) -> None:
+        while True:
+            with self._lock:
+                watches = list(self._watches.values())
+            if not watches:
+                # Sleep until the next call is watched
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            now = time.perf_counter()
+            overdue = [watch for watch in watches if now - watch.started >= self.budget_s]
+            if overdue:
+                frames = sys._current_frames()
+                for watch in overdue:
+                    frame = frames.get(watch.thread_id)
+                    if frame is not None:
+                        watch.stacks[_collapse(frame)] += 1
+                del frames
+            time.sleep(self.interval_s)
+
+    def _save(self, watch: _Watch, quote_id: Optional[str], file_format: str) -> None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        quote_tag = _UNSAFE_TAG.sub("", quote_id or "") or "unknown"
+        format_tag = re.sub(r"[^a-z0-9]", "", file_format.lower()) or "unknown"
+        name = f"{stamp}_{quote_tag}_{format_tag}_{int(watch.triangle_count)}t{CAPTURE_SUFFIX}"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name), "w") as capture:
+                for stack, count in watch.stacks.most_common():
+                    capture.write(f"{stack} {count}\n")
+            self._rotate()
+        except OSError as e:
+            print(f"Could not save profile {name}: {e}")
+
+    def _rotate(self) -> None:
+        captures = list_captures(self.directory)
+        for capture in captures[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, capture["name"]))
+            except FileNotFoundError:
+                pass
+
+
+def list_captures(directory: str = PROFILE_DIR) -> List[dict]:
+    """Saved captures with their tags, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    captures = []
+    for name in os.listdir(directory):
+        match = _CAPTURE_NAME.match(name)
+        if match is None:
+            continue
+        try:
+            size_bytes = os.path.getsize(os.path.join(directory, name))
+        except FileNotFoundError:
+            # Rotated away by another process
+            continue
+        captured_at = datetime.strptime(match.group(1)[:15], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+        captures.append({
+            "name": name,
+            "quote_id": match.group(2),
+            "file_format": match.group(3),
+            "triangle_count": int(match.group(4)),
+            "captured_at": captured_at.isoformat(),
+            "size_bytes": size_bytes,
+        })
+    captures.sort(key=lambda capture: capture["name"], reverse=True)
+    return captures
+
+
+def capture_path(name: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    """Path of a saved capture, or None if ``name`` isn't one (no path traversal)."""
+    if _CAPTURE_NAME.match(name) is None:
+        return None
+    path = os.path.join(directory, name)
+    return path if os.path.isfile(path) else None
+
+
+_profiler: Optional[SlowCallProfiler] = None
+
+
+def get_profiler() -> SlowCallProfiler:
+    """Process-wide profiler configured from PROFILE_* environment variables."""
+    global _profiler
+    if _profiler is None:
+        _profiler = SlowCallProfiler()
+    return _profiler
@@ -0,0 +1,247 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+from indexed_mesh import IndexedMesh
+from mesh_store import (MESH_STORE_DIR, mark_used, parse_mesh_bytes, prune_mesh_store_if_due, read_mesh_file,
+                        write_mesh_file)
+from quote_cache import content_digest
+
+# Maximum distance between the tessellation and the true surface
+DEFAULT_CHORD_TOLERANCE_MM = float(os.getenv("STEP_CHORD_TOLERANCE_MM", "0.05"))
+# Maximum angle between neighbouring facets on curved surfaces
+DEFAULT_ANGULAR_TOLERANCE_RAD = float(os.getenv("STEP_ANGULAR_TOLERANCE_RAD", "0.3"))
+# Budgets for one tessellation subprocess. The wall clock should stay below
+# ANALYSIS_TIMEOUT_S so the analysis job can still fall back to an estimate.
+DEFAULT_TIMEOUT_S = float(os.getenv("STEP_TESSELLATION_TIMEOUT_S", "45"))
+DEFAULT_MEMORY_MB = int(os.getenv("STEP_TESSELLATION_MEMORY_MB", "2048"))
+
+# OpenCASCADE (cadquery-ocp) meshes to an exact chord tolerance; trimesh is
+# the fallback, but it can only read STEP through cascadio or gmsh
+OCP_AVAILABLE = importlib.util.find_spec("OCP") is not None
+TRIMESH_STEP_AVAILABLE = importlib.util.find_spec("trimesh") is not None and (
+    importlib.util.find_spec("cascadio") is not None or importlib.util.find_spec("gmsh") is not None)
+STEP_BACKEND_AVAILABLE = OCP_AVAILABLE or TRIMESH_STEP_AVAILABLE
+
+# Worker exit status when the memory budget was hit
+_EXIT_OUT_OF_MEMORY = 3
+
+
+class TessellationError(Exception):
+    """Raised when a STEP file could not be tessellated."""
+
+
+class TessellationBudgetError(TessellationError):
+    """Raised when tessellation exceeds its time or memory budget."""
+
+
+class StepTessellator:
+    """
+    Tessellates STEP files in a subprocess and caches the resulting meshes.
+
+    Each file is meshed by a fresh interpreter with an address-space limit
+    and a wall-clock timeout, so a pathological CAD model cannot take the
+    analysis worker down with it. Meshes are stored in the compact mesh
+    format in the mesh store (see mesh_store) by content hash and
+    tolerances, so a repeat quote of the same file (on any worker sharing
+    the directory) reads the mesh back instead of meshing it again. They
+    share the upload's content-hash prefix, so the store's size limit
+    prunes them together with its other files.
+    """
+
+    def __init__(self,
+                 chord_tolerance_mm: float = DEFAULT_CHORD_TOLERANCE_MM,
+                 angular_tolerance_rad: float = DEFAULT_ANGULAR_TOLERANCE_RAD,
+                 timeout_s: float = DEFAULT_TIMEOUT_S,
+                 memory_mb: int = DEFAULT_MEMORY_MB,
+                 cache_dir: Optional[str] = MESH_STORE_DIR):
+        self.chord_tolerance_mm = chord_tolerance_mm
+        self.angular_tolerance_rad = angular_tolerance_rad
+        self.timeout_s = timeout_s
+        self.memory_mb = memory_mb
+        self.cache_dir = cache_dir or None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def cache_path(self, file_content: bytes) -> Optional[str]:
+        """Where the mesh for this content and these tolerances is cached."""
+        if not self.cache_dir:
+            return None
+        name = (f"{content_digest(file_content)}.tessellated-"
+                f"{self.chord_tolerance_mm:g}-{self.angular_tolerance_rad:g}.mesh")
+        return os.path.join(self.cache_dir, name)
+
+    def tessellate(self, file_content: bytes) -> IndexedMesh:
+        """
+        Return the triangle mesh of a STEP file, from the cache if possible.
+
+        Raises:
+            TessellationBudgetError: If meshing ran out of time or memory
+            TessellationError: If the file could not be read or meshed
+        """
+        cached_path = self.cache_path(file_content)
+        if cached_path is not None and os.path.exists(cached_path):
+            try:
+                mesh = read_mesh_file(cached_path).mesh
+                mark_used(cached_path)
+                return mesh
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable cached mesh {cached_path}: {e}")
+
+        work_dir = self.cache_dir or tempfile.gettempdir()
+        with tempfile.TemporaryDirectory(dir=work_dir) as scratch:
+            step_path = os.path.join(scratch, "part.step")
+            mesh_path = os.path.join(scratch, "part.mesh")
+            with open(step_path, "wb") as handle:
+                handle.write(file_content)
+            self._run_worker(step_path, mesh_path)
+            if cached_path is None:
+                # Read into memory; the scratch file is deleted on return
+                with open(mesh_path, "rb") as handle:
+                    return parse_mesh_bytes(handle.read()).mesh
+            # Same directory, so the rename is atomic for concurrent readers
+            os.replace(mesh_path, cached_path)
+        prune_mesh_store_if_due()
+        return read_mesh_file(cached_path).mesh
+
+    def _run_worker(self, step_path: str, mesh_path: str) -> None:
+        command = [
+            sys.executable, os.path.abspath(__file__), step_path, mesh_path,
+            repr(self.chord_tolerance_mm), repr(self.angular_tolerance_rad), str(self.memory_mb),
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout_s)
+        except subprocess.TimeoutExpired:
+            raise TessellationBudgetError(
+                f"STEP tessellation exceeded {self.timeout_s:g}s"
+            ) from None
+
+        if result.returncode == _EXIT_OUT_OF_MEMORY:
+            raise TessellationBudgetError(f"STEP tessellation exceeded {self.memory_mb} MB")
+        if result.returncode < 0:
+            raise TessellationError(f"STEP tessellation killed by signal {-result.returncode}")
+        if result.returncode != 0:
+            lines = result.stderr.strip().splitlines()
+            raise TessellationError(lines[-1] if lines else f"exit status {result.returncode}")
+
+
+_default_tessellator: Optional[StepTessellator] = None
+
+
+def get_step_tessellator() -> StepTessellator:
+    """Process-wide tessellator configured from STEP_* environment variables."""
+    global _default_tessellator
+    if _default_tessellator is None:
+        _default_tessellator = StepTessellator()
+    return _default_tessellator
+
+
+def _limit_memory(memory_mb: int) -> None:
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows; only the wall-clock budget applies
+        return
+    limit = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _tessellate_with_ocp(step_path: str, chord_tolerance_mm: float,
+                         angular_tolerance_rad: float) -> IndexedMesh:
+    """Mesh every face of the model with OpenCASCADE's incremental mesher."""
+    from OCP.BRep import BRep_Tool
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.IFSelect import IFSelect_RetDone
+    from OCP.STEPControl import STEPControl_Reader
+    from OCP.TopAbs import TopAbs_FACE, TopAbs_REVERSED
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.TopoDS import TopoDS
+
+    reader = STEPControl_Reader()
+    if reader.ReadFile(step_path) != IFSelect_RetDone:
+        raise TessellationError("Could not read STEP file")
+    reader.TransferRoots()
+    shape = reader.OneShape()
+    BRepMesh_IncrementalMesh(shape, chord_tolerance_mm, False, angular_tolerance_rad, True)
+
+    vertex_blocks = []
+    face_blocks = []
+    vertex_count = 0
+    explorer = TopExp_Explorer(shape, TopAbs_FACE)
+    while explorer.More():
+        face = TopoDS.Face_s(explorer.Current())
+        location = TopLoc_Location()
+        triangulation = BRep_Tool.Triangulation_s(face, location)
+        if triangulation is not None:
+            transform = location.Transformation()
+            nodes = np.array([
+                triangulation.Node(i).Transformed(transform).Coord()
+                for i in range(1, triangulation.NbNodes() + 1)
+            ], dtype=np.float64)
+            triangles = np.array([
+                triangulation.Triangle(i).Get() for i in range(1, triangulation.NbTriangles() + 1)
+            ], dtype=np.int64) - 1
+            if face.Orientation() == TopAbs_REVERSED:
+                triangles = triangles[:, [0, 2, 1]]
+            vertex_blocks.append(nodes)
+            face_blocks.append(triangles + vertex_count)
+            vertex_count += len(nodes)
+        explorer.Next()
+
+    if not face_blocks:
+        raise TessellationError("STEP file contains no surfaces")
+    return IndexedMesh(np.concatenate(vertex_blocks), np.concatenate(face_blocks).astype(np.int32))
+
+
+def _tessellate_with_trimesh(step_path: str, chord_tolerance_mm: float,
+                             angular_tolerance_rad: float) -> IndexedMesh:
+    """
+    Mesh with trimesh's STEP loader, or with gmsh through trimesh. gmsh has
+    no chord tolerance; its curvature refinement uses the angular tolerance.
+    """
+    import trimesh
+
+    if 'step' in trimesh.available_formats():
+        mesh = trimesh.load(step_path, file_type='step', force='mesh')
+        vertices, faces = mesh.vertices, mesh.faces
+    else:
+        from trimesh.interfaces.gmsh import load_gmsh
+
+        elements_per_turn = max(6, int(np.ceil(2 * np.pi / angular_tolerance_rad)))
+        loaded = load_gmsh(step_path, gmsh_args=[("Mesh.MeshSizeFromCurvature", elements_per_turn)])
+        vertices, faces = loaded["vertices"], loaded["faces"]
+
+    if len(faces) == 0:
+        raise TessellationError("STEP file contains no surfaces")
+    return IndexedMesh(np.asarray(vertices, dtype=np.float64), np.asarray(faces).astype(np.int32))
+
+
+def _worker_main(argv) -> int:
+    """Subprocess entry point: tessellate one STEP file into a mesh file."""
+    step_path, mesh_path, chord, angular, memory_mb = argv
+    _limit_memory(int(memory_mb))
+    try:
+        if OCP_AVAILABLE:
+            mesh = _tessellate_with_ocp(step_path, float(chord), float(angular))
+        elif TRIMESH_STEP_AVAILABLE:
+            mesh = _tessellate_with_trimesh(step_path, float(chord), float(angular))
+        else:
+            raise TessellationError("No STEP backend installed (install cadquery-ocp, or trimesh with "
+                                    "cascadio or gmsh)")
+        write_mesh_file(mesh_path, mesh)
+    except MemoryError:
+        return _EXIT_OUT_OF_MEMORY
+    except Exception as e:
+        print(f"{type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_worker_main(sys.argv[1:]))
@@ -1,113 +1,197 @@
+import re
 import struct
+import warnings
 import numpy as np
-from typing import Tuple, List
+from typing import BinaryIO, Iterator, Tuple, List, Union
 
+from mesh_metrics import compute_mesh_metrics
 
-def parse_stl_binary(file_content: bytes) -> Tuple[List[np.ndarray], int]:
+
+# Binary STL facet record: normal (3 x float32), three vertices
+# (9 x float32) and a 2-byte attribute count, 50 bytes in total.
+STL_BINARY_HEADER_SIZE = 84
+STL_FACET_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attribute', '<u2'),
+])
+
+
+def parse_stl_binary(file_content: bytes) -> Tuple[np.ndarray, int]:
     """
     Parse binary STL file and extract triangles.
-    Returns: (triangles, triangle_count)
+
+    The facet block is decoded in a single pass through a structured dtype,
+    so no per-facet Python objects are created.
+
+    Returns: (triangles, triangle_count) where triangles is a contiguous
+    (N, 3, 3) float32 array.
+
+    Raises:
+        ValueError: If the buffer is shorter than the header or than the
+            facet count declared in the header.
     """
-    # Skip 80-byte header
-    header = file_content[:80]
-    
-    # Read number of triangles (4 bytes, little endian)
+    if len(file_content) < STL_BINARY_HEADER_SIZE:
+        raise ValueError("Binary STL is shorter than its 84-byte header")
+
+    # Read number of triangles (4 bytes, little endian) after the 80-byte header
     triangle_count = struct.unpack('<I', file_content[80:84])[0]
-    
-    triangles = []
-    offset = 84
-    
-    for i in range(triangle_count):
-        # Each triangle: 12 floats (normal + 3 vertices) + 2 bytes (attribute)
-        # Normal vector (3 floats, 12 bytes) - we'll recalculate this
-        normal = struct.unpack('<fff', file_content[offset:offset+12])
-        offset += 12
-        
-        # Three vertices (9 floats, 36 bytes)
-        vertex1 = np.array(struct.unpack('<fff', file_content[offset:offset+12]))
-        offset += 12
-        vertex2 = np.array(struct.unpack('<fff', file_content[offset:offset+12]))
-        offset += 12
-        vertex3 = np.array(struct.unpack('<fff', file_content[offset:offset+12]))
-        offset += 12
-        
-        # Skip attribute byte count (2 bytes)
-        offset += 2
-        
-        triangles.append(np.array([vertex1, vertex2, vertex3]))
-    
+
+    expected_size = STL_BINARY_HEADER_SIZE + triangle_count * STL_FACET_DTYPE.itemsize
+    if len(file_content) < expected_size:
+        raise ValueError(
+            f"Truncated binary STL: header declares {triangle_count} facets "
+            f"({expected_size} bytes) but only {len(file_content)} bytes were received"
+        )
+
+    facets = np.frombuffer(
+        file_content,
+        dtype=STL_FACET_DTYPE,
+        count=triangle_count,
+        offset=STL_BINARY_HEADER_SIZE,
+    )
+
+    # Copy the vertex field out of the strided record view into one
+    # contiguous native-endian array; normals are recalculated downstream.
+    triangles = np.ascontiguousarray(facets['vertices'], dtype=np.float32)
+
     return triangles, triangle_count
 
 
-def parse_stl_ascii(file_content: str) -> Tuple[List[np.ndarray], int]:
+# ASCII STL files are tokenized in chunks of this many bytes
+ASCII_CHUNK_SIZE = 1024 * 1024
+# Bytes inspected when deciding between binary and ASCII STL
+FORMAT_SNIFF_SIZE = 1024
+
+_VERTEX_PATTERN = re.compile(
+    rb'vertex\s+(\S+\s+\S+\s+\S+)', re.IGNORECASE
+)
+
+
+class _Float32Buffer:
+    """Append-only float32 array that grows geometrically."""
+
+    def __init__(self, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=np.float32)
+        self._size = 0
+
+    def extend(self, values: np.ndarray) -> None:
+        needed = self._size + len(values)
+        if needed > len(self._data):
+            self._data.resize(max(needed, 2 * len(self._data)), refcheck=False)
+        self._data[self._size:needed] = values
+        self._size = needed
+
+    def finish(self) -> np.ndarray:
+        """Shrink to the used size in place and return the array."""
+        self._data.resize(self._size, refcheck=False)
+        return self._data
+
+
+def _iter_chunks(source: Union[bytes, bytearray, memoryview, BinaryIO],
+                 chunk_size: int) -> Iterator[bytes]:
+    """Yield byte chunks from an in-memory buffer or a binary file object."""
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        view = memoryview(source)
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+
+
+def _vertex_floats(text: bytes) -> np.ndarray:
+    """Extract the coordinates of every ``vertex`` line in a block of text."""
+    coordinates = _VERTEX_PATTERN.findall(text)
+    if not coordinates:
+        return np.empty(0, dtype=np.float32)
+
+    try:
+        with warnings.catch_warnings():
+            # Older NumPy releases warn instead of raising on unparsable tokens
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = np.fromstring(b' '.join(coordinates), dtype=np.float32, sep=' ')
+    except ValueError:
+        values = None
+
+    if values is None or len(values) != 3 * len(coordinates):
+        raise ValueError("Malformed vertex coordinates in ASCII STL")
+    return values
+
+
+def parse_stl_ascii(file_content: Union[str, bytes, memoryview, BinaryIO],
+                    chunk_size: int = ASCII_CHUNK_SIZE) -> Tuple[np.ndarray, int]:
     """
     Parse ASCII STL file and extract triangles.
-    Returns: (triangles, triangle_count)
+
+    The input is tokenized in byte chunks and vertex coordinates are written
+    straight into a growable float32 buffer, so peak memory stays close to
+    the size of the resulting array rather than a multiple of the file size.
+
+    Args:
+        file_content: STL text as str/bytes/memoryview or a binary file object
+        chunk_size: Number of bytes tokenized per step
+
+    Returns: (triangles, triangle_count) where triangles is an (N, 3, 3)
+    float32 array. A trailing incomplete facet is ignored.
     """
-    lines = file_content.strip().split('\n')
-    triangles = []
-    current_triangle = []
-    
-    for line in lines:
-        line = line.strip().lower()
-        if line.startswith('vertex'):
-            # Extract vertex coordinates
-            parts = line.split()
-            vertex = np.array([float(parts[1]), float(parts[2]), float(parts[3])])
-            current_triangle.append(vertex)
-            
-            # If we have 3 vertices, complete the triangle
-            if len(current_triangle) == 3:
-                triangles.append(np.array(current_triangle))
-                current_triangle = []
-    
-    return triangles, len(triangles)
+    if isinstance(file_content, str):
+        file_content = file_content.encode('utf-8')
+
+    buffer = _Float32Buffer()
+    carry = b''
+
+    for chunk in _iter_chunks(file_content, chunk_size):
+        block = carry + chunk
+        # Only tokenize complete lines; keep the remainder for the next chunk
+        cut = max(block.rfind(b'\n'), block.rfind(b'\r')) + 1
+        carry = block[cut:]
+        buffer.extend(_vertex_floats(block[:cut]))
 
+    buffer.extend(_vertex_floats(carry))
 
-def is_binary_stl(file_content: bytes) -> bool:
+    values = buffer.finish()
+    triangle_count = len(values) // 9
+    triangles = values[:triangle_count * 9].reshape(triangle_count, 3, 3)
+    return triangles, triangle_count
+
+
+def is_binary_stl(file_content: Union[bytes, memoryview]) -> bool:
     """
     Determine if STL file is binary or ASCII format.
+
+    Only the header and the first FORMAT_SNIFF_SIZE bytes are inspected.
     """
+    # A binary STL whose size matches its declared facet count is binary,
+    # even if the exporter wrote "solid" into the header
+    if len(file_content) >= STL_BINARY_HEADER_SIZE:
+        triangle_count = struct.unpack('<I', bytes(file_content[80:84]))[0]
+        if STL_BINARY_HEADER_SIZE + triangle_count * STL_FACET_DTYPE.itemsize == len(file_content):
+            return True
+
+    head = bytes(file_content[:FORMAT_SNIFF_SIZE]).lstrip().lower()
+    if not head.startswith(b'solid'):
+        return True
+
     try:
-        # Try to decode first 80 bytes as ASCII
-        header = file_content[:80].decode('ascii', errors='strict')
-        # If it starts with 'solid', it might be ASCII
-        if header.strip().lower().startswith('solid'):
-            # Check if the rest looks like ASCII
-            try:
-                file_content[80:].decode('ascii', errors='strict')
-                return False  # ASCII
-            except UnicodeDecodeError:
-                return True   # Binary
-        else:
-            return True  # Binary
+        head.decode('ascii', errors='strict')
     except UnicodeDecodeError:
         return True  # Binary
 
+    # Short files may hold an empty solid; longer ones must show facets early
+    return not (b'facet' in head or b'endsolid' in head or len(file_content) <= FORMAT_SNIFF_SIZE)
+
 
 def calculate_mesh_volume(triangles: List[np.ndarray]) -> float:
     """
     Calculate volume of a mesh using the divergence theorem.
-    Each triangle contributes to the volume based on its position and normal.
+    Each triangle contributes the signed volume of the tetrahedron it forms
+    with a reference point; see mesh_metrics.compute_mesh_metrics.
     """
-    volume = 0.0
-    
-    for triangle in triangles:
-        v1, v2, v3 = triangle
-        
-        # Calculate triangle normal using cross product
-        edge1 = v2 - v1
-        edge2 = v3 - v1
-        normal = np.cross(edge1, edge2)
-        
-        # Calculate triangle area
-        area = 0.5 * np.linalg.norm(normal)
-        
-        # Calculate contribution to volume (dot product with centroid)
-        centroid = (v1 + v2 + v3) / 3.0
-        volume += np.dot(normal, centroid) / 6.0
-    
-    return abs(volume)
+    return compute_mesh_metrics(triangles)["volume_mm3"]
 
 
 def parse_stl_file(file_content: bytes) -> Tuple[float, int]:
@@ -118,9 +202,7 @@ def parse_stl_file(file_content: bytes) -> Tuple[float, int]:
         if is_binary_stl(file_content):
             triangles, triangle_count = parse_stl_binary(file_content)
         else:
-            # Convert bytes to string for ASCII parsing
-            content_str = file_content.decode('utf-8')
-            triangles, triangle_count = parse_stl_ascii(content_str)
+            triangles, triangle_count = parse_stl_ascii(file_content)
         
         # Calculate volume in cubic units (assuming STL units are mm)
         volume_mm3 = calculate_mesh_volume(triangles)
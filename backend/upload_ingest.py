@@ -0,0 +1,265 @@
+import io
+import json
+import mmap
+import os
+import tempfile
+from typing import BinaryIO, Dict, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+
+from quote_cache import new_content_hasher
+
+# Bytes read from the request per step
+INGEST_CHUNK_SIZE = 1024 * 1024
+# Bytes kept for format sniffing
+SNIFF_SIZE = 1024
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(256 * 1024 * 1024)))
+# Uploads larger than this are spilled to a memory-mapped temp file
+UPLOAD_SPILL_BYTES = int(os.getenv("UPLOAD_SPILL_BYTES", str(8 * 1024 * 1024)))
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+
+    def __init__(self, max_bytes: int):
+        if max_bytes >= 1024 * 1024:
+            limit = f"{max_bytes // (1024 * 1024)} MB"
+        else:
+            limit = f"{max_bytes} byte"
+        super().__init__(f"File exceeds the {limit} upload limit")
+        self.max_bytes = max_bytes
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """
+    Guess a file's format from its first bytes.
+    Returns 'step', 'stl-ascii', 'obj', 'zip', 'stl-binary' or None.
+    """
+    if head.startswith(b'PK\x03\x04'):
+        return 'zip'
+    text = head.lstrip().lower()
+    if text.startswith(b'iso-10303-21'):
+        return 'step'
+    if text.startswith(b'solid') and b'facet' in text:
+        return 'stl-ascii'
+    if text.startswith((b'v ', b'#', b'o ', b'g ', b'mtllib')) or b'\nv ' in text:
+        return 'obj'
+    if len(head) >= 84:
+        return 'stl-binary'
+    return None
+
+
+class IngestedUpload:
+    """
+    An upload read from the request, with its hash computed on the way in.
+
+    Small uploads live in memory; larger ones are backed by a memory-mapped
+    temporary file. Either way ``view`` exposes the content as a memoryview
+    so parsers don't need a bytes copy. Call close() (or use ``with``) to
+    release the mapping and delete the temp file.
+    """
+
+    def __init__(self, view: memoryview, size: int, digest: str,
+                 sniffed_format: Optional[str], path: Optional[str] = None,
+                 mapping: Optional[mmap.mmap] = None):
+        self.view = view
+        self.size = size
+        self.digest = digest
+        self.sniffed_format = sniffed_format
+        self.path = path
+        self._mapping = mapping
+
+    @property
+    def storage_payload(self) -> Union[memoryview, str]:
+        """
+        Content for the storage client without copying it: the file path to
+        stream from when spilled, else the in-memory view.
+        """
+        return self.path if self.path else self.view
+
+    def open(self) -> BinaryIO:
+        """Seekable file object over the content, e.g. for zipfile."""
+        if self.path:
+            return open(self.path, 'rb')
+        return io.BytesIO(self.view)
+
+    def close(self) -> None:
+        self.view.release()
+        if self._mapping is not None:
+            try:
+                self._mapping.close()
+            except BufferError:
+                # A consumer still holds a view; the mapping is freed with it
+                pass
+            self._mapping = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+    def __enter__(self) -> "IngestedUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _Ingestor:
+    """Accumulates chunks into memory or a spill file while hashing them."""
+
+    def __init__(self, max_bytes: int, spill_bytes: Optional[int]):
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.hasher = new_content_hasher()
+        self.head = b''
+        self.buffer = bytearray()
+        self.spill = None
+        self.size = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes)
+
+        self.hasher.update(chunk)
+        if len(self.head) < SNIFF_SIZE:
+            self.head += chunk[:SNIFF_SIZE - len(self.head)]
+
+        if self.spill is None and self.spill_bytes is not None and self.size > self.spill_bytes:
+            self.spill = tempfile.NamedTemporaryFile(prefix='upload-', delete=False)
+            self.spill.write(self.buffer)
+            self.buffer = None
+        if self.spill is not None:
+            self.spill.write(chunk)
+        else:
+            self.buffer += chunk
+
+    def abort(self) -> None:
+        if self.spill is not None:
+            self.spill.close()
+            os.unlink(self.spill.name)
+
+    def finish(self) -> IngestedUpload:
+        sniffed_format = sniff_format(self.head)
+        if self.spill is None:
+            return IngestedUpload(memoryview(self.buffer), self.size, self.hasher.hexdigest(), sniffed_format)
+
+        self.spill.flush()
+        mapping = mmap.mmap(self.spill.fileno(), self.size, access=mmap.ACCESS_READ)
+        # The mapping stays valid after the descriptor is closed
+        self.spill.close()
+        return IngestedUpload(memoryview(mapping), self.size, self.hasher.hexdigest(), sniffed_format,
+                              path=self.spill.name, mapping=mapping)
+
+
+async def ingest_upload(upload: UploadFile,
+                        max_bytes: int = UPLOAD_MAX_BYTES,
+                        spill_bytes: Optional[int] = UPLOAD_SPILL_BYTES,
+                        chunk_size: int = INGEST_CHUNK_SIZE) -> IngestedUpload:
+    """
+    Read an upload in chunks, hashing and sniffing it as it arrives.
+
+    Args:
+        upload: Multipart file from the request
+        max_bytes: Largest accepted upload
+        spill_bytes: Size above which content moves to a temp file (None: never)
+        chunk_size: Bytes read per step
+
+    Raises:
+        UploadTooLargeError: As soon as more than max_bytes have been read
+    """
+    # Starlette records the size of spooled multipart files; reject before reading
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    ingestor = _Ingestor(max_bytes, spill_bytes)
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            ingestor.feed(chunk)
+    except BaseException:
+        ingestor.abort()
+        raise
+    return ingestor.finish()
+
+
+def ingest_file_object(file_object: BinaryIO,
+                       max_bytes: int = UPLOAD_MAX_BYTES,
+                       spill_bytes: Optional[int] = UPLOAD_SPILL_BYTES,
+                       chunk_size: int = INGEST_CHUNK_SIZE) -> IngestedUpload:
+    """
+    Blocking counterpart of ingest_upload for file-like objects such as
+    zip archive members, which are decompressed chunk by chunk.
+    """
+    ingestor = _Ingestor(max_bytes, spill_bytes)
+    try:
+        while True:
+            chunk = file_object.read(chunk_size)
+            if not chunk:
+                break
+            ingestor.feed(chunk)
+    except BaseException:
+        ingestor.abort()
+        raise
+    return ingestor.finish()
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that rejects oversized upload bodies with 413.
+
+    Requests with a Content-Length above the limit for their path are refused
+    before any body is read; chunked bodies are cut off once they pass it.
+    """
+
+    def __init__(self, app, limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        if limits is None:
+            limits = {"/upload": UPLOAD_MAX_BYTES}
+        # Leave headroom for multipart boundaries and form fields
+        self.limits = {path: max_bytes + 64 * 1024 for path, max_bytes in limits.items()}
+        self.details = {path: str(UploadTooLargeError(max_bytes)) for path, max_bytes in limits.items()}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.limits:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.limits[scope["path"]]
+        detail = self.details[scope["path"]]
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            await self._reject(send, detail)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Raised inside body parsing, so the app's exception
+                    # handling turns it into a normal 413 response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,54 +1,84 @@
+import numpy as np
+from typing import List, Optional
+
+from pricing_engine import get_pricing_engine, price_matrix
+
+# Rates live in pricing_rates.json (see pricing_engine); these helpers keep
+# the original single-part API on top of the vectorised engine.
+
+
+def _single_part_options(weight_g: float, print_time_h: float, resin_print_time_h: float) -> dict:
+    return get_pricing_engine().pricing_options_by_weight(
+        [weight_g], {"fdm": [print_time_h], "resin": [resin_print_time_h]}
+    )[0]
+
 def calculate_price_fdm(weight_g: float, print_time_h: float) -> float:
-    """Calculate price for FDM printing (current logic)"""
-    material_cost = weight_g * 0.02  # £0.02 per gram (PLA/PETG)
-    labor_cost = print_time_h * 2.5  # £2.5 per hour
-    setup_fee = 2.0  # £2 setup fee
-    total_price = material_cost + labor_cost + setup_fee
-    return round(total_price, 2)
+    """Calculate price for FDM printing (default FDM material)"""
+    return _single_part_options(weight_g, print_time_h, print_time_h)["fdm"]["price"]
 
 def calculate_price_resin(weight_g: float, print_time_h: float) -> float:
-    """Calculate price for Resin printing"""
-    # Resin is more expensive per gram but faster printing
-    material_cost = weight_g * 0.08  # £0.08 per gram (resin is ~4x more expensive)
-    labor_cost = print_time_h * 2.5  # £2.5 per hour (same labor rate as FDM)
-    setup_fee = 10.0  # £10 setup fee (higher setup cost for resin)
-    post_processing = 1.5  # £1.5 for washing and curing
-    total_price = material_cost + labor_cost + setup_fee + post_processing
-    return round(total_price, 2)
-
-def calculate_dual_pricing(weight_g: float, print_time_h: float) -> dict:
-    """Calculate pricing for both printer types"""
+    """Calculate price for Resin printing (default resin material)"""
+    return _single_part_options(weight_g, print_time_h, print_time_h)["resin"]["price"]
+
+def calculate_dual_pricing(weight_g: float, print_time_h: float, resin_print_time_h: Optional[float] = None) -> dict:
+    """
+    Calculate pricing for both printer types.
+    Pass resin_print_time_h when a geometry-based estimate is available.
+    """
+    if resin_print_time_h is None:
+        resin_print_time_h = estimate_resin_print_time(print_time_h)
+    return _single_part_options(weight_g, print_time_h, resin_print_time_h)
+
+def estimate_resin_print_time(print_time_h: float) -> float:
+    """Resin time from an FDM estimate when no layer-based estimate exists"""
     # For resin, print time is typically faster (especially for small/detailed parts)
-    resin_print_time = max(0.3, print_time_h * 0.6)  # Resin is ~40% faster
-    
-    return {
-        "fdm": {
-            "price": calculate_price_fdm(weight_g, print_time_h),
-            "print_time_h": print_time_h,
-            "material_type": "PLA/PETG",
-            "technology": "FDM",
-            "details": {
-                "material_cost": weight_g * 0.02,
-                "labor_cost": print_time_h * 2.5,
-                "setup_fee": 2.0,
-                "post_processing": 0.0
-            }
-        },
-        "resin": {
-            "price": calculate_price_resin(weight_g, resin_print_time),
-            "print_time_h": resin_print_time,
-            "material_type": "Photopolymer Resin",
-            "technology": "SLA/DLP",
-            "details": {
-                "material_cost": weight_g * 0.08,
-                "labor_cost": resin_print_time * 2.5,
-                "setup_fee": 10.0,
-                "post_processing": 1.5
-            }
-        }
-    }
+    return max(0.3, print_time_h * 0.6)  # Resin is ~40% faster
 
 # Keep backward compatibility
 def calculate_price(weight_g: float, print_time_h: float) -> float:
     """Legacy function - defaults to FDM pricing"""
-    return calculate_price_fdm(weight_g, print_time_h)
\ No newline at end of file
+    return calculate_price_fdm(weight_g, print_time_h)
+
+def reprice_orders(orders: List[dict]) -> List[dict]:
+    """
+    Current prices for stored orders, all priced in one vectorised pass.
+
+    Args:
+        orders: Order rows with id, weight_g, print_time_h,
+            estimated_print_time_resin, printer_type and material_type
+
+    Returns:
+        One {"id", "price_gbp", "price_fdm", "price_resin"} per order whose
+        printer type is in the rate table
+    """
+    engine = get_pricing_engine()
+    rates = engine.rates
+    orders = [order for order in orders if order.get("printer_type", "fdm") in rates.printers]
+    if not orders:
+        return []
+
+    weight_g = np.array([order.get("weight_g") or 0.0 for order in orders], dtype=np.float64)
+    fdm_h = np.array([order.get("print_time_h") or 0.0 for order in orders], dtype=np.float64)
+    resin_h = np.array([
+        order.get("estimated_print_time_resin") or estimate_resin_print_time(fdm)
+        for order, fdm in zip(orders, fdm_h)
+    ])
+    times = {"fdm": fdm_h, "resin": resin_h}
+    # Stored weights were computed at the default density, so use them as-is for every material
+    weights = np.repeat(weight_g[:, None], len(rates.materials), axis=1)
+    totals = price_matrix(rates, weights, np.column_stack([times[printer] for printer in rates.printers])).total
+
+    rows = np.arange(len(orders))
+    printer_index = np.array([rates.printers.index(order.get("printer_type", "fdm")) for order in orders])
+    material_index = np.array([
+        rates.material_index(order.get("material_type"), order.get("printer_type", "fdm")) for order in orders
+    ])
+    chosen = totals[rows, material_index, printer_index].tolist()
+    fdm_index, resin_index = rates.printers.index("fdm"), rates.printers.index("resin")
+    price_fdm = totals[:, rates.default_materials[fdm_index], fdm_index].tolist()
+    price_resin = totals[:, rates.default_materials[resin_index], resin_index].tolist()
+
+    return [
+        {"id": order["id"], "price_gbp": chosen[row], "price_fdm": price_fdm[row], "price_resin": price_resin[row]}
+        for row, order in enumerate(orders)
+    ]
@@ -0,0 +1,8 @@
+-- Part dimensions for build-plate planning (GET /admin/build-plan)
+-- Run this in your Supabase SQL Editor
+
+-- Bounding box of the part in mm, stored when the order is confirmed
+ALTER TABLE orders
+ADD COLUMN IF NOT EXISTS size_x_mm FLOAT,
+ADD COLUMN IF NOT EXISTS size_y_mm FLOAT,
+ADD COLUMN IF NOT EXISTS size_z_mm FLOAT;
@@ -0,0 +1,13 @@
+-- Indexes for keyset-paginated order listing (GET /orders)
+-- Run this in your Supabase SQL Editor
+
+-- Default listing: newest first, ties broken by id
+CREATE INDEX IF NOT EXISTS idx_orders_created_at_id ON orders(created_at DESC, id DESC);
+
+-- Filtered listings keep the keyset order after the equality filter
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_at_id ON orders(status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_printer_type_created_at_id ON orders(printer_type, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_user_id_created_at_id ON orders(user_id, created_at DESC, id DESC);
+
+-- The single-column created_at index is covered by idx_orders_created_at_id
+DROP INDEX IF EXISTS idx_orders_created_at;
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent analysis job queue in backend/analysis_jobs.py
+"""
+
+import asyncio
+import sqlite3
+import sys
+sys.path.append('backend')
+
+import pytest
+
+from analysis_jobs import (JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, IdempotencyConflictError, JobStore,
+                          JobWorkerPool)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_enqueue_is_idempotent_per_key(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+
+    first = store.enqueue({"filename": "a.stl"}, job_id="job-1", idempotency_key="key-1")
+    again = store.enqueue({"filename": "a.stl"}, job_id="job-2", idempotency_key="key-1")
+
+    assert first["id"] == again["id"] == "job-1"
+    assert store.counts() == {JOB_QUEUED: 1}
+
+
+def test_failed_attempts_are_retried_then_given_up(tmp_path):
+    clock = FakeClock()
+    store = JobStore(str(tmp_path / "jobs.db"), clock=clock)
+    calls = []
+
+    async def flaky(job):
+        calls.append(job["attempts"])
+        if len(calls) < 2:
+            raise RuntimeError("storage unavailable")
+        return {"price": 12.5}
+
+    pool = JobWorkerPool(store, flaky, retry_delay_s=10)
+    store.enqueue({}, job_id="job-1")
+
+    assert asyncio.run(pool.run_once())
+    assert store.get("job-1")["status"] == JOB_QUEUED
+    # Not due until the retry delay has passed
+    assert not asyncio.run(pool.run_once())
+    clock.now += 10
+    assert asyncio.run(pool.run_once())
+
+    job = store.get("job-1")
+    assert calls == [1, 2]
+    assert job["status"] == JOB_DONE
+    assert job["result"] == {"price": 12.5}
+
+    async def broken(job):
+        raise RuntimeError("bad file")
+
+    pool = JobWorkerPool(store, broken, retry_delay_s=0)
+    store.enqueue({}, job_id="job-2", max_attempts=2)
+    asyncio.run(pool.run_once())
+    asyncio.run(pool.run_once())
+    assert store.get("job-2")["status"] == JOB_FAILED
+    assert store.get("job-2")["error"] == "bad file"
+
+
+def test_expired_lease_is_reclaimed_and_stale_result_ignored(tmp_path):
+    clock = FakeClock()
+    store = JobStore(str(tmp_path / "jobs.db"), clock=clock)
+    store.enqueue({}, job_id="job-1")
+
+    stale = store.claim(lease_s=30)
+    assert stale["status"] == JOB_RUNNING
+    assert store.claim(lease_s=30) is None
+
+    clock.now += 31
+    current = store.claim(lease_s=30)
+    assert current["attempts"] == 2
+
+    assert not store.complete(stale, {"price": 1})
+    assert store.complete(current, {"price": 2})
+    assert store.get("job-1")["result"] == {"price": 2}
+
+
+def test_workers_drain_submitted_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+
+    async def double(job):
+        return {"value": job["payload"]["value"] * 2}
+
+    async def run():
+        pool = JobWorkerPool(store, double, workers=2, poll_interval_s=5)
+        pool.start()
+        for index in range(4):
+            await pool.submit({"value": index}, job_id=f"job-{index}")
+        for _ in range(100):
+            if store.counts() == {JOB_DONE: 4}:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+    asyncio.run(run())
+    assert [store.get(f"job-{index}")["result"]["value"] for index in range(4)] == [0, 2, 4, 6]
+
+
+def test_idempotency_key_reused_for_other_request_conflicts(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+
+    first = store.enqueue({"filename": "a.stl"}, job_id="job-1", idempotency_key="key-1", request_hash="aaaa.stl")
+    again = store.enqueue({"filename": "a.stl"}, job_id="job-2", idempotency_key="key-1", request_hash="aaaa.stl")
+    with pytest.raises(IdempotencyConflictError) as excinfo:
+        store.enqueue({"filename": "b.stl"}, job_id="job-3", idempotency_key="key-1", request_hash="bbbb.stl")
+
+    assert first["id"] == again["id"] == excinfo.value.job_id == "job-1"
+    assert store.counts() == {JOB_QUEUED: 1}
+
+
+def test_request_hash_column_is_added_to_old_tables(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE analysis_jobs (id TEXT PRIMARY KEY, idempotency_key TEXT UNIQUE, payload TEXT NOT NULL,"
+        " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, result TEXT,"
+        " error TEXT, available_at REAL NOT NULL, lease_expires_at REAL, created_at REAL NOT NULL,"
+        " updated_at REAL NOT NULL)"
+    )
+    db.execute("INSERT INTO analysis_jobs (id, idempotency_key, payload, status, max_attempts, available_at,"
+               " created_at, updated_at) VALUES ('old', 'key-1', '{}', 'queued', 3, 0, 0, 0)")
+    db.commit()
+    db.close()
+
+    job = JobStore(path).enqueue({}, job_id="new", idempotency_key="key-1", request_hash="aaaa.stl")
+
+    assert job["id"] == "old"
+    assert job["request_hash"] is None
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-pool mesh analysis in backend/analysis_service.py
+"""
+
+import asyncio
+import sys
+sys.path.append('backend')
+
+import pytest
+
+import analysis_service
+from analysis_service import AnalysisBusyError, AnalysisService
+from test_stl_parser import TETRAHEDRON, make_binary_stl
+
+
+def test_small_files_run_in_process():
+    service = AnalysisService(inprocess_max_bytes=1024 * 1024)
+
+    metrics = asyncio.run(service.analyze(make_binary_stl(TETRAHEDRON), "part.stl"))
+
+    assert metrics["triangle_count"] == 4
+    assert metrics["volume_mm3"] == pytest.approx(1 / 6, rel=1e-5)
+    assert service._executor is None
+
+
+@pytest.mark.parametrize("use_shared_memory", [True, False])
+def test_large_files_run_on_pool(use_shared_memory):
+    service = AnalysisService(max_workers=1, inprocess_max_bytes=0,
+                              use_shared_memory=use_shared_memory)
+    try:
+        metrics = asyncio.run(service.analyze(make_binary_stl(TETRAHEDRON), "part.stl"))
+    finally:
+        service.shutdown()
+
+    assert metrics["file_format"] == "STL"
+    assert metrics["volume_mm3"] == pytest.approx(1 / 6, rel=1e-5)
+    assert service.outstanding == 0
+
+
+def test_full_queue_raises_busy():
+    service = AnalysisService(max_workers=1, max_queued=0, inprocess_max_bytes=0, retry_after_s=7)
+    service._outstanding = 1
+
+    with pytest.raises(AnalysisBusyError) as excinfo:
+        asyncio.run(service.analyze(make_binary_stl(TETRAHEDRON), "part.stl"))
+
+    assert excinfo.value.retry_after == 7
+    assert service._executor is None
+
+
+def test_empty_step_file_is_not_sent_to_pool():
+    service = AnalysisService(max_workers=1, inprocess_max_bytes=0)
+
+    metrics = asyncio.run(service.analyze(b"", "part.step"))
+
+    assert metrics["estimated"] is True
+    assert metrics["file_format"] == "STEP"
+    assert service._executor is None
+
+
+def test_step_without_backend_is_not_sent_to_pool(monkeypatch):
+    monkeypatch.setattr(analysis_service, "STEP_BACKEND_AVAILABLE", False)
+    service = AnalysisService(max_workers=1, inprocess_max_bytes=0)
+
+    metrics = asyncio.run(service.analyze(b"ISO-10303-21;" * 1000, "part.step"))
+
+    assert metrics["estimated"] is True
+    assert service._executor is None
+
+
+def test_background_jobs_only_take_idle_workers():
+    service = AnalysisService(max_workers=1, max_queued=4)
+    service._outstanding = 1
+
+    async def submit():
+        return service.submit_background(sum, [1, 2])
+
+    assert asyncio.run(submit()) is None
+    assert service._executor is None
+
+    service._outstanding = 0
+
+    async def run():
+        return await service.submit_background(sum, [1, 2])
+
+    try:
+        assert asyncio.run(run()) == 3
+    finally:
+        service.shutdown()
+    assert service.outstanding == 0
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for local JWT verification in backend/auth_tokens.py
+"""
+
+import asyncio
+import base64
+import json
+import sys
+import time
+sys.path.append('backend')
+
+import jwt
+import pytest
+
+from auth_tokens import TokenVerifier
+
+SECRET = "super-secret-jwt-token-with-at-least-32-characters"
+JWKS_SECRET = b"local-jwks-signing-secret-32-bytes!!"
+
+
+def make_token(key=SECRET, expires_in=3600, kid=None, **claims):
+    payload = {
+        "sub": "user-1",
+        "email": "maker@example.com",
+        "aud": "authenticated",
+        "exp": int(time.time()) + expires_in,
+        **claims,
+    }
+    headers = {"kid": kid} if kid else None
+    return jwt.encode(payload, key, algorithm="HS256", headers=headers)
+
+
+def write_jwks(tmp_path):
+    """Stand-in JWKS with one symmetric key."""
+    key = base64.urlsafe_b64encode(JWKS_SECRET).rstrip(b"=").decode()
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [{"kty": "oct", "kid": "key-1", "alg": "HS256", "k": key}]}))
+    return str(path)
+
+
+def test_verifies_with_project_secret():
+    verifier = TokenVerifier(jwt_secret=SECRET)
+
+    user = asyncio.run(verifier.verify(make_token()))
+
+    assert user == {"id": "user-1", "email": "maker@example.com"}
+
+
+def test_rejects_expired_and_forged_tokens():
+    verifier = TokenVerifier(jwt_secret=SECRET)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        asyncio.run(verifier.verify(make_token(expires_in=-120)))
+    with pytest.raises(jwt.InvalidSignatureError):
+        asyncio.run(verifier.verify(make_token(key="x" * 40)))
+
+
+def test_verifies_with_local_jwks(tmp_path):
+    verifier = TokenVerifier(jwks_path=write_jwks(tmp_path))
+
+    async def run():
+        await verifier.start()
+        try:
+            return await verifier.verify(make_token(key=JWKS_SECRET, kid="key-1"))
+        finally:
+            await verifier.stop()
+
+    assert asyncio.run(run())["id"] == "user-1"
+
+
+def test_caches_verified_users_and_falls_back_to_remote():
+    remote_calls = []
+
+    async def remote_lookup(token):
+        remote_calls.append(token)
+        return {"id": "remote-user", "email": None}
+
+    verifier = TokenVerifier(remote_lookup=remote_lookup)
+    token = make_token(kid="unknown")
+
+    async def run():
+        return [await verifier.verify(token) for _ in range(3)]
+
+    users = asyncio.run(run())
+
+    assert users == [{"id": "remote-user", "email": None}] * 3
+    assert remote_calls == [token]
+
+
+def test_remote_users_are_not_cached_past_token_expiry():
+    remote_calls = []
+    now = [time.time()]
+
+    async def remote_lookup(token):
+        remote_calls.append(token)
+        return {"id": "remote-user", "email": None}
+
+    verifier = TokenVerifier(remote_lookup=remote_lookup, cache_ttl_s=300.0, clock=lambda: now[0])
+    token = make_token(kid="unknown", expires_in=60)
+
+    asyncio.run(verifier.verify(token))
+    now[0] += 120
+    asyncio.run(verifier.verify(token))
+
+    assert remote_calls == [token, token]
+
+
+def test_asymmetric_jwks_keys_are_usable():
+    # Needs the cryptography package; without it RS256 keys are skipped
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+
+    assert jwt.PyJWK({**public_jwk, "kid": "rsa-1", "alg": "RS256"}).algorithm_name == "RS256"
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Parser and pricing benchmarks on synthetic meshes with known geometry.
+
+Every case writes a subdivided box (exact volume, any facet count) as
+binary STL, ASCII STL or OBJ, then times the format parser, volume,
+validation, pricing and the whole of parse_file in a fresh interpreter,
+recording throughput (facets/s), peak RSS and the volume error.
+
+Run directly to benchmark and compare against the JSON baseline:
+    python test_benchmarks.py [--sizes 1000 1000000 10000000] [--formats stl obj]
+                              [--update-baseline] [--threshold 0.25]
+
+The exit status is 1 when a case is inaccurate or slower (or larger) than
+the baseline by more than the threshold. Baselines are machine specific;
+record one with --update-baseline on the machine that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+sys.path.append('backend')
+
+import numpy as np
+import pytest
+
+from file_parser import parse_file, parse_obj_file
+from indexed_mesh import IndexedMesh
+from mesh_metrics import compute_mesh_metrics
+from mesh_validation import validate_mesh
+from pricing_engine import get_pricing_engine
+from stl_parser import STL_FACET_DTYPE, parse_stl_ascii, parse_stl_binary
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.getenv("BENCHMARK_BASELINE", os.path.join(ROOT_DIR, "benchmark_baseline.json"))
+# Allowed slowdown (or peak RSS growth) before a case counts as a regression
+REGRESSION_THRESHOLD = float(os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "0.25"))
+# Largest relative volume error accepted for float32 coordinates
+VOLUME_TOLERANCE = 1e-5
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+# Kept small so the pytest run stays quick; the CLI goes up to 10M facets
+TEST_SIZES = tuple(int(size) for size in os.getenv("BENCHMARK_TEST_SIZES", "1000,10000").split(","))
+FORMATS = ("stl-binary", "stl-ascii", "obj")
+STAGES = ("parse", "volume", "validation", "pricing", "parse_file")
+
+BOX_SIZE = (40.0, 30.0, 20.0)
+
+
+def subdivided_box(facet_count: int, size: Sequence[float] = BOX_SIZE) -> IndexedMesh:
+    """
+    Closed, outward-facing box whose sides are split into an n x n grid of
+    quads, giving 12 n^2 facets (n chosen to get close to ``facet_count``).
+    The volume is exactly the product of ``size`` however fine the grid.
+    Grid vertices along the box edges are repeated per side, as in STL.
+    """
+    divisions = max(1, int(round(np.sqrt(facet_count / 12))))
+    sx, sy, sz = size
+    x, y, z = np.array([sx, 0, 0]), np.array([0, sy, 0]), np.array([0, 0, sz])
+    # (origin, u, v) per side with u x v pointing outwards
+    sides = [
+        (np.zeros(3), y, x), (z, x, y),
+        (np.zeros(3), x, z), (y, z, x),
+        (np.zeros(3), z, y), (x, y, z),
+    ]
+
+    steps = np.arange(divisions + 1) / divisions
+    u_steps, v_steps = np.meshgrid(steps, steps, indexing='ij')
+    grid = np.arange((divisions + 1) ** 2).reshape(divisions + 1, divisions + 1)
+    a, b, c, d = grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:], grid[:-1, 1:]
+    grid_faces = np.concatenate([
+        np.stack([a, b, c], axis=-1).reshape(-1, 3),
+        np.stack([a, c, d], axis=-1).reshape(-1, 3),
+    ])
+
+    vertices = [origin + u_steps[..., None] * u + v_steps[..., None] * v for origin, u, v in sides]
+    faces = [grid_faces + index * grid.size for index in range(len(sides))]
+    return IndexedMesh(np.concatenate([block.reshape(-1, 3) for block in vertices]).astype(np.float32),
+                       np.concatenate(faces).astype(np.int32))
+
+
+def box_volume(size: Sequence[float] = BOX_SIZE) -> float:
+    return float(np.prod(size))
+
+
+def to_binary_stl(mesh: IndexedMesh) -> bytes:
+    records = np.zeros(len(mesh.faces), dtype=STL_FACET_DTYPE)
+    records['vertices'] = mesh.vertices[mesh.faces]
+    return b'\0' * 80 + np.uint32(len(records)).tobytes() + records.tobytes()
+
+
+def to_ascii_stl(mesh: IndexedMesh) -> bytes:
+    facet = ("facet normal 0 0 0\n outer loop\n"
+             + "  vertex %.9g %.9g %.9g\n" * 3
+             + " endloop\nendfacet\n")
+    coordinates = tuple(mesh.vertices[mesh.faces].reshape(-1).tolist())
+    return ("solid box\n" + facet * len(mesh.faces) % coordinates + "endsolid box\n").encode()
+
+
+def to_obj(mesh: IndexedMesh) -> bytes:
+    vertices = "v %.9g %.9g %.9g\n" * len(mesh.vertices) % tuple(mesh.vertices.reshape(-1).tolist())
+    faces = "f %d %d %d\n" * len(mesh.faces) % tuple((mesh.faces + 1).reshape(-1).tolist())
+    return (vertices + faces).encode()
+
+
+WRITERS = {"stl-binary": (to_binary_stl, "stl"), "stl-ascii": (to_ascii_stl, "stl"), "obj": (to_obj, "obj")}
+PARSERS = {"stl-binary": parse_stl_binary, "stl-ascii": parse_stl_ascii, "obj": parse_obj_file}
+
+
+def _peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _best_time(function, repeats: int):
+    """Smallest wall time of ``repeats`` calls, and the last result."""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_case(path: str, file_format: str, known_volume: float, repeats: int) -> dict:
+    """Time every stage on one generated file; runs in its own interpreter."""
+    with open(path, "rb") as handle:
+        content = handle.read()
+    filename = f"part.{WRITERS[file_format][1]}"
+    engine = get_pricing_engine()
+
+    timings = {}
+    timings["parse"], (triangles, facet_count) = _best_time(lambda: PARSERS[file_format](content), repeats)
+    timings["volume"], metrics = _best_time(lambda: compute_mesh_metrics(triangles), repeats)
+    timings["validation"], validation = _best_time(lambda: validate_mesh(triangles, metrics), repeats)
+    print_times = {printer: [1.0] for printer in engine.rates.printers}
+    timings["pricing"], _ = _best_time(
+        lambda: engine.pricing_options([metrics["volume_mm3"]], print_times), repeats)
+    timings["parse_file"], (volume_mm3, _, _) = _best_time(lambda: parse_file(content, filename), repeats)
+
+    return {
+        "format": file_format,
+        "facets": int(facet_count),
+        "file_bytes": len(content),
+        "seconds": timings,
+        "facets_per_s": {stage: facet_count / seconds if seconds > 0 else None
+                         for stage, seconds in timings.items()},
+        "peak_rss_mb": _peak_rss_mb(),
+        "volume_rel_error": abs(volume_mm3 - known_volume) / known_volume,
+        "watertight": validation["watertight"],
+    }
+
+
+def measure_case(file_format: str, facet_count: int, repeats: int = 3) -> dict:
+    """Generate one mesh file and benchmark it in a fresh interpreter."""
+    writer, extension = WRITERS[file_format]
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, f"box.{extension}")
+        with open(path, "wb") as handle:
+            handle.write(writer(subdivided_box(facet_count)))
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--case", path, file_format,
+             repr(box_volume()), str(repeats)],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def case_key(result: dict) -> str:
+    return f"{result['format']}:{result['facets']}"
+
+
+def run_benchmarks(sizes: Sequence[int] = DEFAULT_SIZES, formats: Sequence[str] = FORMATS,
+                   repeats: int = 3) -> Dict[str, dict]:
+    results = {}
+    for file_format in formats:
+        for size in sizes:
+            result = measure_case(file_format, size, repeats)
+            results[case_key(result)] = result
+    return results
+
+
+def find_regressions(results: Dict[str, dict], baseline: Dict[str, dict],
+                     threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Inaccurate cases, and cases slower or larger than their baseline by more than ``threshold``."""
+    problems = []
+    for key, result in results.items():
+        if result["volume_rel_error"] > VOLUME_TOLERANCE:
+            problems.append(f"{key}: volume off by {result['volume_rel_error']:.2e}")
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for stage in STAGES:
+            now, before = result["facets_per_s"].get(stage), previous["facets_per_s"].get(stage)
+            if now and before and now < before * (1 - threshold):
+                problems.append(f"{key}: {stage} {now:,.0f} facets/s, baseline {before:,.0f}")
+        if result["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + threshold):
+            problems.append(f"{key}: peak RSS {result['peak_rss_mb']:.0f} MB, "
+                            f"baseline {previous['peak_rss_mb']:.0f} MB")
+    return problems
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Optional[Dict[str, dict]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)["cases"]
+
+
+def save_baseline(results: Dict[str, dict], path: str = BASELINE_PATH) -> None:
+    with open(path, "w") as handle:
+        json.dump({"python": sys.version.split()[0], "numpy": np.__version__, "cases": results},
+                  handle, indent=2, sort_keys=True)
+
+
+@pytest.mark.parametrize("facet_count", [12, 1000, 100_000])
+def test_subdivided_box_has_exact_volume(facet_count):
+    mesh = subdivided_box(facet_count)
+    metrics = compute_mesh_metrics(mesh)
+
+    assert abs(len(mesh.faces) - facet_count) / facet_count < 0.1
+    assert metrics["volume_mm3"] == pytest.approx(box_volume(), rel=VOLUME_TOLERANCE)
+    assert metrics["surface_area_mm2"] == pytest.approx(2 * (40 * 30 + 30 * 20 + 20 * 40), rel=1e-5)
+    assert validate_mesh(mesh)["warnings"] == []
+
+
+@pytest.mark.parametrize("file_format", FORMATS)
+def test_generated_files_parse_to_known_volume(file_format):
+    writer, extension = WRITERS[file_format]
+
+    volume_mm3, triangle_count, _ = parse_file(writer(subdivided_box(1000)), f"box.{extension}")
+
+    assert triangle_count == len(subdivided_box(1000).faces)
+    assert volume_mm3 == pytest.approx(box_volume(), rel=VOLUME_TOLERANCE)
+
+
+def test_regressions_are_reported():
+    baseline = {"obj:1200": {"facets_per_s": {"parse": 1e6, "volume": 1e7}, "peak_rss_mb": 100.0}}
+    results = {"obj:1200": {"facets_per_s": {"parse": 7e5, "volume": 9e6}, "peak_rss_mb": 140.0,
+                            "volume_rel_error": 0.0}}
+
+    problems = find_regressions(results, baseline, threshold=0.25)
+
+    assert len(problems) == 2
+    assert "parse" in problems[0]
+    assert "peak RSS" in problems[1]
+
+
+def test_no_regression_against_baseline():
+    baseline = load_baseline()
+    if baseline is None:
+        pytest.skip(f"No benchmark baseline at {BASELINE_PATH}; record one with "
+                    f"`python test_benchmarks.py --sizes {' '.join(map(str, TEST_SIZES))} --update-baseline`")
+
+    results = run_benchmarks(TEST_SIZES, FORMATS, repeats=3)
+
+    assert all(result["watertight"] for result in results.values())
+    assert find_regressions(results, baseline) == []
+    missing = sorted(key for key in results if key not in baseline)
+    if missing:
+        pytest.skip(f"No baseline for {', '.join(missing)}; only accuracy was checked for them")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Parser and pricing benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.formats, args.repeats)
+    for key, result in results.items():
+        rates = "  ".join(f"{stage} {rate / 1e6:.2f}M/s" for stage, rate in result["facets_per_s"].items() if rate)
+        print(f"{key:>22}  {rates}  rss {result['peak_rss_mb']:.0f} MB")
+
+    if args.update_baseline:
+        baseline = load_baseline(args.baseline) or {}
+        baseline.update(results)
+        save_baseline(baseline, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; only accuracy is checked (record one with --update-baseline)")
+    problems = find_regressions(results, baseline or {}, args.threshold)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--case":
+        path, file_format, known_volume, repeats = sys.argv[2:6]
+        print(json.dumps(run_case(path, file_format, float(known_volume), int(repeats))))
+    else:
+        sys.exit(main())
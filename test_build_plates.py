@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for build-plate packing and scheduling in backend/build_plates.py
+"""
+
+import random
+import sys
+import time
+sys.path.append('backend')
+
+from build_plates import Fleet, PrinterGroup, Skyline, load_fleet, plan_build_plates
+
+FDM = PrinterGroup("fdm", 2, 200.0, 200.0, 200.0, 24.0)
+RESIN = PrinterGroup("resin", 1, 120.0, 70.0, 150.0, float("inf"))
+FLEET = Fleet(5.0, {"fdm": FDM, "resin": RESIN})
+
+
+def make_order(order_id, size, printer_type="fdm", print_time_h=1.0):
+    return {
+        "id": order_id, "printer_type": printer_type, "print_time_h": print_time_h,
+        "estimated_print_time_resin": None,
+        "size_x_mm": size[0], "size_y_mm": size[1], "size_z_mm": size[2],
+    }
+
+
+def placed_rectangles(plan, orders):
+    """(job, x, y, width, depth) of every placed part, in its placed orientation."""
+    sizes = {order["id"]: order for order in orders}
+    for job in plan["jobs"]:
+        for part in job["parts"]:
+            order = sizes[part["order_id"]]
+            width, depth = order["size_x_mm"], order["size_y_mm"]
+            if part["rotated"]:
+                width, depth = depth, width
+            yield job, part["x_mm"], part["y_mm"], width, depth
+
+
+def test_skyline_fills_rows_bottom_left():
+    skyline = Skyline(100.0, 100.0)
+
+    for _ in range(2):
+        skyline.place(skyline.find(50.0, 40.0), 50.0, 40.0)
+    position = skyline.find(50.0, 40.0)
+
+    assert position[:2] == (40.0, 0.0)
+    assert skyline.segments == [[0.0, 40.0, 100.0]]
+
+
+def test_parts_fit_on_the_bed_without_overlapping():
+    random.seed(7)
+    orders = [make_order(str(index), (random.uniform(5, 90), random.uniform(5, 60), 20), print_time_h=0.5)
+              for index in range(200)]
+
+    plan = plan_build_plates(orders, FLEET)
+
+    assert plan["unplaced"] == []
+    rectangles = list(placed_rectangles(plan, orders))
+    assert len(rectangles) == len(orders)
+    for job, x, y, width, depth in rectangles:
+        assert x + width <= FDM.bed_x_mm + 0.01
+        assert y + depth <= FDM.bed_y_mm + 0.01
+    for index, (job, x, y, width, depth) in enumerate(rectangles):
+        for other_job, ox, oy, other_width, other_depth in rectangles[index + 1:]:
+            if other_job is job:
+                assert (x + width + 5 <= ox + 0.01 or ox + other_width + 5 <= x + 0.01
+                        or y + depth + 5 <= oy + 0.01 or oy + other_depth + 5 <= y + 0.01)
+
+
+def test_small_parts_share_a_plate():
+    orders = [make_order(str(index), (20, 20, 10)) for index in range(4)]
+
+    plan = plan_build_plates(orders, FLEET)
+
+    assert len(plan["jobs"]) == 1
+    assert plan["jobs"][0]["print_time_h"] == 4.0
+
+
+def test_fdm_plates_are_capped_and_spread_over_printers():
+    orders = [make_order(str(index), (20, 20, 10), print_time_h=10.0) for index in range(4)]
+
+    plan = plan_build_plates(orders, FLEET)
+
+    assert [job["print_time_h"] for job in plan["jobs"]] == [20.0, 20.0]
+    assert {job["printer"] for job in plan["jobs"]} == {"fdm-1", "fdm-2"}
+    assert plan["makespan_h"]["fdm"] == 20.0
+
+
+def test_resin_plate_takes_its_slowest_part():
+    orders = [make_order("a", (20, 20, 10), "resin", 2.0), make_order("b", (20, 20, 90), "resin", 5.0)]
+
+    plan = plan_build_plates(orders, FLEET)
+
+    assert len(plan["jobs"]) == 1
+    assert plan["jobs"][0]["print_time_h"] == 3.0
+    assert plan["jobs"][0]["height_mm"] == 90
+
+
+def test_rotated_part_fits_narrow_bed():
+    orders = [make_order("long", (60, 110, 10), "resin")]
+
+    plan = plan_build_plates(orders, FLEET)
+
+    assert plan["jobs"][0]["parts"][0]["rotated"] is True
+
+
+def test_unplaceable_orders_are_reported():
+    orders = [
+        make_order("tall", (20, 20, 500)),
+        make_order("no-size", (None, None, None)),
+        make_order("sls", (20, 20, 20), "sls"),
+    ]
+
+    plan = plan_build_plates(orders, FLEET)
+
+    assert plan["jobs"] == []
+    assert [entry["order_id"] for entry in plan["unplaced"]] == ["tall", "no-size", "sls"]
+
+
+def test_default_fleet_loads():
+    fleet = load_fleet()
+
+    assert set(fleet.groups) == {"fdm", "resin"}
+
+
+def test_thousands_of_parts_plan_in_seconds():
+    random.seed(3)
+    orders = [
+        make_order(str(index), (random.uniform(5, 80), random.uniform(5, 60), random.uniform(5, 140)),
+                   random.choice(["fdm", "resin"]), random.uniform(0.5, 6))
+        for index in range(5000)
+    ]
+
+    started = time.perf_counter()
+    plan = plan_build_plates(orders, FLEET)
+
+    assert time.perf_counter() - started < 5
+    assert sum(len(job["parts"]) for job in plan["jobs"]) + len(plan["unplaced"]) == 5000
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the format parsers in backend/file_parser.py
+"""
+
+import sys
+sys.path.append('backend')
+
+import numpy as np
+import pytest
+
+from file_parser import TRIMESH_AVAILABLE, analyze_file, parse_obj_file, parse_obj_with_trimesh
+from indexed_mesh import IndexedMesh
+from mesh_metrics import compute_mesh_metrics
+
+# 10 x 10 x 10 cube written with quads, mixed index styles and a
+# relative-index face
+CUBE_OBJ = b"""# cube
+o cube
+v 0 0 0
+v 10 0 0
+v 10 10 0
+v 0 10 0
+v 0 0 10
+v 10 0 10
+v 10 10 10
+v 0 10 10
+vt 0 0
+vn 0 0 1
+f 1/1/1 4/1/1 3/1/1 2/1/1
+f 5//1 6//1 7//1 8//1
+f 1 2 6 5
+f 2/1 3/1 7/1 6/1
+f 3 4 8
+f 3 8 7
+f -8 -4 -1 -5
+"""
+
+
+def test_parse_obj_file_keeps_shared_vertices():
+    mesh, count = parse_obj_file(CUBE_OBJ)
+
+    assert isinstance(mesh, IndexedMesh)
+    assert count == 12
+    assert mesh.vertices.shape == (8, 3)
+    assert mesh.faces.dtype == np.int32
+    assert mesh.faces.shape == (12, 3)
+    assert mesh.faces.min() == 0 and mesh.faces.max() == 7
+
+
+def test_metrics_on_indexed_obj_mesh():
+    mesh, _ = parse_obj_file(CUBE_OBJ)
+    metrics = compute_mesh_metrics(mesh)
+
+    assert metrics["triangle_count"] == 12
+    assert metrics["volume_mm3"] == pytest.approx(1000.0)
+    assert metrics["surface_area_mm2"] == pytest.approx(600.0)
+
+    soup = compute_mesh_metrics(mesh.vertices[mesh.faces])
+    assert soup["volume_mm3"] == pytest.approx(metrics["volume_mm3"])
+
+
+def test_parse_obj_file_rejects_missing_vertex():
+    mesh, count = parse_obj_file(b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 4\n")
+
+    assert count == 0
+    assert len(mesh.faces) == 0
+
+
+@pytest.mark.skipif(not TRIMESH_AVAILABLE, reason="trimesh not installed")
+def test_parse_obj_with_trimesh_returns_indexed_arrays(tmp_path, monkeypatch):
+    # Loading must not spool the upload to a temporary file
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    mesh, count = parse_obj_with_trimesh(CUBE_OBJ)
+
+    assert isinstance(mesh, IndexedMesh)
+    assert count == 12
+    assert list(tmp_path.iterdir()) == []
+    assert compute_mesh_metrics(mesh)["volume_mm3"] == pytest.approx(1000.0)
+
+
+def test_analyze_file_obj():
+    metrics = analyze_file(CUBE_OBJ, "cube.OBJ")
+
+    assert metrics["file_format"] == "OBJ"
+    assert metrics["estimated"] is False
+    assert metrics["triangle_count"] == 12
+    assert metrics["bounding_box"]["size"] == pytest.approx([10.0, 10.0, 10.0])
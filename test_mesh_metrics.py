@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched mesh metrics in backend/mesh_metrics.py
+"""
+
+import sys
+sys.path.append('backend')
+
+import numpy as np
+import pytest
+
+from mesh_metrics import compute_mesh_metrics
+
+
+def make_box(size=(10.0, 20.0, 30.0), offset=(0.0, 0.0, 0.0)) -> np.ndarray:
+    """Closed, outward-facing box as an (12, 3, 3) triangle array."""
+    sx, sy, sz = size
+    corners = np.array([
+        [0, 0, 0], [sx, 0, 0], [sx, sy, 0], [0, sy, 0],
+        [0, 0, sz], [sx, 0, sz], [sx, sy, sz], [0, sy, sz],
+    ], dtype=np.float64) + offset
+    faces = np.array([
+        [0, 2, 1], [0, 3, 2],  # bottom
+        [4, 5, 6], [4, 6, 7],  # top
+        [0, 1, 5], [0, 5, 4],  # front
+        [1, 2, 6], [1, 6, 5],  # right
+        [2, 3, 7], [2, 7, 6],  # back
+        [3, 0, 4], [3, 4, 7],  # left
+    ])
+    return corners[faces]
+
+
+def test_box_metrics():
+    metrics = compute_mesh_metrics(make_box(offset=(100.0, -50.0, 5.0)))
+
+    assert metrics["triangle_count"] == 12
+    assert metrics["volume_mm3"] == pytest.approx(6000.0)
+    assert metrics["signed_volume_mm3"] == pytest.approx(6000.0)
+    assert metrics["surface_area_mm2"] == pytest.approx(2 * (200 + 600 + 300))
+    assert metrics["bounding_box"]["min"] == pytest.approx([100.0, -50.0, 5.0])
+    assert metrics["bounding_box"]["size"] == pytest.approx([10.0, 20.0, 30.0])
+    assert metrics["centroid"] == pytest.approx([105.0, -40.0, 20.0])
+
+
+def test_chunking_matches_single_pass():
+    boxes = np.concatenate([make_box(offset=(i * 15.0, 0, 0)) for i in range(7)]).astype(np.float32)
+
+    single = compute_mesh_metrics(boxes)
+    chunked = compute_mesh_metrics(boxes, chunk_size=5)
+
+    assert chunked["volume_mm3"] == pytest.approx(single["volume_mm3"])
+    assert chunked["surface_area_mm2"] == pytest.approx(single["surface_area_mm2"])
+    assert chunked["centroid"] == pytest.approx(single["centroid"])
+    assert chunked["bounding_box"] == single["bounding_box"]
+
+
+def test_empty_mesh():
+    metrics = compute_mesh_metrics(np.empty((0, 3, 3)))
+
+    assert metrics["volume_mm3"] == 0.0
+    assert metrics["triangle_count"] == 0
+    assert metrics["bounding_box"] is None
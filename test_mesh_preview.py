@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for decimated preview meshes in backend/mesh_preview.py
+"""
+
+import os
+import sys
+sys.path.append('backend')
+
+import numpy as np
+
+import mesh_store
+from file_parser import analyze_file
+from mesh_preview import (cluster_vertices, decimate, generate_previews, list_previews, preview_file, preview_path,
+                          write_previews)
+from mesh_store import read_mesh_file
+from test_benchmarks import BOX_SIZE, subdivided_box
+from test_mesh_metrics import make_box
+from test_mesh_store import BOX
+from test_stl_parser import make_binary_stl
+
+
+def test_decimation_meets_face_budget():
+    mesh = subdivided_box(20000)
+
+    preview = decimate(mesh, 2000)
+
+    assert 200 < len(preview.faces) <= 2000
+    size = preview.vertices.max(axis=0) - preview.vertices.min(axis=0)
+    # Clusters on the box edges move inwards by up to one grid cell
+    assert np.allclose(size, BOX_SIZE, atol=5.0)
+
+
+def test_mesh_within_budget_is_unchanged():
+    assert decimate(BOX, 100) is BOX
+
+
+def test_coarse_grid_drops_collapsed_faces():
+    clustered = cluster_vertices(BOX, 100.0)
+
+    assert len(clustered.faces) == 0
+
+
+def test_levels_are_written_finest_first(tmp_path):
+    mesh_path = str(tmp_path / "part.stl.mesh")
+
+    previews = write_previews(subdivided_box(20000), mesh_path, face_counts=(100000, 5000, 500))
+
+    face_counts = [preview["face_count"] for preview in previews]
+    assert [preview["level"] for preview in previews] == [0, 1, 2]
+    assert face_counts[0] == len(subdivided_box(20000).faces)
+    assert face_counts == sorted(face_counts, reverse=True)
+    stored = read_mesh_file(preview_path(mesh_path, 2))
+    assert len(stored.mesh.faces) == face_counts[2]
+    assert stored.metrics["source_face_count"] == face_counts[0]
+    assert previews[2]["size_bytes"] == os.path.getsize(preview_path(mesh_path, 2))
+
+
+def test_small_mesh_gets_one_level(tmp_path):
+    previews = write_previews(BOX, str(tmp_path / "box.stl.mesh"), face_counts=(1000, 100))
+
+    assert [preview["face_count"] for preview in previews] == [12]
+
+
+def test_previews_are_made_from_the_stored_mesh(tmp_path, monkeypatch):
+    monkeypatch.setattr(mesh_store, "MESH_STORE_DIR", str(tmp_path))
+    content_hash = "cd" * 32
+    mesh_path = mesh_store.mesh_store_path(content_hash, "stl")
+    timings = {}
+
+    analyze_file(make_binary_stl(make_box()), "box.stl", mesh_path, timings)
+
+    # Analysis only stores the welded mesh; previews come later
+    assert read_mesh_file(mesh_path).mesh.vertices.shape == (8, 3)
+    assert list_previews(content_hash, "stl") == []
+    assert "preview" not in timings
+
+    generate_previews(mesh_path, face_counts=(100,))
+
+    previews = list_previews(content_hash, "stl")
+    assert [(preview["level"], preview["face_count"], preview["vertex_count"]) for preview in previews] == [
+        (0, 12, 8)]
+    assert previews[0]["size_bytes"] == os.path.getsize(preview_path(mesh_path, 0))
+
+
+def test_preview_file_rejects_bad_names(tmp_path, monkeypatch):
+    monkeypatch.setattr(mesh_store, "MESH_STORE_DIR", str(tmp_path))
+    content_hash = "ab" * 32
+    write_previews(BOX, mesh_store.mesh_store_path(content_hash, "stl"), face_counts=(100,))
+
+    assert preview_file(content_hash, "stl", 0) == str(tmp_path / f"{content_hash}.stl.lod0.mesh")
+    assert preview_file(content_hash, "stl", 1) is None
+    assert preview_file("../" + content_hash, "stl", 0) is None
+    assert preview_file(content_hash, "stl/..", 0) is None
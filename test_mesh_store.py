@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for the compact mesh format in backend/mesh_store.py
+"""
+
+import os
+import sys
+sys.path.append('backend')
+
+import numpy as np
+import pytest
+
+from file_parser import analyze_file, analyze_mesh_file
+from indexed_mesh import IndexedMesh
+from mesh_metrics import compute_mesh_metrics
+from mesh_store import parse_mesh_bytes, prune_mesh_store, read_mesh_file, write_mesh_file
+from mesh_validation import validate_mesh
+from print_time import estimate_print_times
+from test_mesh_metrics import make_box
+from test_stl_parser import make_binary_stl
+
+BOX_VERTICES = np.array([
+    [0, 0, 0], [10, 0, 0], [10, 20, 0], [0, 20, 0],
+    [0, 0, 30], [10, 0, 30], [10, 20, 30], [0, 20, 30],
+], dtype=np.float32)
+BOX_FACES = np.array([
+    [0, 2, 1], [0, 3, 2], [4, 5, 6], [4, 6, 7], [0, 1, 5], [0, 5, 4],
+    [1, 2, 6], [1, 6, 5], [2, 3, 7], [2, 7, 6], [3, 0, 4], [3, 4, 7],
+], dtype=np.int32)
+BOX = IndexedMesh(BOX_VERTICES, BOX_FACES)
+
+
+def test_round_trip_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "box.mesh")
+    write_mesh_file(path, BOX, {"volume_mm3": 6000.0})
+
+    stored = read_mesh_file(path)
+
+    assert isinstance(stored.mesh.vertices, np.memmap)
+    assert isinstance(stored.mesh.faces, np.memmap)
+    assert np.array_equal(stored.mesh.vertices, BOX_VERTICES)
+    assert np.array_equal(stored.mesh.faces, BOX_FACES)
+    assert stored.metrics == {"volume_mm3": 6000.0}
+
+
+def test_quantized_vertices_stay_close(tmp_path):
+    path = str(tmp_path / "box.mesh")
+    vertices = BOX_VERTICES + np.float32(0.123)
+    write_mesh_file(path, IndexedMesh(vertices, BOX_FACES), quantize=True)
+
+    stored = read_mesh_file(path)
+
+    assert stored.mesh.vertices.dtype == np.float32
+    assert np.abs(stored.mesh.vertices - vertices).max() <= 30 / 65535
+    assert compute_mesh_metrics(stored.mesh)["volume_mm3"] == pytest.approx(6000.0, rel=1e-4)
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = str(tmp_path / "box.mesh")
+    write_mesh_file(path, BOX)
+    with open(path, "r+b") as handle:
+        handle.truncate(100)
+
+    with pytest.raises(ValueError):
+        read_mesh_file(path)
+
+
+def test_geometry_functions_accept_stored_mesh(tmp_path):
+    path = str(tmp_path / "box.mesh")
+    write_mesh_file(path, BOX)
+    stored = read_mesh_file(path)
+
+    assert compute_mesh_metrics(stored.mesh) == compute_mesh_metrics(BOX)
+    assert validate_mesh(stored.mesh)["warnings"] == []
+    assert estimate_print_times(stored.mesh) == estimate_print_times(BOX)
+
+
+def test_analysis_writes_and_reads_stored_mesh(tmp_path):
+    path = str(tmp_path / "box.stl.mesh")
+
+    metrics = analyze_file(make_binary_stl(make_box()), "box.stl", mesh_path=path)
+
+    assert analyze_mesh_file(path) == metrics
+    stored = read_mesh_file(path)
+    # The STL triangle soup is stored welded
+    assert len(stored.mesh.vertices) == 8
+    with open(path, "rb") as handle:
+        assert analyze_file(handle.read(), "box.mesh") == metrics
+
+
+def test_measured_without_saved_metrics(tmp_path):
+    path = str(tmp_path / "box.mesh")
+    write_mesh_file(path, BOX)
+    with open(path, "rb") as handle:
+        content = handle.read()
+
+    metrics = analyze_file(content, "box.mesh")
+
+    assert parse_mesh_bytes(content).metrics == {}
+    assert metrics["file_format"] == "MESH"
+    assert metrics["volume_mm3"] == pytest.approx(6000.0)
+
+
+def test_prune_removes_least_recently_used_uploads(tmp_path):
+    for age, name in enumerate(["new", "middle", "old"]):
+        for suffix in (".stl.mesh", ".stl.lod0.mesh"):
+            path = str(tmp_path / (name + suffix))
+            write_mesh_file(path, BOX)
+            os.utime(path, (1000 - age, 1000 - age))
+    upload_bytes = 2 * os.path.getsize(str(tmp_path / "new.stl.mesh"))
+
+    removed = prune_mesh_store(str(tmp_path), max_bytes=2 * upload_bytes)
+
+    assert removed == 2
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "middle.stl.lod0.mesh", "middle.stl.mesh", "new.stl.lod0.mesh", "new.stl.mesh",
+    ]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the mesh validation pass in backend/mesh_validation.py
+"""
+
+import sys
+sys.path.append('backend')
+
+import numpy as np
+
+from file_parser import analyze_file
+from indexed_mesh import IndexedMesh
+from mesh_validation import edge_usage, validate_mesh, weld_vertices
+from test_mesh_metrics import make_box
+
+
+def warning_codes(report: dict) -> set:
+    return {warning["code"] for warning in report["warnings"]}
+
+
+def test_closed_box_is_valid():
+    report = validate_mesh(make_box())
+
+    assert report["vertex_count"] == 8
+    assert report["merged_vertices"] == 36 - 8
+    assert report["edge_count"] == 18
+    assert report["watertight"]
+    assert report["consistently_oriented"]
+    assert not report["inverted"]
+    assert report["volume_plausible"]
+    assert report["warnings"] == []
+
+
+def test_weld_merges_within_tolerance():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1e-6, 0, 0]], dtype=np.float64)
+    faces = np.array([[0, 1, 2], [3, 2, 1]])
+
+    welded = weld_vertices(vertices, faces, tolerance_mm=1e-4)
+
+    assert len(welded.vertices) == 3
+    assert welded.faces[1, 0] == welded.faces[0, 0]
+
+
+def test_open_mesh_reports_boundary_edges():
+    report = validate_mesh(make_box()[:-1])
+
+    assert report["boundary_edges"] == 3
+    assert not report["watertight"]
+    assert "open_mesh" in warning_codes(report)
+
+
+def test_flipped_face_is_inconsistent():
+    box = make_box()
+    box[0] = box[0][::-1]
+
+    report = validate_mesh(box)
+
+    assert report["inconsistent_edges"] == 3
+    assert report["watertight"]
+    assert "inconsistent_orientation" in warning_codes(report)
+
+
+def test_inside_out_mesh_is_inverted():
+    report = validate_mesh(make_box()[:, ::-1])
+
+    assert report["inverted"]
+    assert report["consistently_oriented"]
+    assert "inverted_normals" in warning_codes(report)
+
+
+def test_overlapping_shell_is_non_manifold():
+    report = validate_mesh(np.concatenate([make_box(), make_box()]))
+
+    assert report["non_manifold_edges"] == 18
+    assert not report["watertight"]
+    assert {"non_manifold", "implausible_volume"} <= warning_codes(report)
+
+
+def test_edge_usage_counts_directions():
+    counts, direction_sums = edge_usage(np.array([[0, 1, 2], [0, 2, 3]]), 4)
+
+    assert sorted(counts.tolist()) == [1, 1, 1, 1, 2]
+    assert direction_sums[counts == 2].tolist() == [0]
+
+
+def test_indexed_mesh_matches_soup():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float64)
+    faces = np.array([[0, 2, 1], [0, 1, 3], [1, 2, 3], [0, 3, 2]], dtype=np.int32)
+
+    indexed = validate_mesh(IndexedMesh(vertices, faces))
+    soup = validate_mesh(vertices[faces])
+
+    assert indexed["warnings"] == soup["warnings"] == []
+    assert indexed["edge_count"] == soup["edge_count"] == 6
+
+
+def test_analyze_file_includes_validation():
+    obj = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n"
+
+    metrics = analyze_file(obj, "triangle.obj")
+
+    assert metrics["validation"]["boundary_edges"] == 3
+    assert "open_mesh" in warning_codes(metrics["validation"])
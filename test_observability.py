@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for request timing and Prometheus histograms in backend/observability.py
+"""
+
+import json
+import logging
+import sys
+sys.path.append('backend')
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import observability
+from file_parser import analyze_file
+from observability import (Histogram, TimingMiddleware, record_stage, render_metrics, set_labels, size_bucket,
+                           track_operation)
+from test_stl_parser import TETRAHEDRON, make_binary_stl
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    lines = histogram.render()
+
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+    assert any(line.startswith('demo_seconds_sum{route="/a"} 5.55') for line in lines)
+
+
+def test_size_buckets():
+    assert size_bucket(10) == "lt_100kb"
+    assert size_bucket(5 * 1024 * 1024) == "1mb_10mb"
+    assert size_bucket(500 * 1024 * 1024) == "gte_100mb"
+
+
+def test_stages_outside_an_operation_are_ignored():
+    record_stage("parse", 1.0)
+    set_labels(file_format="stl")
+
+
+def test_job_stages_are_observed():
+    with track_operation("test_job"):
+        set_labels(file_format="OBJ", size_bytes=2048)
+        record_stage("download", 0.2)
+        record_stage("download", 0.1)
+
+    assert ('quote_stage_duration_seconds_count{route="test_job",stage="download",'
+            'file_format="obj",size_bucket="lt_100kb"} 1') in render_metrics()
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        set_labels(file_format="stl", size_bytes=10)
+        record_stage("store", 0.01)
+        return {"item_id": item_id}
+
+    app.add_middleware(TimingMiddleware)
+    return app
+
+
+def test_requests_are_labelled_by_route_template():
+    with TestClient(make_app()) as client:
+        client.get("/items/1")
+        client.get("/items/2")
+
+    metrics = render_metrics()
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2' in metrics
+    assert ('quote_stage_duration_seconds_count{route="/items/{item_id}",stage="store",'
+            'file_format="stl",size_bucket="lt_100kb"} 2') in metrics
+
+
+def test_slow_requests_are_logged(monkeypatch, caplog):
+    monkeypatch.setattr(observability, "SLOW_REQUEST_MS", 0.0)
+
+    with caplog.at_level(logging.WARNING, logger="quote.slow_requests"):
+        with TestClient(make_app()) as client:
+            client.get("/items/3")
+
+    entry = json.loads(caplog.records[-1].getMessage())
+    assert entry["event"] == "slow_request"
+    assert entry["route"] == "/items/{item_id}"
+    assert entry["status"] == 200
+    assert entry["stages_ms"] == {"store": 10.0}
+
+
+def test_analyze_file_reports_stage_timings():
+    timings = {}
+
+    analyze_file(make_binary_stl(TETRAHEDRON), "part.stl", timings=timings)
+
+    assert set(timings) == {"parse", "metrics"}
+    assert all(value >= 0 for value in timings.values())
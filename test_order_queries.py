@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset-paginated order listing in backend/order_queries.py
+"""
+
+import sys
+sys.path.append('backend')
+
+import pytest
+
+from order_queries import decode_cursor, encode_cursor, orders_query_params, page_from_rows, select_clause
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2025-01-02T03:04:05+00:00", "order-1")
+
+    assert decode_cursor(cursor) == ("2025-01-02T03:04:05+00:00", "order-1")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_select_clause_projects_and_keeps_keyset_columns():
+    assert select_clause("status,price_gbp") == "status,price_gbp,created_at,id"
+    assert select_clause("id,size_z_mm") == "id,size_z_mm,created_at"
+    assert "size_z_mm" not in select_clause(None)
+    assert "delivery_address" not in select_clause(None)
+    assert select_clause("delivery_address") == "delivery_address,created_at,id"
+    with pytest.raises(ValueError, match="password"):
+        select_clause("id,password")
+
+
+def test_keyset_query_parameters():
+    cursor = encode_cursor("2025-01-02T03:04:05+00:00", "order-1")
+    params = dict(orders_query_params("id,created_at", {"status": "pending"}, cursor, 20))
+    assert params["status"] == "eq.pending"
+    assert params["or"] == (
+        '(created_at.lt."2025-01-02T03:04:05+00:00",'
+        'and(created_at.eq."2025-01-02T03:04:05+00:00",id.lt."order-1"))'
+    )
+    assert params["order"] == "created_at.desc,id.desc"
+    assert params["limit"] == "21"
+
+
+def test_page_from_rows():
+    rows = [{"id": str(i), "created_at": f"2025-01-0{9 - i}"} for i in range(3)]
+
+    page = page_from_rows(rows, 2)
+    assert [row["id"] for row in page["items"]] == ["0", "1"]
+    assert decode_cursor(page["next_cursor"]) == ("2025-01-08", "1")
+
+    assert page_from_rows(rows, 3)["next_cursor"] is None
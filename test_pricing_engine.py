@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorised pricing engine in backend/pricing_engine.py
+"""
+
+import json
+import os
+import sys
+sys.path.append('backend')
+
+import numpy as np
+import pytest
+
+from pricing_engine import DEFAULT_RATES_PATH, PricingEngine, load_rate_table, price_matrix
+from utils import calculate_dual_pricing, reprice_orders
+
+
+def default_config():
+    with open(DEFAULT_RATES_PATH) as rates_file:
+        return json.load(rates_file)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_matrix_covers_parts_materials_and_printers():
+    rates = load_rate_table(default_config())
+    weights = np.array([[10.0] * len(rates.materials), [50.0] * len(rates.materials)])
+    times = np.array([[1.0, 0.6], [4.0, 2.4]])
+
+    matrix = price_matrix(rates, weights, times)
+
+    assert matrix.total.shape == (2, len(rates.materials), len(rates.printers))
+    pla, resin = rates.materials.index("pla"), rates.materials.index("standard_resin")
+    # PLA only runs on FDM printers, resin only on resin printers
+    assert np.isnan(matrix.total[:, pla, 1]).all()
+    assert np.isnan(matrix.total[:, resin, 0]).all()
+    assert matrix.total[0, pla, 0] == pytest.approx(10 * 0.02 + 1.0 * 2.5 + 2.0)
+    assert matrix.total[1, resin, 1] == pytest.approx(50 * 0.08 + 2.4 * 2.5 + 1.5 + 10.0)
+
+
+def test_quantity_breaks_discount_variable_cost_only():
+    rates = load_rate_table(default_config())
+    weights = np.full((3, len(rates.materials)), 20.0)
+    times = np.full((3, len(rates.printers)), 2.0)
+
+    totals = price_matrix(rates, weights, times, quantity=np.array([1, 10, 200])).total
+    pla = rates.materials.index("pla")
+    unit = 20 * 0.02 + 2.0 * 2.5
+
+    assert totals[0, pla, 0] == pytest.approx(unit + 2.0)
+    assert totals[1, pla, 0] == pytest.approx(unit * 10 * 0.95 + 2.0)
+    assert totals[2, pla, 0] == pytest.approx(unit * 200 * 0.85 + 2.0)
+
+
+def test_default_table_keeps_legacy_prices():
+    pricing = calculate_dual_pricing(50.0, 2.0)
+
+    assert pricing["fdm"]["price"] == 8.0
+    assert pricing["resin"]["price"] == pytest.approx(50 * 0.08 + 1.2 * 2.5 + 10.0 + 1.5)
+    assert pricing["fdm"]["material_type"] == "PLA/PETG"
+    assert pricing["resin"]["material_type"] == "Photopolymer Resin"
+    assert set(pricing["fdm"]["details"]) == {"material_cost", "labor_cost", "setup_fee", "post_processing"}
+    assert {option["material"] for option in pricing["fdm"]["materials"]} == {"pla", "petg", "abs", "tpu"}
+
+
+def test_rates_reload_when_file_changes(tmp_path):
+    path = tmp_path / "rates.json"
+    config = default_config()
+    path.write_text(json.dumps(config))
+    clock = FakeClock()
+    engine = PricingEngine(str(path), reload_interval_s=5, clock=clock)
+
+    assert engine.rates.version == "2025-01"
+
+    config["version"] = "2025-02"
+    config["materials"]["pla"]["cost_per_g"] = 0.03
+    path.write_text(json.dumps(config))
+    os.utime(path, ns=(1, 2_000_000_000_000_000_000))
+    # Not checked again until the reload interval has passed
+    assert engine.rates.version == "2025-01"
+    clock.now += 5
+    assert engine.rates.version == "2025-02"
+    assert engine.pricing_options([10000.0], {"fdm": [1.0], "resin": [0.6]})[0]["fdm"]["details"][
+        "material_cost"] == pytest.approx(12.4 * 0.03)
+
+    # A broken table is reported and the last good one stays in use
+    config["materials"]["pla"]["printer"] = "laser"
+    path.write_text(json.dumps(config))
+    os.utime(path, ns=(1, 3_000_000_000_000_000_000))
+    clock.now += 5
+    assert engine.rates.version == "2025-02"
+
+
+def test_reprice_orders_uses_order_material_and_printer():
+    orders = [
+        {"id": "a", "weight_g": 50.0, "print_time_h": 2.0, "printer_type": "fdm", "material_type": "PETG"},
+        {"id": "b", "weight_g": 50.0, "print_time_h": 2.0, "estimated_print_time_resin": 1.0,
+         "printer_type": "resin", "material_type": "Photopolymer Resin"},
+    ]
+
+    repriced = reprice_orders(orders)
+
+    assert repriced[0]["price_gbp"] == pytest.approx(50 * 0.025 + 5.0 + 2.0)
+    assert repriced[0]["price_fdm"] == 8.0
+    assert repriced[1]["price_gbp"] == repriced[1]["price_resin"] == pytest.approx(4.0 + 2.5 + 11.5)
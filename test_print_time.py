@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the layer-wise print time estimator in backend/print_time.py
+"""
+
+import sys
+import tracemalloc
+sys.path.append('backend')
+
+import numpy as np
+import pytest
+
+from indexed_mesh import IndexedMesh
+import print_time
+from print_time import FdmProfile, estimate_print_times, layer_cross_sections
+from test_mesh_metrics import make_box
+
+
+def test_box_cross_sections():
+    perimeters, areas = layer_cross_sections(make_box(offset=(100.0, -50.0, 5.0)), 0.2)
+
+    assert len(areas) == 150
+    assert areas == pytest.approx(np.full(150, 200.0))
+    assert perimeters == pytest.approx(np.full(150, 60.0))
+
+
+def test_holes_subtract_from_area():
+    # A 20 x 20 x 10 block with a 10 x 10 square hole through it, built from
+    # an outer box and an inward-facing inner box
+    outer = make_box((20.0, 20.0, 10.0))
+    inner = make_box((10.0, 10.0, 10.0), offset=(5.0, 5.0, 0.0))[:, ::-1]
+    walls = np.concatenate([outer[4:], inner[4:]])
+
+    perimeters, areas = layer_cross_sections(walls, 1.0)
+    assert areas == pytest.approx(np.full(10, 300.0))
+    assert perimeters == pytest.approx(np.full(10, 120.0))
+
+
+def test_indexed_mesh_matches_triangles():
+    triangles = make_box((12.0, 7.0, 3.0))
+    vertices, inverse = np.unique(triangles.reshape(-1, 3), axis=0, return_inverse=True)
+    mesh = IndexedMesh(vertices, inverse.reshape(-1, 3).astype(np.int32))
+
+    assert estimate_print_times(mesh) == estimate_print_times(triangles)
+
+
+def test_tall_thin_and_flat_wide_parts_differ():
+    # Same volume, very different shapes
+    tall = estimate_print_times(make_box((5.0, 5.0, 200.0)))
+    flat = estimate_print_times(make_box((100.0, 50.0, 1.0)))
+
+    assert tall["fdm_layers"] == 1000
+    assert flat["fdm_layers"] == 5
+    # Resin time is dominated by layer count
+    assert tall["print_time_resin_h"] > 10 * flat["print_time_resin_h"]
+    # Flat parts are mostly solid skin, so they are slower per mm³ on FDM
+    assert flat["print_time_fdm_h"] > 0.2
+    assert tall["print_time_fdm_h"] != flat["print_time_fdm_h"]
+
+
+def test_profile_layer_height_changes_estimate():
+    box = make_box((50.0, 50.0, 50.0))
+    coarse = estimate_print_times(box, fdm_profile=FdmProfile(layer_height_mm=0.3))
+    fine = estimate_print_times(box, fdm_profile=FdmProfile(layer_height_mm=0.1))
+
+    assert coarse["fdm_layers"] == 167
+    assert fine["fdm_layers"] == 500
+    assert fine["print_time_fdm_h"] > coarse["print_time_fdm_h"] > print_time.MIN_FDM_PRINT_TIME_H
+
+
+def test_small_parts_take_the_minimum_time():
+    times = estimate_print_times(make_box((2.0, 2.0, 2.0)))
+
+    assert times["print_time_fdm_h"] == print_time.MIN_FDM_PRINT_TIME_H
+    assert times["print_time_resin_h"] == print_time.MIN_RESIN_PRINT_TIME_H
+
+
+def test_too_many_layers_fall_back_to_volume_estimate():
+    # A 20 mm box given in micrometres
+    box = make_box((20000.0, 20000.0, 20000.0))
+
+    assert estimate_print_times(box) == {}
+    with pytest.raises(ValueError):
+        layer_cross_sections(box, 0.01)
+
+
+def make_cylinder(radius: float, height: float, sides: int) -> np.ndarray:
+    """Closed, outward-facing cylinder whose walls are tall sliver facets."""
+    angles = np.linspace(0, 2 * np.pi, sides, endpoint=False)
+    ring = np.stack([radius * np.cos(angles), radius * np.sin(angles)], axis=1)
+    following = np.roll(ring, -1, axis=0)
+
+    def lift(points, z):
+        return np.column_stack([points, np.full(len(points), z)])
+
+    bottom, top = lift(ring, 0.0), lift(ring, height)
+    next_bottom, next_top = lift(following, 0.0), lift(following, height)
+    walls = np.concatenate([np.stack([bottom, next_bottom, next_top], axis=1),
+                            np.stack([bottom, next_top, top], axis=1)])
+    center_bottom = np.tile([0.0, 0.0, 0.0], (sides, 1))
+    center_top = np.tile([0.0, 0.0, height], (sides, 1))
+    caps = np.concatenate([np.stack([center_bottom, next_bottom, bottom], axis=1),
+                           np.stack([center_top, top, next_top], axis=1)])
+    return np.concatenate([walls, caps])
+
+
+def test_tall_slivers_are_sliced_in_bounded_memory(monkeypatch):
+    # 8000 wall facets each crossing all 1000 layers: 8M (facet, layer) pairs
+    sides = 4000
+    cylinder = make_cylinder(20.0, 200.0, sides)
+    monkeypatch.setattr(print_time, "MAX_SLICE_PAIRS", 1 << 18)
+
+    tracemalloc.start()
+    try:
+        perimeters, areas = layer_cross_sections(cylinder, 0.2)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Expanding every pair at once took over 1 GB
+    assert peak_bytes < 150 * 1024 * 1024
+    polygon_area = sides / 2 * 20.0 ** 2 * np.sin(2 * np.pi / sides)
+    polygon_perimeter = 2 * sides * 20.0 * np.sin(np.pi / sides)
+    assert areas == pytest.approx(np.full(1000, polygon_area))
+    assert perimeters == pytest.approx(np.full(1000, polygon_perimeter))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed analysis cache in backend/quote_cache.py
+"""
+
+import sys
+sys.path.append('backend')
+
+from quote_cache import QuoteCache, cache_key, content_digest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_depends_on_content_and_extension():
+    digest = content_digest(b"solid part")
+
+    assert digest == content_digest(memoryview(b"solid part"))
+    assert digest != content_digest(b"solid other")
+    assert cache_key(digest, "STL") == cache_key(digest, "stl")
+    assert cache_key(digest, "stl") != cache_key(digest, "obj")
+
+
+def test_lru_eviction():
+    cache = QuoteCache(max_entries=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("b") is None
+    assert cache.get("c") == {"n": 3}
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = QuoteCache(ttl_s=60, clock=clock)
+    cache.put("a", {"n": 1})
+
+    clock.now += 59
+    assert cache.get("a") == {"n": 1}
+    clock.now += 2
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "quotes.db")
+    clock = FakeClock()
+    QuoteCache(db_path=db_path, ttl_s=60, clock=clock).put("a", {"metrics": {"volume_mm3": 5.0}})
+
+    restarted = QuoteCache(db_path=db_path, ttl_s=60, clock=clock)
+    assert restarted.get("a") == {"metrics": {"volume_mm3": 5.0}}
+
+    clock.now += 120
+    assert QuoteCache(db_path=db_path, clock=clock).get("a") is None
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the async data-access layer in backend/repositories.py and
+backend/local_repositories.py
+"""
+
+import asyncio
+import sys
+sys.path.append('backend')
+
+import httpx
+
+from local_repositories import create_local_repositories
+from repositories import Repositories, SupabaseOrdersRepository, SupabaseStorageRepository
+
+
+def make_order(index: int, **fields) -> dict:
+    return {"id": f"order-{index}", "created_at": f"2025-01-{index + 1:02d}T00:00:00",
+            "status": "pending", "printer_type": "fdm", "price_gbp": 10.0 + index, **fields}
+
+
+def test_local_orders_round_trip_and_keyset_pages(tmp_path):
+    repositories = create_local_repositories(storage_dir=str(tmp_path))
+
+    async def run():
+        for index in range(5):
+            await repositories.orders.insert(make_order(index, printer_type="resin" if index == 2 else "fdm"))
+        await repositories.orders.update("order-1", {"status": "shipped"})
+
+        first = await repositories.orders.list_page("price_gbp", {"printer_type": "fdm"}, None, 2)
+        second = await repositories.orders.list_page("price_gbp", {"printer_type": "fdm"}, first["next_cursor"], 2)
+        everything = [row async for row in repositories.iter_orders(page_size=2)]
+        return await repositories.orders.get("order-1"), first, second, everything
+
+    updated, first, second, everything = asyncio.run(run())
+    assert updated["status"] == "shipped"
+    assert [row["id"] for row in first["items"]] == ["order-4", "order-3"]
+    assert set(first["items"][0]) == {"price_gbp", "created_at", "id"}
+    assert [row["id"] for row in second["items"]] == ["order-1", "order-0"]
+    assert second["next_cursor"] is None
+    assert len(everything) == 5
+
+
+def test_concurrent_local_updates_keep_every_field(tmp_path):
+    repositories = create_local_repositories(storage_dir=str(tmp_path))
+
+    async def run():
+        await repositories.orders.insert(make_order(0))
+        await asyncio.gather(*(repositories.orders.update("order-0", {f"field_{index}": index})
+                               for index in range(50)))
+        return await repositories.orders.get("order-0")
+
+    order = asyncio.run(run())
+    assert all(order[f"field_{index}"] == index for index in range(50))
+
+
+def test_local_storage_keeps_existing_objects(tmp_path):
+    repositories = create_local_repositories(storage_dir=str(tmp_path))
+
+    async def run():
+        created = await repositories.storage.upload("stl-files", "abc.stl", memoryview(b"first"))
+        duplicate = await repositories.storage.upload("stl-files", "abc.stl", b"second")
+        content = await repositories.storage.download("stl-files", "abc.stl")
+        await repositories.storage.remove("stl-files", ["abc.stl", "missing.stl"])
+        return created, duplicate, content, await repositories.storage.list("stl-files")
+
+    assert asyncio.run(run()) == (True, False, b"first", [])
+
+
+def test_supabase_repositories_share_one_client():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.startswith("/storage/v1/object/stl-files/"):
+            return httpx.Response(400, json={"error": "Duplicate", "message": "The resource already exists"})
+        rows = [make_order(index) for index in (3, 2, 1)]
+        return httpx.Response(200, json=rows)
+
+    async def run():
+        async with httpx.AsyncClient(base_url="http://supabase.test", transport=httpx.MockTransport(handler)) as client:
+            repositories = Repositories(SupabaseOrdersRepository(client),
+                                        SupabaseStorageRepository(client, "http://supabase.test"), None)
+            page = await repositories.orders.list_page("status", {"status": "pending"}, None, 2)
+            created = await repositories.storage.upload("stl-files", "abc.stl", b"data")
+            return page, created
+
+    page, created = asyncio.run(run())
+    assert [row["id"] for row in page["items"]] == ["order-3", "order-2"]
+    assert page["next_cursor"] is not None
+    assert created is False
+    params = requests[0].url.params
+    assert params["status"] == "eq.pending"
+    assert params["limit"] == "3"
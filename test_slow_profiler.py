@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the slow-call sampling profiler in backend/slow_profiler.py
+"""
+
+import os
+import sys
+import time
+sys.path.append('backend')
+
+from slow_profiler import SlowCallProfiler, capture_path, list_captures
+
+
+def busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def make_profiler(directory, **kwargs) -> SlowCallProfiler:
+    options = {"budget_s": 0.01, "interval_s": 0.001, "directory": str(directory), "max_files": 10}
+    options.update(kwargs)
+    return SlowCallProfiler(**options)
+
+
+def test_slow_call_is_captured_with_tags(tmp_path):
+    profiler = make_profiler(tmp_path)
+
+    with profiler.watch("quote-123", "STL") as watch:
+        busy_wait(0.2)
+        watch.triangle_count = 4096
+
+    captures = list_captures(str(tmp_path))
+    assert len(captures) == 1
+    capture = captures[0]
+    assert capture["quote_id"] == "quote-123"
+    assert capture["file_format"] == "stl"
+    assert capture["triangle_count"] == 4096
+
+    with open(capture_path(capture["name"], str(tmp_path))) as handle:
+        lines = handle.read().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "busy_wait" in stack
+
+
+def test_fast_call_is_not_captured(tmp_path):
+    profiler = make_profiler(tmp_path, budget_s=5.0)
+
+    with profiler.watch("quote-1", "obj"):
+        pass
+
+    assert list_captures(str(tmp_path)) == []
+
+
+def test_disabled_profiler_saves_nothing(tmp_path):
+    profiler = make_profiler(tmp_path, budget_s=0)
+
+    with profiler.watch("quote-1", "stl"):
+        busy_wait(0.05)
+
+    assert not profiler.enabled
+    assert list_captures(str(tmp_path)) == []
+
+
+def test_oldest_captures_are_rotated(tmp_path):
+    profiler = make_profiler(tmp_path, max_files=2)
+
+    for index in range(4):
+        with profiler.watch(f"quote-{index}", "stl"):
+            busy_wait(0.05)
+
+    assert [capture["quote_id"] for capture in list_captures(str(tmp_path))] == ["quote-3", "quote-2"]
+
+
+def test_capture_path_rejects_other_files(tmp_path):
+    (tmp_path / "notes.txt").write_text("secret")
+
+    assert capture_path("notes.txt", str(tmp_path)) is None
+    assert capture_path("../" + os.path.basename(str(tmp_path)) + "/notes.txt", str(tmp_path)) is None
+    assert capture_path("20260101T000000000000_quote-1_stl_12t.collapsed", str(tmp_path)) is None
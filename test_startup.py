@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Cold-start checks for the backend: importing the app and starting it must
+not load the mesh format backends or the Supabase SDK, and must stay
+within a time budget.
+
+Run directly for a startup benchmark:
+    python test_startup.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+# Generous enough for slow CI machines; a lazy-import regression costs far more
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "5000"))
+HEAVY_MODULES = ("trimesh", "open3d", "supabase")
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    response = client.get("/healthz")
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "ready_ms": (ready - started) * 1000,
+    "healthz_status": response.status_code,
+    "heavy_modules": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_startup(data_dir: str) -> dict:
+    """Import and start the app in a fresh interpreter and report timings."""
+    env = dict(
+        os.environ,
+        DATA_BACKEND="local",
+        LOCAL_DB_PATH=os.path.join(data_dir, "orders.db"),
+        LOCAL_STORAGE_DIR=os.path.join(data_dir, "storage"),
+        JOB_DB_PATH=os.path.join(data_dir, "jobs.db"),
+    )
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=60, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_startup_skips_heavy_backends(tmp_path):
+    startup = measure_startup(str(tmp_path))
+
+    assert startup["healthz_status"] == 200
+    assert startup["heavy_modules"] == []
+
+
+def test_startup_within_budget(tmp_path):
+    startup = measure_startup(str(tmp_path))
+
+    assert startup["ready_ms"] < STARTUP_BUDGET_MS
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as data_dir:
+            samples.append(measure_startup(data_dir))
+    for field in ("import_ms", "ready_ms"):
+        values = [sample[field] for sample in samples]
+        print(f"{field}: median {statistics.median(values):.1f}  min {min(values):.1f}  max {max(values):.1f}")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for STEP tessellation and mesh caching in backend/step_tessellation.py
+
+Tessellation of real models runs on the STEP files in STEP_SAMPLES_DIR
+(default samples/step) and is skipped when there are none or no STEP
+backend is installed. Run directly to time files of your own:
+    python test_step_tessellation.py part.step [...]
+"""
+
+import glob
+import os
+import sys
+import time
+sys.path.append('backend')
+
+import numpy as np
+import pytest
+
+from indexed_mesh import IndexedMesh
+from mesh_metrics import compute_mesh_metrics
+from mesh_store import prune_mesh_store, write_mesh_file
+from quote_cache import content_digest
+from step_tessellation import STEP_BACKEND_AVAILABLE, StepTessellator, TessellationBudgetError
+
+STEP_SAMPLES_DIR = os.getenv("STEP_SAMPLES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              "samples", "step"))
+SAMPLE_FILES = sorted(glob.glob(os.path.join(STEP_SAMPLES_DIR, "*.st*p")))
+
+TETRAHEDRON = IndexedMesh(
+    np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32),
+    np.array([[0, 2, 1], [0, 1, 3], [1, 2, 3], [0, 3, 2]], dtype=np.int32),
+)
+
+
+def test_repeat_tessellation_uses_cache(tmp_path, monkeypatch):
+    tessellator = StepTessellator(cache_dir=str(tmp_path))
+    runs = []
+
+    def fake_worker(step_path, mesh_path):
+        runs.append(step_path)
+        write_mesh_file(mesh_path, TETRAHEDRON)
+
+    monkeypatch.setattr(tessellator, "_run_worker", fake_worker)
+
+    first = tessellator.tessellate(b"ISO-10303-21; part")
+    second = tessellator.tessellate(b"ISO-10303-21; part")
+
+    assert len(runs) == 1
+    assert np.array_equal(first.faces, second.faces)
+    assert os.path.exists(tessellator.cache_path(b"ISO-10303-21; part"))
+
+
+def test_cache_key_includes_tolerances(tmp_path):
+    coarse = StepTessellator(chord_tolerance_mm=0.1, cache_dir=str(tmp_path))
+    fine = StepTessellator(chord_tolerance_mm=0.01, cache_dir=str(tmp_path))
+
+    assert coarse.cache_path(b"part") != fine.cache_path(b"part")
+    assert coarse.cache_path(b"part") != coarse.cache_path(b"other part")
+
+
+def test_cached_mesh_is_pruned_with_its_upload(tmp_path, monkeypatch):
+    tessellator = StepTessellator(cache_dir=str(tmp_path))
+    monkeypatch.setattr(tessellator, "_run_worker",
+                        lambda step_path, mesh_path: write_mesh_file(mesh_path, TETRAHEDRON))
+    tessellator.tessellate(b"ISO-10303-21; part")
+    write_mesh_file(str(tmp_path / f"{content_digest(b'ISO-10303-21; part')}.step.mesh"), TETRAHEDRON)
+
+    assert prune_mesh_store(str(tmp_path), max_bytes=0) == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_wall_clock_budget(tmp_path):
+    tessellator = StepTessellator(timeout_s=0.001, cache_dir=str(tmp_path))
+
+    with pytest.raises(TessellationBudgetError):
+        tessellator.tessellate(b"ISO-10303-21; part")
+
+
+@pytest.mark.skipif(not STEP_BACKEND_AVAILABLE, reason="no STEP backend installed")
+@pytest.mark.parametrize("step_path", SAMPLE_FILES or [pytest.param(None, marks=pytest.mark.skip(
+    reason=f"no sample STEP files in {STEP_SAMPLES_DIR}"))])
+def test_sample_files_tessellate(step_path, tmp_path):
+    with open(step_path, "rb") as handle:
+        content = handle.read()
+    tessellator = StepTessellator(cache_dir=str(tmp_path))
+
+    mesh = tessellator.tessellate(content)
+    cached = tessellator.tessellate(content)
+
+    assert len(mesh.faces) > 0
+    assert compute_mesh_metrics(mesh)["volume_mm3"] > 0
+    assert np.array_equal(mesh.faces, cached.faces)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        tessellator = StepTessellator(cache_dir=cache_dir)
+        for step_path in sys.argv[1:] or SAMPLE_FILES:
+            with open(step_path, "rb") as handle:
+                content = handle.read()
+            started = time.perf_counter()
+            mesh = tessellator.tessellate(content)
+            tessellated = time.perf_counter()
+            tessellator.tessellate(content)
+            cached = time.perf_counter()
+            metrics = compute_mesh_metrics(mesh)
+            print(f"{os.path.basename(step_path)}: {len(mesh.faces)} triangles, "
+                  f"{metrics['volume_mm3']:.1f} mm³, tessellate {(tessellated - started) * 1000:.0f} ms, "
+                  f"cached {(cached - tessellated) * 1000:.1f} ms")
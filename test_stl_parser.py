@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the STL decoding helpers in backend/stl_parser.py
+"""
+
+import struct
+import sys
+sys.path.append('backend')
+
+import numpy as np
+import pytest
+
+from stl_parser import is_binary_stl, parse_stl_ascii, parse_stl_binary, parse_stl_file
+
+# Unit right-angled tetrahedron: volume 1/6
+TETRAHEDRON = np.array([
+    [[0, 0, 0], [0, 1, 0], [1, 0, 0]],
+    [[0, 0, 0], [1, 0, 0], [0, 0, 1]],
+    [[0, 0, 0], [0, 0, 1], [0, 1, 0]],
+    [[1, 0, 0], [0, 1, 0], [0, 0, 1]],
+], dtype=np.float32)
+
+
+def make_binary_stl(triangles: np.ndarray) -> bytes:
+    """Serialise an (N, 3, 3) array as a binary STL."""
+    data = bytearray(b'\0' * 80)
+    data += struct.pack('<I', len(triangles))
+    for triangle in triangles:
+        data += struct.pack('<3f', 0.0, 0.0, 0.0)
+        data += struct.pack('<9f', *triangle.reshape(-1))
+        data += struct.pack('<H', 0)
+    return bytes(data)
+
+
+def test_parse_stl_binary_returns_contiguous_float32_array():
+    triangles, count = parse_stl_binary(make_binary_stl(TETRAHEDRON))
+
+    assert count == 4
+    assert triangles.shape == (4, 3, 3)
+    assert triangles.dtype == np.float32
+    assert triangles.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(triangles, TETRAHEDRON)
+
+
+def test_parse_stl_binary_rejects_truncated_file():
+    content = make_binary_stl(TETRAHEDRON)
+
+    with pytest.raises(ValueError, match="Truncated"):
+        parse_stl_binary(content[:-10])
+
+
+def test_parse_stl_file_binary_volume():
+    volume, count = parse_stl_file(make_binary_stl(TETRAHEDRON))
+
+    assert count == 4
+    assert volume == pytest.approx(1 / 6, rel=1e-5)
+
+
+def make_ascii_stl(triangles: np.ndarray) -> bytes:
+    """Serialise an (N, 3, 3) array as an ASCII STL."""
+    lines = ["solid test"]
+    for triangle in triangles:
+        lines.append("  facet normal 0 0 1")
+        lines.append("    outer loop")
+        for vertex in triangle:
+            lines.append("      VERTEX %r %r %r" % tuple(float(v) for v in vertex))
+        lines.append("    endloop")
+        lines.append("  endfacet")
+    lines.append("endsolid test")
+    return "\r\n".join(lines).encode('ascii')
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_parse_stl_ascii_across_chunk_boundaries(chunk_size):
+    triangles, count = parse_stl_ascii(make_ascii_stl(TETRAHEDRON), chunk_size=chunk_size)
+
+    assert count == 4
+    assert triangles.dtype == np.float32
+    np.testing.assert_array_equal(triangles, TETRAHEDRON)
+
+
+def test_parse_stl_ascii_rejects_malformed_coordinates():
+    content = make_ascii_stl(TETRAHEDRON).replace(b'VERTEX 0.0', b'VERTEX abc', 1)
+
+    with pytest.raises(ValueError, match="Malformed"):
+        parse_stl_ascii(content)
+
+
+def test_is_binary_stl():
+    binary = make_binary_stl(TETRAHEDRON)
+
+    assert is_binary_stl(binary)
+    # Binary exporters sometimes start the header with "solid"
+    assert is_binary_stl(b'solid exported' + binary[14:])
+    assert not is_binary_stl(make_ascii_stl(TETRAHEDRON))
+    assert not is_binary_stl(b'solid empty\nendsolid empty\n')
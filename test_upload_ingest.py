@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming upload ingestion in backend/upload_ingest.py
+"""
+
+import asyncio
+import io
+import os
+import sys
+import zipfile
+sys.path.append('backend')
+
+import pytest
+from fastapi import UploadFile
+
+import batch_quotes
+from batch_quotes import ingest_zip_member
+from quote_cache import content_digest
+from upload_ingest import UploadTooLargeError, ingest_upload, sniff_format
+from test_stl_parser import TETRAHEDRON, make_ascii_stl, make_binary_stl
+
+
+def ingest(content: bytes, **kwargs):
+    upload = UploadFile(io.BytesIO(content), filename="part.stl")
+    return asyncio.run(ingest_upload(upload, chunk_size=16, **kwargs))
+
+
+def test_small_upload_stays_in_memory():
+    content = make_binary_stl(TETRAHEDRON)
+
+    with ingest(content, spill_bytes=1024 * 1024) as upload:
+        assert upload.path is None
+        assert upload.size == len(content)
+        assert upload.digest == content_digest(content)
+        assert upload.view == content
+        assert upload.sniffed_format == 'stl-binary'
+        # Stored from the view, without a bytes copy
+        assert upload.storage_payload is upload.view
+
+
+def test_large_upload_spills_to_memory_mapped_file():
+    content = make_ascii_stl(TETRAHEDRON)
+
+    upload = ingest(content, spill_bytes=100)
+    path = upload.path
+    assert os.path.exists(path)
+    assert upload.view == content
+    assert upload.digest == content_digest(content)
+    assert upload.sniffed_format == 'stl-ascii'
+    assert upload.storage_payload == path
+
+    upload.close()
+    assert not os.path.exists(path)
+
+
+def test_large_zip_member_spills_to_file(monkeypatch):
+    content = make_ascii_stl(TETRAHEDRON)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("part.stl", content)
+    monkeypatch.setattr(batch_quotes, "UPLOAD_SPILL_BYTES", 100)
+
+    with zipfile.ZipFile(buffer) as archive:
+        upload = asyncio.run(ingest_zip_member(archive, archive.getinfo("part.stl")))
+
+    with upload:
+        assert upload.path is not None
+        assert upload.view == content
+
+
+def test_upload_over_limit_is_rejected():
+    with pytest.raises(UploadTooLargeError):
+        ingest(b'x' * 1000, max_bytes=999, spill_bytes=10)
+
+
+def test_sniff_format():
+    assert sniff_format(b'ISO-10303-21;\nHEADER;') == 'step'
+    assert sniff_format(b'# exported\nv 0 0 0\n') == 'obj'
+    assert sniff_format(b'PK\x03\x04rest') == 'zip'
+    assert sniff_format(b'abc') is None